@@ -0,0 +1,129 @@
+import math
+import re
+from decimal import Decimal
+from numbers import Real
+from typing import Any
+
+from .result_formatter import format_value
+
+
+class TemplateAnswerPolicy:
+    """
+    Decides when a final answer can be rendered from a template instead of
+    asking the LLM.
+    """
+
+    def __init__(
+        self,
+        max_rows: int = 5,
+        max_columns: int = 3,
+        languages: tuple[tuple[str, str], ...] = (("English", "Latin"),),
+    ) -> None:
+        """
+        Initialize the TemplateAnswerPolicy class.
+
+        Args:
+            max_rows (int): Maximum number of rows of a labeled table.
+                Defaults to 5.
+            max_columns (int): Maximum number of columns of a labeled table,
+                including the label column. Defaults to 3.
+            languages (tuple[tuple[str, str], ...]): The (language, script)
+                pairs the templates can answer in. Defaults to English in the
+                Latin script.
+        """
+        self.max_rows = max_rows
+        self.max_columns = max_columns
+        self.languages = languages
+
+    def applies(self, sql_result: dict, language: str, script: str) -> bool:
+        """
+        Check whether the result of `SQLTools.run_sql` can be answered with a
+        template: a single finite number, or a small table whose first column
+        labels the numeric columns after it. Anything else, e.g. a NULL or
+        text scalar, is left to the LLM.
+
+        Args:
+            sql_result (dict): The result of `SQLTools.run_sql`.
+            language (str): The language of the query.
+            script (str): The script of the query.
+        """
+        if (language, script) not in self.languages or sql_result["truncated"]:
+            return False
+
+        rows = sql_result["rows"]
+        if len(rows) == 1 and len(rows[0]) == 1:
+            return _is_number(rows[0][0])
+
+        return (
+            1 <= len(rows) <= self.max_rows
+            and 2 <= len(rows[0]) <= self.max_columns
+            and all(row[0] is not None and not _is_number(row[0]) for row in rows)
+            and all(_is_number(value) for row in rows for value in row[1:])
+        )
+
+
+def _is_number(value: Any) -> bool:
+    """Check whether a value is a finite number (booleans excluded)."""
+    if isinstance(value, bool) or not isinstance(value, (Real, Decimal)):
+        return False
+    try:
+        return math.isfinite(value)
+    except (TypeError, ValueError):
+        return False
+
+
+def _humanize_column_name(column_name: str) -> str:
+    """
+    Turn a result column name into words, e.g. "COUNT(*)" into "count" and
+    "SUM(num_cases)" into "sum of num cases".
+    """
+    function_call = re.fullmatch(
+        r"\s*(\w+)\s*\(\s*(?:DISTINCT\s+)?(.*?)\s*\)\s*",
+        column_name,
+        flags=re.IGNORECASE,
+    )
+    if function_call is not None:
+        function, argument = function_call.groups()
+        function = function.lower()
+        argument = argument.split(".")[-1].strip('"`[]')
+        if argument in ("", "*", "1"):
+            return function
+        return f"{function} of {_humanize_column_name(argument)}"
+    return column_name.split(".")[-1].strip('"`[]').replace("_", " ").lower()
+
+
+def render_template_answer(sql_result: dict) -> str:
+    """
+    Render the final answer for a scalar or small labeled result.
+
+    The result must be accepted by `TemplateAnswerPolicy.applies`.
+
+    Args:
+        sql_result (dict): The result of `SQLTools.run_sql`.
+
+    Returns:
+        str: The final answer.
+    """
+    rows = sql_result["rows"]
+    column_names = [_humanize_column_name(name) for name in rows[0]._fields]
+
+    if len(rows) == 1 and len(rows[0]) == 1:
+        return (
+            f"According to the database, the {column_names[0]} is "
+            f"{format_value(rows[0][0])}."
+        )
+
+    lines = [
+        f"- {format_value(row[0])}: "
+        + ", ".join(
+            [
+                f"{name} {format_value(value)}"
+                for name, value in zip(column_names[1:], row[1:])
+            ]
+        )
+        for row in rows
+    ]
+    return (
+        f"According to the database, here is the {', '.join(column_names[1:])} "
+        f"by {column_names[0]}:\n" + "\n".join(lines)
+    )
@@ -0,0 +1,191 @@
+import asyncio
+import hashlib
+import json
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from cachetools import LRUCache
+
+from ..utils import ask_llm_json, estimate_tokens
+from .query_processing_prompts import create_history_summary_prompt
+
+# Share of the token budget of the chat history reserved for the summary
+_SUMMARY_BUDGET_FRACTION = 0.25
+# Number of words per token, to ask for a summary of a given number of tokens
+_WORDS_PER_TOKEN = 0.75
+
+
+def _hash_turns(chat_turns: List[dict]) -> str:
+    """Hash chat turns, to check that a summary still covers them."""
+    return hashlib.sha256(
+        json.dumps(chat_turns, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _truncate_turn(chat_turn: dict, max_tokens: int) -> dict:
+    """Truncate the texts of a chat turn to fit in a number of tokens."""
+    max_chars = max(max_tokens * 4 // max(len(chat_turn), 1), 1)
+    return {
+        key: (
+            value[:max_chars] + "..."
+            if isinstance(value, str) and len(value) > max_chars
+            else value
+        )
+        for key, value in chat_turn.items()
+    }
+
+
+class _EvictingLRUCache(LRUCache):
+    """LRU cache calling `on_evict` with the key of each evicted entry."""
+
+    def __init__(self, maxsize: int, on_evict: Callable[[Hashable], None]) -> None:
+        """Initialize the _EvictingLRUCache class."""
+        super().__init__(maxsize=maxsize)
+        self._on_evict = on_evict
+
+    def popitem(self) -> Tuple[Hashable, Any]:
+        """Evict the least recently used entry."""
+        key, value = super().popitem()
+        self._on_evict(key)
+        return key, value
+
+
+class ChatHistoryManager:
+    """
+    Compacts the chat history passed to the multi-turn prompts: the last turns
+    are kept verbatim, and older turns are folded into a rolling summary by a
+    cheap model, within a token budget.
+
+    The summary is updated incrementally: each turn is summarized once, when
+    it leaves the verbatim window, and is not summarized again afterwards.
+    """
+
+    def __init__(
+        self,
+        summary_llm: str = "gpt-4o-mini",
+        keep_last_turns: int = 4,
+        max_history_tokens: int = 1000,
+        max_conversations: int = 10_000,
+    ) -> None:
+        """
+        Initialize the ChatHistoryManager class.
+
+        Args:
+            summary_llm (str): The (cheap) LLM model summarizing older turns.
+            keep_last_turns (int): Maximum number of last turns kept verbatim.
+            max_history_tokens (int): Token budget of the chat history in each
+                prompt, summary included. Fewer turns are kept verbatim if they
+                do not fit.
+            max_conversations (int): Maximum number of conversation summaries
+                kept in memory.
+        """
+        self.summary_llm = summary_llm
+        self.keep_last_turns = keep_last_turns
+        self.max_history_tokens = max_history_tokens
+        self.summary_tokens = int(max_history_tokens * _SUMMARY_BUDGET_FRACTION)
+        # The lock of a conversation is dropped when its summary is evicted
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._summaries: LRUCache = _EvictingLRUCache(
+            maxsize=max_conversations,
+            on_evict=lambda key: self._locks.pop(key, None),
+        )
+
+    @staticmethod
+    def conversation_key(chat_history: List[dict], conversation_id: str | None) -> str:
+        """
+        Key a conversation by its id or, without one, by its first turn, which
+        does not change as the conversation goes on.
+        """
+        if conversation_id is not None:
+            return conversation_id
+        return _hash_turns(chat_history[:1])
+
+    def _num_verbatim_turns(self, chat_history: List[dict], num_summarized: int) -> int:
+        """
+        Return the number of last turns kept verbatim: at most
+        `keep_last_turns`, none of them already summarized, and within the
+        budget left by the summary. The last turn is always kept.
+        """
+        num_turns = min(self.keep_last_turns, len(chat_history) - num_summarized)
+        budget = self.max_history_tokens - self.summary_tokens
+        while (
+            num_turns > 1
+            and estimate_tokens(json.dumps(chat_history[-num_turns:], default=str))
+            > budget
+        ):
+            num_turns -= 1
+        return max(num_turns, min(len(chat_history), 1))
+
+    async def compact(
+        self,
+        chat_history: List[dict],
+        conversation_id: str | None = None,
+        api_key: str | None = None,
+    ) -> Tuple[List[dict], float]:
+        """
+        Compact a chat history (oldest turn first) for the prompts.
+
+        Args:
+            chat_history (list[dict]): The turns of the conversation.
+            conversation_id (str | None): (Optional) The conversation id. Without
+                one, the conversation is recognized by its first turn.
+            api_key (str | None): (Optional) API key to use for the LLM call.
+
+        Returns:
+            tuple[list[dict], float]: The compacted history, a {"summary"} turn
+                (if older turns were summarized) followed by the last turns, and
+                the cost of summarizing.
+        """
+        if not chat_history:
+            return [], 0.0
+
+        key = self.conversation_key(chat_history, conversation_id)
+        cost = 0.0
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            state = self._summaries.get(key)
+            if (
+                state is None
+                or state["num_summarized"] > len(chat_history)
+                or (
+                    state["turns_hash"]
+                    != _hash_turns(chat_history[: state["num_summarized"]])
+                )
+            ):
+                # New conversation, or its history was edited
+                state = {"summary": "", "num_summarized": 0, "turns_hash": ""}
+
+            num_verbatim = self._num_verbatim_turns(
+                chat_history, state["num_summarized"]
+            )
+            num_to_summarize = len(chat_history) - num_verbatim
+            if num_to_summarize > state["num_summarized"]:
+                sys_message, prompt = create_history_summary_prompt(
+                    state["summary"],
+                    chat_history[state["num_summarized"] : num_to_summarize],
+                    max_words=int(self.summary_tokens * _WORDS_PER_TOKEN),
+                )
+                summary_llm_response = await ask_llm_json(
+                    prompt,
+                    sys_message,
+                    llm=self.summary_llm,
+                    temperature=0.1,
+                    api_key=api_key,
+                )
+                cost = float(summary_llm_response["cost"])
+                state = {
+                    "summary": str(summary_llm_response["answer"]["summary"]),
+                    "num_summarized": num_to_summarize,
+                    "turns_hash": _hash_turns(chat_history[:num_to_summarize]),
+                }
+            self._summaries[key] = state
+
+        compacted: List[Dict[str, Any]] = []
+        if state["summary"]:
+            compacted.append({"summary": state["summary"]})
+        compacted.extend(chat_history[state["num_summarized"] :])
+
+        # A single long turn may still exceed the budget
+        num_tokens = estimate_tokens(json.dumps(compacted, default=str))
+        if num_tokens > self.max_history_tokens:
+            max_turn_tokens = self.max_history_tokens // len(compacted)
+            compacted = [_truncate_turn(turn, max_turn_tokens) for turn in compacted]
+        return compacted, cost
@@ -0,0 +1,180 @@
+import math
+from decimal import Decimal
+from typing import Any, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Estimated length of the string representation of values of other types
+_DEFAULT_VALUE_SIZE = 10
+
+
+def _estimate_int_size(value: int) -> int:
+    """Estimate the number of characters of an integer."""
+    if value == 0:
+        return 1
+    return int(math.log10(abs(value))) + 1 + (value < 0)
+
+
+def estimate_size(obj: Any) -> int:
+    """
+    Estimate the length of the string representation of a (nested) SQL
+    response without building it.
+
+    Strings count their length plus quotes, numbers their digits, and
+    containers the sizes of their items plus separators.
+
+    Args:
+        obj (Any): A SQL response, e.g. rows, a dictionary of rows, or a
+            ColumnarResult.
+
+    Returns:
+        int: The estimated length of `str(obj)`.
+    """
+    if isinstance(obj, ColumnarResult):
+        return obj.estimate_size()
+    if isinstance(obj, str):
+        return len(obj) + 2
+    if obj is None or isinstance(obj, bool):
+        return 5
+    if isinstance(obj, (int, np.integer)):
+        return _estimate_int_size(int(obj))
+    if isinstance(obj, (float, Decimal, np.floating)):
+        return 18
+    if isinstance(obj, dict):
+        return (
+            sum(
+                [
+                    estimate_size(key) + estimate_size(value)
+                    for key, value in obj.items()
+                ]
+            )
+            + 4 * len(obj)
+            + 2
+        )
+    if isinstance(obj, Sequence):
+        return sum([estimate_size(item) for item in obj]) + 2 * len(obj) + 2
+    return _DEFAULT_VALUE_SIZE
+
+
+def _to_column_array(values: Sequence[Any]) -> np.ndarray:
+    """
+    Store the values of a column in a NumPy array: int64 or float64 for
+    numeric columns without nulls, and object otherwise.
+    """
+    if values and all(
+        isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+        for value in values
+    ):
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif values and all(
+        isinstance(value, (int, float, np.integer, np.floating))
+        and not isinstance(value, bool)
+        for value in values
+    ):
+        return np.array(values, dtype=np.float64)
+
+    array = np.empty(len(values), dtype=object)
+    array[:] = list(values)
+    return array
+
+
+def _to_python_value(value: Any) -> Any:
+    """Convert NumPy scalars to the equivalent Python values."""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class ColumnarResult:
+    """
+    Columnar SQL result set, with one NumPy array per column.
+
+    Slicing returns views on the same arrays, and the size of the result is
+    estimated from the arrays without rendering the rows as strings. Indexing
+    and iterating yield row tuples with the column names as `_fields`, like
+    SQLAlchemy rows, so code written for rows keeps working.
+    """
+
+    def __init__(self, column_names: Sequence[str], columns: Sequence[np.ndarray]):
+        """
+        Initialize the ColumnarResult class.
+
+        Args:
+            column_names (Sequence[str]): The names of the columns.
+            columns (Sequence[np.ndarray]): The values of each column.
+        """
+        self.column_names = tuple(column_names)
+        self.columns = list(columns)
+        self._num_rows = len(self.columns[0]) if self.columns else 0
+        self._row_type = type(
+            "ColumnarRow", (tuple,), {"__slots__": (), "_fields": self.column_names}
+        )
+
+    @classmethod
+    def from_rows(
+        cls, rows: Sequence[Sequence[Any]], column_names: Sequence[str]
+    ) -> "ColumnarResult":
+        """
+        Build a columnar result from rows.
+
+        Args:
+            rows (Sequence[Sequence[Any]]): The rows of the result.
+            column_names (Sequence[str]): The names of the columns.
+        """
+        columns = list(zip(*rows)) if rows else [() for _ in column_names]
+        return cls(column_names, [_to_column_array(values) for values in columns])
+
+    def __len__(self) -> int:
+        """Return the number of rows."""
+        return self._num_rows
+
+    def __getitem__(self, index: int | slice) -> Any:
+        """
+        Return a row, or a ColumnarResult viewing a slice of the rows without
+        copying them.
+        """
+        if isinstance(index, slice):
+            return ColumnarResult(
+                self.column_names, [column[index] for column in self.columns]
+            )
+        return self._row_type(
+            [_to_python_value(column[index]) for column in self.columns]
+        )
+
+    def __iter__(self) -> Iterator[tuple]:
+        """Iterate over the rows."""
+        for index in range(self._num_rows):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        """Render the result like a list of rows."""
+        return repr(list(zip(*[column.tolist() for column in self.columns])))
+
+    def column(self, name: str) -> np.ndarray:
+        """Return the values of a column."""
+        return self.columns[self.column_names.index(name)]
+
+    def estimate_size(self) -> int:
+        """
+        Estimate the length of the string representation of the rows, with
+        vectorized computations for numeric columns.
+        """
+        size = 2 + self._num_rows * (2 + 2 * len(self.columns))
+        for column in self.columns:
+            if column.dtype == np.int64:
+                digits = np.floor(np.log10(np.maximum(np.abs(column), 1))) + 1
+                size += int(digits.sum()) + int((column < 0).sum())
+            elif column.dtype == np.float64:
+                size += 18 * column.size
+            else:
+                size += sum([estimate_size(value) for value in column])
+        return size
+
+    def to_pandas(self) -> pd.DataFrame:
+        """Convert the result to a pandas DataFrame."""
+        result_df = pd.DataFrame(dict(enumerate(self.columns)))
+        # Set the names afterwards, since SQL results may repeat column names
+        result_df.columns = list(self.column_names)
+        return result_df
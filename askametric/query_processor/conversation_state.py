@@ -0,0 +1,83 @@
+import copy
+from typing import Any, Dict
+
+from cachetools import TTLCache
+
+_conversation_state_store_instance = None
+
+# The attributes of a processor carried over to the follow-up questions of a
+# conversation. Columns are selected again for each question, since a
+# follow-up can need columns the previous question did not.
+CONVERSATION_STATE_ATTRIBUTES = ("best_tables", "sql_query")
+
+
+class ConversationStateStore:
+    """
+    The plan of the last analysed question of each conversation (best tables
+    and SQL query), so that a follow-up question starts from it instead of
+    selecting tables again.
+    """
+
+    def __init__(self, max_conversations: int = 10_000, ttl: float = 60 * 60) -> None:
+        """
+        Initialize the ConversationStateStore class.
+
+        Args:
+            max_conversations (int): Maximum number of conversations kept.
+            ttl (float): How long, in seconds, the state of a conversation is
+                kept after its last question.
+        """
+        self._states: TTLCache = TTLCache(maxsize=max_conversations, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id: str, metric_db_id: str) -> Dict[str, Any] | None:
+        """
+        Return the state of a conversation, if it is about the same database.
+
+        Args:
+            conversation_id (str): The conversation id.
+            metric_db_id (str): The database id of the current question.
+        """
+        entry = self._states.get(conversation_id)
+        if entry is None or entry["metric_db_id"] != metric_db_id:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(entry["state"])
+
+    def set(self, conversation_id: str, metric_db_id: str, state: Dict) -> None:
+        """
+        Store the state of a conversation, replacing the previous one.
+
+        Args:
+            conversation_id (str): The conversation id.
+            metric_db_id (str): The database id of the question.
+            state (dict): The processor attributes making up the state.
+        """
+        self._states[conversation_id] = {
+            "metric_db_id": metric_db_id,
+            "state": copy.deepcopy(state),
+        }
+
+    def clear(self, conversation_id: str) -> None:
+        """Forget the state of a conversation, e.g. when it ends."""
+        self._states.pop(conversation_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit-rate metrics of the store."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "conversations": len(self._states),
+        }
+
+
+def get_conversation_state_store() -> ConversationStateStore:
+    """Return the ConversationStateStore instance."""
+    global _conversation_state_store_instance
+    if _conversation_state_store_instance is None:
+        _conversation_state_store_instance = ConversationStateStore()
+    return _conversation_state_store_instance
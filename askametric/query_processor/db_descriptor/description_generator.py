@@ -1,22 +1,70 @@
 from .descriptor_prompts import (
     generate_description_prompt,
     generate_suggested_questions_prompt,
+    generate_table_group_summary_prompt,
+    update_description_prompt,
+    update_suggested_questions_prompt,
 )
-from ...utils import ask_llm_json, setup_logger, get_log_level_from_str
+from ...utils import (
+    ask_llm_json,
+    estimate_tokens,
+    setup_logger,
+    get_log_level_from_str,
+)
+from ..engine_registry import get_engine_registry
+from ..retrieval import filter_table_description
 from ..tools import get_tools, track_time
+import asyncio
+import hashlib
 import json
+import os
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, List
+from sqlalchemy import inspect
+from sqlalchemy.exc import NoSuchTableError
 from sqlalchemy.ext.asyncio import AsyncSession
 from cachetools import TTLCache
-from aiocache import cached
 
 _db_descriptor_instance = None
 
+# The generated descriptions, and the key of their content in the LLM response
+STEPS = ("db_description", "suggested_questions")
+
+# Maximum number of table groups summarized at once
+_MAX_CONCURRENT_CHUNKS = 8
+
+# Above this share of changed tables, descriptions are regenerated from scratch
+# rather than updated
+_MAX_CHANGED_TABLES_FRACTION = 0.5
+
+
+def _fingerprint(obj: Any) -> str:
+    """Hash a JSON-serializable object."""
+    return hashlib.sha256(
+        json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _check_response(response: Dict, key: str) -> None:
+    """Raise an error if an LLM response does not have the expected key."""
+    answer = response.get("answer")
+    if not isinstance(answer, dict) or key not in answer:
+        raise ValueError(f"Unexpected LLM response, missing '{key}': {answer}")
+
 
 class DatabaseDescriptor:
     """Generates helpful descriptions for the database"""
 
     def __init__(
-        self, llm: str = "gpt-4o", temperature: float = 0.1, log_level: str = "INFO"
+        self,
+        llm: str = "gpt-4o",
+        temperature: float = 0.1,
+        log_level: str = "INFO",
+        store_path: str | None = None,
+        fingerprint_ttl: int = 60 * 5,
+        max_chunk_tokens: int | None = None,
+        on_suggested_questions: Callable[[str, List[str]], Any] | None = None,
     ):
         """
         Initialize the DatabaseDescriptor class.
@@ -26,6 +74,21 @@ class DatabaseDescriptor:
             temperature (float): The temperature to use when generating descriptions.
                 Defaults to 0.1.
             log_level (str): The log level to use. Defaults to "INFO".
+            store_path (str | None): (Optional) The JSON file the descriptions and
+                their schema fingerprints are persisted to, so they survive
+                restarts. Defaults to None (in memory only).
+            fingerprint_ttl (int): How long, in seconds, the schema fingerprint of a
+                database is trusted before the schema is inspected again.
+                Defaults to 5 minutes.
+            max_chunk_tokens (int | None): (Optional) If the schema of a database
+                is larger than this many tokens, its tables are split into groups
+                of at most this many tokens that are summarized concurrently, and
+                the database is described from the summaries. Defaults to None
+                (the whole schema is always put in one prompt).
+            on_suggested_questions (Callable | None): (Optional) Called with the
+                database id and its suggested questions whenever they change,
+                e.g. `AnswerWarmer.suggested_questions_hook(...)` to prepare
+                their answers ahead of time. Defaults to None.
         """
         self.llm = llm
         self.temperature = temperature
@@ -33,12 +96,24 @@ class DatabaseDescriptor:
         self.logger = setup_logger("db_descriptor", get_log_level_from_str(log_level))
 
         self.tools = get_tools()
-        self._description_cache: TTLCache = TTLCache(maxsize=100, ttl=60 * 60 * 24)
-        self._description_cache["db_description"] = {}
-        self._description_cache["suggested_questions"] = {}
+        self.store_path = store_path
+        # For each database and step: the LLM response and the fingerprints it
+        # was generated from
+        self._descriptions: Dict[str, Dict[str, Dict[str, Any]]] = self._load_store()
+        self._table_fingerprints_cache: TTLCache = TTLCache(
+            maxsize=100, ttl=fingerprint_ttl
+        )
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._store_lock = asyncio.Lock()
+        self.max_chunk_tokens = max_chunk_tokens
+        # For each database: the tables, tokens, time and cost of each table
+        # group summarized the last time it was described
+        self.chunk_metrics: Dict[str, List[Dict[str, Any]]] = {}
+        self.on_suggested_questions = on_suggested_questions
+        # For each database: the suggested questions last passed to the hook
+        self._notified_questions: Dict[str, List[str]] = {}
 
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
     async def generate_db_description(
         self,
         asession: AsyncSession,
@@ -49,7 +124,8 @@ class DatabaseDescriptor:
         api_key: str | None = None,
     ) -> str:
         """
-        Generate a database description.
+        Generate a database description. It is only regenerated when the schema
+        or the descriptions it was generated from change.
 
         Args:
             system_prompt: The system prompt that sets the context for the
@@ -59,38 +135,23 @@ class DatabaseDescriptor:
                 Defaults to None.
             api_key: (Optional) API key to use for the LLM call
         """
-        if metric_db_id not in self._description_cache["db_description"]:
-            tables_list = [row["name"] for row in json.loads(table_description)]
-            db_schema = await self.tools.get_tables_schema(
-                tables_list, asession, metric_db_id
-            )
+        errors = await self._update_descriptions(
+            asession,
+            metric_db_id,
+            sys_message,
+            table_description,
+            column_description,
+            api_key,
+            steps=["db_description"],
+        )
+        if errors:
+            raise errors["db_description"]
 
-            system, prompt = generate_description_prompt(
-                system_prompt=sys_message,
-                tables_description=table_description,
-                db_schema=db_schema,
-                column_description=column_description,
-            )
-            generated_description = await ask_llm_json(
-                prompt=prompt,
-                system_message=system,
-                llm=self.llm,
-                temperature=self.temperature,
-                api_key=api_key,
-            )
-            self.logger.debug(
-                f"Generated description for {metric_db_id}: {generated_description}"
-            )
-            self._description_cache["db_description"][
-                metric_db_id
-            ] = generated_description
-
-        return self._description_cache["db_description"][metric_db_id]["answer"][
+        return self._descriptions[metric_db_id]["db_description"]["response"]["answer"][
             "db_description"
         ]
 
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
     async def generate_suggested_questions(
         self,
         asession: AsyncSession,
@@ -101,7 +162,9 @@ class DatabaseDescriptor:
         api_key: str | None = None,
     ) -> str:
         """
-        Generate suggested questions based on the database description.
+        Generate suggested questions based on the database description. They
+        are only regenerated when the schema or the descriptions they were
+        generated from change.
 
         Args:
             system_prompt: The system prompt that sets the context for the
@@ -111,39 +174,535 @@ class DatabaseDescriptor:
                 Defaults to None.
             api_key: (Optional) API key to use for the LLM call
         """
-        if metric_db_id not in self._description_cache["suggested_questions"]:
-            tables_list = [row["name"] for row in json.loads(table_description)]
-            db_schema = await self.tools.get_tables_schema(
-                tables_list, asession, metric_db_id
+        errors = await self._update_descriptions(
+            asession,
+            metric_db_id,
+            sys_message,
+            table_description,
+            column_description,
+            api_key,
+            steps=["suggested_questions"],
+        )
+        if errors:
+            raise errors["suggested_questions"]
+
+        suggested_questions = self._descriptions[metric_db_id]["suggested_questions"][
+            "response"
+        ]["answer"]["suggested_questions"]
+        self._notify_suggested_questions(metric_db_id, suggested_questions)
+        return suggested_questions
+
+    def _notify_suggested_questions(
+        self, metric_db_id: str, suggested_questions: List[str]
+    ) -> None:
+        """
+        Pass the suggested questions of a database to the hook, if they changed
+        since they were last passed.
+        """
+        if self.on_suggested_questions is None:
+            return
+        if self._notified_questions.get(metric_db_id) == suggested_questions:
+            return
+        try:
+            self.on_suggested_questions(metric_db_id, suggested_questions)
+        except Exception as e:
+            self.logger.error(
+                f"Failed to pass the suggested questions of {metric_db_id}: {e}"
             )
+            return
+        self._notified_questions[metric_db_id] = list(suggested_questions)
+
+    def _load_store(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Load the persisted descriptions, if any."""
+        if self.store_path is None or not os.path.exists(self.store_path):
+            return {}
+        try:
+            with open(self.store_path, encoding="utf-8") as store_file:
+                return json.load(store_file)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not load descriptions from store: {e}")
+            return {}
 
+    async def _save_store(self) -> None:
+        """
+        Persist the descriptions, replacing the store atomically. The file is
+        written on a thread so it does not block the event loop.
+        """
+        if self.store_path is None:
+            return
+        # Serialize on the event loop, where the descriptions are modified
+        store = json.dumps(self._descriptions, default=str)
+        async with self._store_lock:
+            await asyncio.to_thread(self._write_store, store)
+
+    def _write_store(self, store: str) -> None:
+        """Write the serialized descriptions to the store."""
+        temp_path = f"{self.store_path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as store_file:
+            store_file.write(store)
+        os.replace(temp_path, self.store_path)
+
+    async def _get_table_fingerprints(
+        self, asession: AsyncSession, metric_db_id: str, table_description: str
+    ) -> Dict[str, str]:
+        """
+        Fingerprint each table of the table description: a hash of its
+        description, and of the names and types of its columns. Missing
+        tables are left out.
+        """
+        tables = json.loads(table_description)
+        cache_key = (metric_db_id, table_description)
+        if cache_key in self._table_fingerprints_cache:
+            return self._table_fingerprints_cache[cache_key]
+
+        def _get_columns(_: Any) -> Dict[str, List[List[str]]]:
+            """List the column names and types of each table."""
+            inspector = inspect(asession.get_bind())
+            table_columns = {}
+            for table in tables:
+                schema, _, table_name = table["name"].rpartition(".")
+                try:
+                    columns = inspector.get_columns(table_name, schema=schema or None)
+                except NoSuchTableError:
+                    continue
+                table_columns[table["name"]] = [
+                    [column["name"], str(column["type"])] for column in columns
+                ]
+            return table_columns
+
+        table_columns = await asession.run_sync(_get_columns)
+        table_fingerprints = {
+            table["name"]: _fingerprint([table, table_columns[table["name"]]])
+            for table in tables
+            if table["name"] in table_columns
+        }
+        self._table_fingerprints_cache[cache_key] = table_fingerprints
+        return table_fingerprints
+
+    async def _update_descriptions(
+        self,
+        asession: AsyncSession,
+        metric_db_id: str,
+        sys_message: str,
+        table_description: str,
+        column_description: str | None,
+        api_key: str | None,
+        steps: List[str],
+    ) -> Dict[str, Exception]:
+        """
+        (Re)generate the given steps of a database whose fingerprint changed
+        since they were generated. When only a few tables changed and the other
+        inputs did not, the previous description is updated from the schema of
+        the changed tables only. The schema is fetched once for all steps.
+
+        Returns:
+            The error of each step that failed.
+        """
+        async with self._locks[metric_db_id]:
+            table_fingerprints = await self._get_table_fingerprints(
+                asession, metric_db_id, table_description
+            )
+            inputs_fingerprint = _fingerprint([sys_message, column_description or ""])
+            fingerprint = _fingerprint([inputs_fingerprint, table_fingerprints])
+
+            generated = self._descriptions.setdefault(metric_db_id, {})
+            stale_steps = [
+                step
+                for step in steps
+                if generated.get(step, {}).get("fingerprint") != fingerprint
+            ]
+            if not stale_steps:
+                return {}
+
+            # Tables changed, added or removed since each step was generated,
+            # or None if the step is regenerated from scratch
+            changed_tables: Dict[str, List[str] | None] = {}
+            removed_tables: Dict[str, List[str]] = {}
+            for step in stale_steps:
+                previous = generated.get(step)
+                if previous is None:
+                    changed_tables[step] = None
+                    continue
+                previous_fingerprints = previous["table_fingerprints"]
+                changed_tables[step] = [
+                    table
+                    for table, table_fingerprint in table_fingerprints.items()
+                    if previous_fingerprints.get(table) != table_fingerprint
+                ]
+                removed_tables[step] = [
+                    table
+                    for table in previous_fingerprints
+                    if table not in table_fingerprints
+                ]
+                num_changed = len(changed_tables[step]) + len(removed_tables[step])
+                max_changed = _MAX_CHANGED_TABLES_FRACTION * len(table_fingerprints)
+                if (
+                    previous["inputs_fingerprint"] != inputs_fingerprint
+                    or num_changed > max_changed
+                ):
+                    changed_tables[step] = None
+                if previous_fingerprints != table_fingerprints:
+                    # The cached schemas may predate the change
+                    self.tools.invalidate_schema_cache(metric_db_id)
+
+            if any(tables is None for tables in changed_tables.values()):
+                schema_tables = list(table_fingerprints)
+            else:
+                schema_tables = sorted(
+                    {table for tables in changed_tables.values() for table in tables}
+                )
+            if self.max_chunk_tokens is None:
+                db_schema = await self.tools.get_tables_schema(
+                    schema_tables, asession, metric_db_id
+                )
+            else:
+                table_schemas = await self._get_table_schemas(
+                    asession, metric_db_id, list(table_fingerprints)
+                )
+                if (
+                    estimate_tokens("".join(table_schemas.values()))
+                    <= self.max_chunk_tokens
+                ):
+                    db_schema = "\n".join(
+                        [table_schemas[table] for table in schema_tables]
+                    )
+                else:
+                    # Too large for one prompt: describe the database from the
+                    # summaries of its table groups
+                    db_schema = await self._summarize_table_groups(
+                        metric_db_id,
+                        sys_message,
+                        table_description,
+                        column_description or "",
+                        table_schemas,
+                        table_fingerprints,
+                        api_key,
+                    )
+                    changed_tables = {step: None for step in stale_steps}
+
+            step_functions = {
+                "db_description": self._generate_db_description,
+                "suggested_questions": self._generate_suggested_questions,
+            }
+            step_results = await asyncio.gather(
+                *[
+                    step_functions[step](
+                        metric_db_id,
+                        sys_message,
+                        table_description,
+                        db_schema,
+                        column_description or "",
+                        api_key,
+                        previous=(
+                            generated[step]["response"]
+                            if changed_tables[step] is not None
+                            else None
+                        ),
+                        removed_tables=removed_tables.get(step, []),
+                    )
+                    for step in stale_steps
+                ],
+                return_exceptions=True,
+            )
+
+            errors = {}
+            for step, step_result in zip(stale_steps, step_results):
+                if isinstance(step_result, Exception):
+                    errors[step] = step_result
+                    continue
+                generated[step] = {
+                    "fingerprint": fingerprint,
+                    "inputs_fingerprint": inputs_fingerprint,
+                    "table_fingerprints": table_fingerprints,
+                    "response": step_result,
+                }
+            await self._save_store()
+            return errors
+
+    async def _get_table_schemas(
+        self, asession: AsyncSession, metric_db_id: str, table_list: List[str]
+    ) -> Dict[str, str]:
+        """
+        Get the schema of each table separately, so that the size limit on
+        schemas applies per table rather than to the whole database.
+        """
+        return {
+            table: await self.tools.get_tables_schema([table], asession, metric_db_id)
+            for table in table_list
+        }
+
+    async def _summarize_table_groups(
+        self,
+        metric_db_id: str,
+        sys_message: str,
+        table_description: str,
+        column_description: str,
+        table_schemas: Dict[str, str],
+        table_fingerprints: Dict[str, str],
+        api_key: str | None,
+    ) -> str:
+        """
+        Split the tables into groups of at most `max_chunk_tokens` tokens, in
+        the order of the table description, and summarize the groups
+        concurrently. Summaries are stored with the fingerprints of their
+        tables, so only the groups that changed are summarized again.
+
+        Returns:
+            The summaries of all the groups.
+        """
+        table_groups: List[List[str]] = []
+        group_tokens = 0
+        for table, table_schema in table_schemas.items():
+            num_tokens = estimate_tokens(table_schema)
+            if not table_groups or group_tokens + num_tokens > self.max_chunk_tokens:
+                table_groups.append([])
+                group_tokens = 0
+            table_groups[-1].append(table)
+            group_tokens += num_tokens
+
+        previous_summaries = self._descriptions[metric_db_id].get("table_groups", {})
+        summaries: Dict[str, Dict[str, Any]] = {}
+        metrics: List[Dict[str, Any]] = []
+        semaphore = asyncio.Semaphore(_MAX_CONCURRENT_CHUNKS)
+
+        async def _summarize(group: List[str]) -> None:
+            """Summarize a group of tables, unless it is unchanged."""
+            group_schema = "\n".join([table_schemas[table] for table in group])
+            group_fingerprint = _fingerprint(
+                [
+                    sys_message,
+                    column_description,
+                    [[table, table_fingerprints[table]] for table in group],
+                ]
+            )
+            group_metrics: Dict[str, Any] = {
+                "tables": group,
+                "num_tokens": estimate_tokens(group_schema),
+                "time": 0.0,
+                "cost": 0.0,
+                "cached": group_fingerprint in previous_summaries,
+            }
+            metrics.append(group_metrics)
+            if group_metrics["cached"]:
+                summaries[group_fingerprint] = previous_summaries[group_fingerprint]
+                return
+
+            system, prompt = generate_table_group_summary_prompt(
+                system_prompt=sys_message,
+                tables_description=filter_table_description(table_description, group),
+                group_schema=group_schema,
+                column_description=column_description,
+            )
+            async with semaphore:
+                start_time = time.time()
+                group_summary = await ask_llm_json(
+                    prompt=prompt,
+                    system_message=system,
+                    llm=self.llm,
+                    temperature=self.temperature,
+                    api_key=api_key,
+                )
+                group_metrics["time"] = time.time() - start_time
+            group_metrics["cost"] = float(group_summary["cost"])
+            _check_response(group_summary, "summary")
+            summaries[group_fingerprint] = {"tables": group, "response": group_summary}
+
+        group_results = await asyncio.gather(
+            *[_summarize(group) for group in table_groups], return_exceptions=True
+        )
+        self.chunk_metrics[metric_db_id] = metrics
+        # Keep the summaries that succeeded even if another group failed
+        self._descriptions[metric_db_id]["table_groups"] = summaries
+        await self._save_store()
+        for group_result in group_results:
+            if isinstance(group_result, Exception):
+                raise group_result
+
+        self.logger.debug(
+            f"Summarized {len(table_groups)} table groups of {metric_db_id}: "
+            f"{metrics}"
+        )
+        return "\n\n".join(
+            [
+                f"Summary of the tables {summary['tables']}:\n"
+                f"{summary['response']['answer']['summary']}"
+                for summary in summaries.values()
+            ]
+        )
+
+    async def _generate_db_description(
+        self,
+        metric_db_id: str,
+        sys_message: str,
+        table_description: str,
+        db_schema: str,
+        column_description: str = "",
+        api_key: str | None = None,
+        previous: Dict | None = None,
+        removed_tables: List[str] | None = None,
+    ) -> Dict:
+        """
+        Ask the LLM for the database description, or to update the previous
+        response given the schema of the changed tables.
+        """
+        if previous is None:
+            system, prompt = generate_description_prompt(
+                system_prompt=sys_message,
+                tables_description=table_description,
+                db_schema=db_schema,
+                column_description=column_description,
+            )
+        else:
+            system, prompt = update_description_prompt(
+                system_prompt=sys_message,
+                previous_description=previous["answer"]["db_description"],
+                tables_description=table_description,
+                changed_schema=db_schema,
+                removed_tables=removed_tables or [],
+                column_description=column_description,
+            )
+        generated_description = await ask_llm_json(
+            prompt=prompt,
+            system_message=system,
+            llm=self.llm,
+            temperature=self.temperature,
+            api_key=api_key,
+        )
+        self.logger.debug(
+            f"Generated description for {metric_db_id}: {generated_description}"
+        )
+        _check_response(generated_description, "db_description")
+        return generated_description
+
+    async def _generate_suggested_questions(
+        self,
+        metric_db_id: str,
+        sys_message: str,
+        table_description: str,
+        db_schema: str,
+        column_description: str | None = None,
+        api_key: str | None = None,
+        previous: Dict | None = None,
+        removed_tables: List[str] | None = None,
+    ) -> Dict:
+        """
+        Ask the LLM for suggested questions, or to update the previous response
+        given the schema of the changed tables.
+        """
+        if previous is None:
             system, prompt = generate_suggested_questions_prompt(
                 system_prompt=sys_message,
                 tables_description=table_description,
                 db_schema=db_schema,
                 column_description=column_description or "",
             )
-            generated_questions = await ask_llm_json(
-                prompt=prompt,
-                system_message=system,
-                llm=self.llm,
-                temperature=self.temperature,
-                api_key=api_key,
-            )
-            self.logger.debug(
-                f"Generated questions for {metric_db_id}:{generated_questions}"
+        else:
+            system, prompt = update_suggested_questions_prompt(
+                system_prompt=sys_message,
+                previous_questions=previous["answer"]["suggested_questions"],
+                tables_description=table_description,
+                changed_schema=db_schema,
+                removed_tables=removed_tables or [],
+                column_description=column_description or "",
             )
-            self._description_cache["suggested_questions"][
-                metric_db_id
-            ] = generated_questions
+        generated_questions = await ask_llm_json(
+            prompt=prompt,
+            system_message=system,
+            llm=self.llm,
+            temperature=self.temperature,
+            api_key=api_key,
+        )
+        self.logger.debug(
+            f"Generated questions for {metric_db_id}:{generated_questions}"
+        )
+        _check_response(generated_questions, "suggested_questions")
+        return generated_questions
 
-        return self._description_cache["suggested_questions"][metric_db_id]["answer"][
-            "suggested_questions"
-        ]
+    @track_time(create_class_attr="timings")
+    async def generate_bulk(
+        self,
+        databases: Dict[str, Dict[str, str]],
+        max_concurrency: int = 4,
+        api_key: str | None = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Generate the descriptions and suggested questions of many databases
+        concurrently. Each database is described on a session leased from the
+        engine registry, and its schema is fetched once for both.
+
+        Args:
+            databases: The databases to describe, as a dictionary from the
+                database id to its "sys_message", "table_description" and
+                (optional) "column_description".
+            max_concurrency: Maximum number of databases described at once.
+                Defaults to 4.
+            api_key: (Optional) API key to use for the LLM calls
+
+        Returns:
+            A dictionary from the database id to its "db_description" and
+            "suggested_questions" (None if their generation failed), and
+            "errors", the error of each failed step ("schema",
+            "db_description" or "suggested_questions").
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+        engine_registry = get_engine_registry()
+
+        async def _describe(metric_db_id: str, database: Dict[str, str]) -> Dict:
+            """Describe a single database, recording the failed steps."""
+            result: Dict[str, Any] = {
+                "db_description": None,
+                "suggested_questions": None,
+                "errors": {},
+            }
+            async with semaphore:
+                try:
+                    async with engine_registry.lease_session(metric_db_id) as asession:
+                        step_errors = await self._update_descriptions(
+                            asession,
+                            metric_db_id,
+                            database["sys_message"],
+                            database["table_description"],
+                            database.get("column_description"),
+                            api_key,
+                            steps=list(STEPS),
+                        )
+                except Exception as e:
+                    self.logger.error(f"Failed to get schema of {metric_db_id}: {e}")
+                    result["errors"]["schema"] = str(e)
+                    return result
+
+            for step in STEPS:
+                if step in step_errors:
+                    self.logger.error(
+                        f"Failed to generate {step} of {metric_db_id}: "
+                        f"{step_errors[step]}"
+                    )
+                    result["errors"][step] = str(step_errors[step])
+                else:
+                    result[step] = self._descriptions[metric_db_id][step]["response"][
+                        "answer"
+                    ][step]
+            if result["suggested_questions"] is not None:
+                self._notify_suggested_questions(
+                    metric_db_id, result["suggested_questions"]
+                )
+            return result
+
+        results = await asyncio.gather(
+            *[
+                _describe(metric_db_id, database)
+                for metric_db_id, database in databases.items()
+            ]
+        )
+        return dict(zip(databases, results))
 
 
 def get_db_descriptor(
-    llm: str = "gpt-4o", temperature: float = 0.1
+    llm: str = "gpt-4o",
+    temperature: float = 0.1,
+    store_path: str | None = None,
+    max_chunk_tokens: int | None = None,
+    on_suggested_questions: Callable[[str, List[str]], Any] | None = None,
 ) -> DatabaseDescriptor:
     """
     Return the DatabaseDescriptor instance.
@@ -152,8 +711,22 @@ def get_db_descriptor(
         llm (str): The name of the LLM model to use. Defaults to "gpt-4o".
         temperature (float): The temperature to use when generating descriptions.
             Defaults to 0.1.
+        store_path (str | None): (Optional) The JSON file the descriptions are
+            persisted to. Defaults to None.
+        max_chunk_tokens (int | None): (Optional) Describe databases whose schema
+            is larger than this many tokens from summaries of table groups.
+            Defaults to None.
+        on_suggested_questions (Callable | None): (Optional) Called with the
+            database id and its suggested questions whenever they change.
+            Defaults to None.
     """
     global _db_descriptor_instance
     if _db_descriptor_instance is None:
-        _db_descriptor_instance = DatabaseDescriptor(llm=llm, temperature=temperature)
+        _db_descriptor_instance = DatabaseDescriptor(
+            llm=llm,
+            temperature=temperature,
+            store_path=store_path,
+            max_chunk_tokens=max_chunk_tokens,
+            on_suggested_questions=on_suggested_questions,
+        )
     return _db_descriptor_instance
@@ -84,3 +84,142 @@ def generate_suggested_questions_prompt(
     """
 
     return system, prompt
+
+
+def update_description_prompt(
+    system_prompt: str,
+    previous_description: str,
+    tables_description: str,
+    changed_schema: str,
+    removed_tables: list[str],
+    column_description: str = "",
+) -> tuple[str, str]:
+    """
+    Create prompt to update a DB description after some tables changed
+    """
+    system, _ = generate_description_prompt(system_prompt, "", "")
+    prompt = f"""
+    ===== User input description =====
+    {system_prompt}
+
+    ===== Previous database description =====
+    {previous_description}
+
+    ===== Database tables =====
+    {tables_description}
+
+    ===== Database columns (may be empty)=====
+    {column_description}
+
+    ===== Schema of the tables added or changed since =====
+    {changed_schema}
+
+    ===== Tables removed since (may be empty) =====
+    {removed_tables}
+
+
+    ==== Database Description ====
+    The database has changed since the previous description was written.
+    UPDATE the previous description so that it reflects the added, changed and
+    removed tables. Keep the parts of the description that are still accurate.
+    The description must still answer the following questions:
+    What type of information is present in the database?
+    What information is NOT in the database?
+
+    ==== Answer Format ====
+    python parsable json with key "db_description" and a string as the description.
+    """
+
+    return system, prompt
+
+
+def update_suggested_questions_prompt(
+    system_prompt: str,
+    previous_questions: list[str],
+    tables_description: str,
+    changed_schema: str,
+    removed_tables: list[str],
+    column_description: str = "",
+) -> tuple[str, str]:
+    """
+    Create prompt to update suggested questions after some tables changed
+    """
+    system, _ = generate_suggested_questions_prompt(system_prompt, "", "")
+    prompt = f"""
+    ===== User input description =====
+    {system_prompt}
+
+    ===== Previous suggested questions =====
+    {previous_questions}
+
+    ===== Database tables =====
+    {tables_description}
+
+    ===== Database columns (may be empty)=====
+    {column_description}
+
+    ===== Schema of the tables added or changed since =====
+    {changed_schema}
+
+    ===== Tables removed since (may be empty) =====
+    {removed_tables}
+
+
+    ==== Suggested Questions ====
+    The database has changed since the previous questions were suggested.
+    Provide an updated list of 5 questions: keep the previous questions that
+    can still be answered using the information available in the database, and
+    replace the others with NEW QUESTIONS, preferably about the added or changed
+    tables.
+    These questions should be SIMPLE, and NOT ask for correlation, relationship, etc.
+    Direct comparisons between datapoints or aggregated data are allowed.
+
+    ==== Answer Format ====
+    python parsable json with key "suggested_questions" and list of questions
+    as a string.
+    """
+
+    return system, prompt
+
+
+def generate_table_group_summary_prompt(
+    system_prompt: str,
+    tables_description: str,
+    group_schema: str,
+    column_description: str = "",
+) -> tuple[str, str]:
+    """
+    Create prompt to summarize a group of tables of a large database
+    """
+    system = """
+    You are an expert in semantics and contextualization.
+    Summarize the information available in a group of tables of a larger
+    database, do NOT provide specific numbers.
+    Be clear and concise, and write a summary with 150 WORDS OR LESS.
+    """
+    prompt = f"""
+    ===== User input description =====
+    {system_prompt}
+
+    ===== Tables in this group =====
+    {tables_description}
+
+    ===== Database columns (may be empty)=====
+    {column_description}
+
+    ===== Schema of the tables in this group =====
+    {group_schema}
+
+
+    ==== Summary ====
+    Based on the user input description, tables, columns and schema, produce a SUMMARY
+    of this group of tables that answers the following questions:
+    What type of information is present in these tables, and at what level of detail
+    (e.g. per district, per month)?
+    Which columns can be used to filter or join these tables?
+
+    ==== Answer Format ====
+    python parsable json with key "summary" and a string as the summary.
+    """
+
+    return system, prompt
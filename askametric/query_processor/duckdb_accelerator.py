@@ -0,0 +1,513 @@
+import asyncio
+import os
+import sqlite3
+from contextlib import closing
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from ..utils import track_time
+from .columnar_result import ColumnarResult, estimate_size
+from .json_columns import discover_json_paths, json_path_expression
+from .result_cache import SQLResultCache
+from .tools import SQLTimeoutError, SQLTools
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+_duckdb_accelerator_instance = None
+
+
+def _row_type(column_names: List[str]) -> type:
+    """
+    Create a tuple type whose instances expose the column names as `_fields`,
+    like the SQLAlchemy rows returned by `SQLTools.run_sql`.
+    """
+    return type(
+        "DuckDBRow", (tuple,), {"__slots__": (), "_fields": tuple(column_names)}
+    )
+
+
+def _quote_identifier(name: str) -> str:
+    """Quote a table or column name for SQLite and DuckDB."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _get_sqlite_column_types(
+    sqlite_connection: sqlite3.Connection, table: str, columns: List[str]
+) -> List[str]:
+    """
+    Return the DuckDB type of each column of a SQLite table, from the storage
+    classes of its values. SQLite columns may mix storage classes, which are
+    mirrored as VARCHAR.
+    """
+    storage_classes = sqlite_connection.execute(
+        "SELECT "
+        + ", ".join(
+            [
+                f"GROUP_CONCAT(DISTINCT typeof({_quote_identifier(column)}))"
+                for column in columns
+            ]
+        )
+        + f" FROM {_quote_identifier(table)}"
+    ).fetchone()
+
+    column_types = []
+    for column_storage_classes in storage_classes:
+        classes = set((column_storage_classes or "").split(",")) - {"", "null"}
+        if classes == {"integer"}:
+            column_types.append("BIGINT")
+        elif classes and classes <= {"integer", "real"}:
+            column_types.append("DOUBLE")
+        elif classes == {"blob"}:
+            column_types.append("BLOB")
+        else:
+            column_types.append("VARCHAR")
+    return column_types
+
+
+def _source_version(source_paths: List[str]) -> str:
+    """Return the modification time and size of the source files."""
+    stats = [os.stat(path) for path in source_paths]
+    return "/".join([f"{stat.st_mtime_ns}-{stat.st_size}" for stat in stats])
+
+
+class DuckDBAccelerator:
+    """
+    Mirrors SQLite and CSV metric databases into in-process DuckDB databases,
+    and runs analytical queries and column profiling on the mirrors.
+
+    DuckDB is a columnar engine, so the whole-table GROUP BY / COUNT / AVG
+    queries the pipeline generates run much faster there than on SQLite row
+    stores. Each mirror remembers the version (modification time and size) of
+    its source files and is rebuilt when they change.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the DuckDBAccelerator class."""
+        if duckdb is None:
+            raise ImportError(
+                "The DuckDB accelerator requires duckdb. "
+                "Install it with `pip install askametric[duckdb]`."
+            )
+        self._max_sql_response_length = 20000
+        self._response_too_long_message = "Sorry, SQL response was too long"
+        self._max_sql_response_rows = 1000
+        self._sql_fetch_size = 100
+        self._mirror_batch_size = 50_000
+        self._json_sample_size = 100
+        self._sql_timeout_seconds: float | None = 30
+        self.result_cache = SQLResultCache()
+        self._sources: Dict[str, Dict[str, Any]] = {}
+        self._mirrors: Dict[str, Dict[str, Any]] = {}
+        self._refresh_locks: Dict[str, asyncio.Lock] = {}
+
+    def register_sqlite(self, metric_db_id: str, database_path: str) -> None:
+        """
+        Register a SQLite metric database to mirror into DuckDB.
+
+        Args:
+            metric_db_id (str): The database id.
+            database_path (str): The path to the SQLite database file.
+        """
+        self._register(metric_db_id, "sqlite", {"": os.path.abspath(database_path)})
+
+    def register_csv(self, metric_db_id: str, csv_paths: Dict[str, str]) -> None:
+        """
+        Register a metric database made of CSV files to load into DuckDB.
+
+        Args:
+            metric_db_id (str): The database id.
+            csv_paths (dict[str, str]): The path of the CSV file of each table.
+        """
+        self._register(
+            metric_db_id,
+            "csv",
+            {table: os.path.abspath(path) for table, path in csv_paths.items()},
+        )
+
+    def _register(self, metric_db_id: str, source_type: str, paths: Dict) -> None:
+        """Register the source files of a metric database."""
+        for path in paths.values():
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Source file not found: {path}")
+        self._sources[metric_db_id] = {"type": source_type, "paths": paths}
+        self.close(metric_db_id)
+        self._refresh_locks[metric_db_id] = asyncio.Lock()
+
+    def is_registered(self, metric_db_id: str) -> bool:
+        """Check whether a metric database is registered."""
+        return metric_db_id in self._sources
+
+    def is_stale(self, metric_db_id: str) -> bool:
+        """
+        Check whether the mirror of a metric database is missing or older than
+        its source files.
+
+        Args:
+            metric_db_id (str): The database id.
+        """
+        mirror = self._mirrors.get(metric_db_id)
+        if mirror is None:
+            return True
+        source_paths = list(self._sources[metric_db_id]["paths"].values())
+        return mirror["version"] != _source_version(source_paths)
+
+    def _build_mirror(self, metric_db_id: str) -> Dict[str, Any]:
+        """
+        Load the source files of a metric database into a new DuckDB database.
+        SQLite tables are streamed in batches, so that a table is never fully
+        loaded in memory outside of DuckDB.
+        """
+        source = self._sources[metric_db_id]
+        source_paths = list(source["paths"].values())
+        version = _source_version(source_paths)
+
+        connection = duckdb.connect(":memory:")
+        if source["type"] == "csv":
+            for table, path in source["paths"].items():
+                connection.execute(
+                    f'CREATE TABLE "{table}" AS SELECT * FROM read_csv_auto(?)',
+                    [path],
+                )
+        else:
+            with closing(
+                sqlite3.connect(f"file:{source_paths[0]}?mode=ro", uri=True)
+            ) as sqlite_connection:
+                tables = [
+                    row[0]
+                    for row in sqlite_connection.execute(
+                        "SELECT name FROM sqlite_master WHERE type = 'table' "
+                        "AND name NOT LIKE 'sqlite_%'"
+                    )
+                ]
+                for table in tables:
+                    self._mirror_sqlite_table(sqlite_connection, connection, table)
+
+        # Generated queries may only read the mirrored tables, not files or
+        # URLs, and cannot turn external access back on
+        connection.execute("SET enable_external_access = false")
+        connection.execute("SET lock_configuration = true")
+
+        # Number of queries running on the mirror, and whether it was replaced
+        return {
+            "connection": connection,
+            "version": version,
+            "active": 0,
+            "retired": False,
+        }
+
+    def _mirror_sqlite_table(
+        self, sqlite_connection: sqlite3.Connection, connection: Any, table: str
+    ) -> None:
+        """Copy a SQLite table into a DuckDB database, in batches."""
+        quoted_table = _quote_identifier(table)
+        columns = [
+            row[1]
+            for row in sqlite_connection.execute(f"PRAGMA table_info({quoted_table})")
+        ]
+        column_types = _get_sqlite_column_types(sqlite_connection, table, columns)
+        connection.execute(
+            f"CREATE TABLE {quoted_table} ("
+            + ", ".join(
+                [
+                    f"{_quote_identifier(column)} {column_type}"
+                    for column, column_type in zip(columns, column_types)
+                ]
+            )
+            + ")"
+        )
+        varchar_columns = [
+            column
+            for column, column_type in zip(columns, column_types)
+            if column_type == "VARCHAR"
+        ]
+
+        sqlite_cursor = sqlite_connection.execute(f"SELECT * FROM {quoted_table}")
+        while batch := sqlite_cursor.fetchmany(self._mirror_batch_size):
+            batch_df = pd.DataFrame.from_records(batch, columns=columns)
+            # Columns mixing storage classes are mirrored as text
+            for column in varchar_columns:
+                batch_df[column] = batch_df[column].map(
+                    lambda value: value if value is None else str(value)
+                )
+            connection.register("_source_batch", batch_df)
+            connection.execute(
+                f"INSERT INTO {quoted_table} SELECT * FROM _source_batch"
+            )
+            connection.unregister("_source_batch")
+
+    def _retire_mirror(self, mirror: Dict[str, Any]) -> None:
+        """
+        Close a replaced mirror once the queries still running on it are done.
+        """
+        mirror["retired"] = True
+        if mirror["active"] == 0:
+            mirror["connection"].close()
+
+    def _release_mirror(self, mirror: Dict[str, Any]) -> None:
+        """Mark a query on a mirror as done, closing the mirror if retired."""
+        mirror["active"] -= 1
+        if mirror["retired"] and mirror["active"] == 0:
+            mirror["connection"].close()
+
+    async def refresh(self, metric_db_id: str) -> None:
+        """
+        Rebuild the mirror of a metric database if it is stale. Queries already
+        running keep using the previous mirror, which is closed once they are
+        done.
+
+        Args:
+            metric_db_id (str): The database id.
+        """
+        async with self._refresh_locks[metric_db_id]:
+            if not self.is_stale(metric_db_id):
+                return
+            mirror = await asyncio.to_thread(self._build_mirror, metric_db_id)
+            previous_mirror = self._mirrors.get(metric_db_id)
+            self._mirrors[metric_db_id] = mirror
+            if previous_mirror is not None:
+                self._retire_mirror(previous_mirror)
+
+    async def _execute(
+        self,
+        metric_db_id: str,
+        fetch: Any,
+        timeout: float | None,
+    ) -> Any:
+        """
+        Run `fetch(cursor)` on a new cursor of the (refreshed) mirror in a
+        worker thread, interrupting it after `timeout` seconds or if the caller
+        is cancelled.
+        """
+        await self.refresh(metric_db_id)
+        mirror = self._mirrors[metric_db_id]
+        cursor = mirror["connection"].cursor()
+        mirror["active"] += 1
+        if timeout is None:
+            timeout = self._sql_timeout_seconds
+
+        def _fetch_and_close() -> Any:
+            """Run `fetch` and close the cursor in the worker thread."""
+            try:
+                return fetch(cursor)
+            finally:
+                cursor.close()
+
+        def _abandon() -> None:
+            """Interrupt the query, which is left to finish in its thread."""
+            cursor.interrupt()
+            # Retrieve the interruption error of the abandoned query
+            fetch_task.add_done_callback(
+                lambda task: task.cancelled() or task.exception()
+            )
+
+        fetch_task = asyncio.ensure_future(asyncio.to_thread(_fetch_and_close))
+        fetch_task.add_done_callback(lambda _: self._release_mirror(mirror))
+        try:
+            return await asyncio.wait_for(asyncio.shield(fetch_task), timeout or None)
+        except asyncio.TimeoutError:
+            _abandon()
+            raise SQLTimeoutError(
+                f"SQL query exceeded the statement timeout of {timeout}s"
+            )
+        except asyncio.CancelledError:
+            _abandon()
+            raise
+
+    @track_time(create_class_attr="timings")
+    async def run_sql(
+        self,
+        sql_query: str,
+        metric_db_id: str,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        timeout: float | None = None,
+        normalized_sql_query: str | None = None,
+        columnar: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Runs a DuckDB SQL query on the mirror of a metric database. The result
+        has the same shape as the result of `SQLTools.run_sql`.
+
+        Args:
+            sql_query (str): The SQL query to execute.
+            metric_db_id (str): The database id.
+            max_rows (int | None): (Optional) Maximum number of rows to return.
+            max_bytes (int | None): (Optional) Maximum size of the returned rows,
+                measured as the length of their string representation.
+            timeout (float | None): (Optional) Query timeout in seconds.
+            normalized_sql_query (str | None): (Optional) The normalized query
+                text used as cache key. Defaults to `sql_query`.
+            columnar (bool): If True, the rows are returned as a
+                ColumnarResult (default is False).
+
+        Returns:
+            dict[str, Any]: A dictionary with the returned "rows", whether the
+                rows were "truncated", and the "total_rows_estimate" of the
+                full result (a lower bound if it was truncated).
+        """
+        max_rows = max_rows or self._max_sql_response_rows
+        max_bytes = max_bytes or self._max_sql_response_length
+
+        def _fetch_rows(cursor: Any) -> Dict[str, Any]:
+            """Fetch rows until the result or a budget is exhausted."""
+            cursor.execute(sql_query)
+            column_names = [column[0] for column in cursor.description]
+            row_type = _row_type(column_names)
+            rows: List[tuple] = []
+            num_bytes = 0
+            truncated = False
+            while not truncated:
+                batch = cursor.fetchmany(self._sql_fetch_size)
+                if not batch:
+                    break
+                for row in batch:
+                    num_bytes += estimate_size(row)
+                    if len(rows) >= max_rows or num_bytes > max_bytes:
+                        truncated = True
+                        break
+                    rows.append(row_type(row))
+
+            return {
+                "rows": (
+                    ColumnarResult.from_rows(rows, column_names) if columnar else rows
+                ),
+                "truncated": truncated,
+                # As in SQLTools.run_sql, a lower bound if truncated
+                "total_rows_estimate": len(rows) + 1 if truncated else len(rows),
+            }
+
+        await self.refresh(metric_db_id)
+        data_version = self._mirrors[metric_db_id]["version"]
+        cache_key = (
+            metric_db_id,
+            normalized_sql_query or sql_query.strip(),
+            max_rows,
+            max_bytes,
+            columnar,
+        )
+        cached_result = self.result_cache.get(cache_key, data_version)
+        if cached_result is not None:
+            return cached_result
+
+        result = await self._execute(metric_db_id, _fetch_rows, timeout)
+        self.result_cache.set(
+            cache_key, data_version, result, size=estimate_size(result["rows"])
+        )
+        return result
+
+    @track_time(create_class_attr="timings")
+    @SQLTools.handle_sql_response_length
+    async def get_common_column_values(
+        self,
+        metric_db_id: str,
+        table_column_dict: Dict[str, List[str]],
+        num_common_values: int,
+        indicator_vars: list,
+        timeout: float | None = None,
+    ) -> Dict[str, Dict]:
+        """
+        Returns the top k (=num_common_values) most common values of the
+        columns, computed on the mirror of a metric database. The result has
+        the same shape as the result of `SQLTools.get_common_column_values`:
+        JSON columns are profiled per key path, as "column.key" virtual columns.
+
+        Args:
+            metric_db_id (str): The database id.
+            table_column_dict (dict[str, list[str]]): The table names and the
+                column names of each table.
+            num_common_values (int): The number of common values to return.
+            indicator_vars (list): The indicator variables, whose values are
+                all returned.
+            timeout (float | None): (Optional) Timeout in seconds of each query.
+
+        Returns:
+            dict[str, dict]: The top common values of each table column.
+        """
+        indicator_vars_lower = [var.lower() for var in indicator_vars]
+
+        def _fetch_column_values(table: str, column: str) -> Any:
+            """Return a function fetching the most common values of a column."""
+
+            def _expression_values(cursor: Any, name: str, expression: str) -> list:
+                """Fetch the most common values of an expression."""
+                query = (
+                    f'SELECT {expression}, COUNT(*) FROM "{table}" '
+                    f"GROUP BY {expression} ORDER BY COUNT(*) DESC"
+                )
+                if name.lower() not in indicator_vars_lower:
+                    query += f" LIMIT {num_common_values}"
+                return cursor.execute(query).fetchall()
+
+            def _fetch(cursor: Any) -> Dict[str, list]:
+                """Profile a column, or each key path of a JSON column."""
+                if "." in column:
+                    # "column.key" virtual columns of JSON columns
+                    json_column, path = column.split(".", 1)
+                    expression = json_path_expression(json_column, path, "duckdb")
+                    return {column: _expression_values(cursor, column, expression)}
+
+                sample = cursor.execute(
+                    f'SELECT "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL '
+                    f"LIMIT {self._json_sample_size}"
+                ).fetchall()
+                json_paths = discover_json_paths([row[0] for row in sample])
+                if json_paths:
+                    return {
+                        f"{column}.{path}": _expression_values(
+                            cursor,
+                            f"{column}.{path}",
+                            json_path_expression(column, path, "duckdb"),
+                        )
+                        for path, _ in json_paths
+                    }
+                return {column: _expression_values(cursor, column, f'"{column}"')}
+
+            return _fetch
+
+        table_columns = [
+            (table, column)
+            for table, columns in table_column_dict.items()
+            for column in columns
+        ]
+        column_values = await asyncio.gather(
+            *[
+                self._execute(
+                    metric_db_id, _fetch_column_values(table, column), timeout
+                )
+                for table, column in table_columns
+            ]
+        )
+
+        result: Dict[str, Dict] = {table: {} for table in table_column_dict}
+        for (table, _), values in zip(table_columns, column_values):
+            result[table].update(values)
+        return result
+
+    def close(self, metric_db_id: str | None = None) -> None:
+        """
+        Close the mirror of a metric database, or all mirrors. Queries still
+        running on a mirror are left to finish before it is closed.
+
+        Args:
+            metric_db_id (str | None): (Optional) The database id. If None,
+                all mirrors are closed.
+        """
+        metric_db_ids = (
+            [metric_db_id] if metric_db_id is not None else list(self._mirrors)
+        )
+        for db_id in metric_db_ids:
+            mirror = self._mirrors.pop(db_id, None)
+            if mirror is not None:
+                self._retire_mirror(mirror)
+
+
+def get_duckdb_accelerator() -> DuckDBAccelerator:
+    """Return the DuckDBAccelerator instance."""
+    global _duckdb_accelerator_instance
+    if _duckdb_accelerator_instance is None:
+        _duckdb_accelerator_instance = DuckDBAccelerator()
+    return _duckdb_accelerator_instance
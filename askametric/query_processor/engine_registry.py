@@ -0,0 +1,254 @@
+import os
+import sqlite3
+import time
+from contextlib import asynccontextmanager, closing
+from typing import Any, AsyncIterator
+
+from sqlalchemy import event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.pool import QueuePool
+
+_engine_registry_instance = None
+
+# Statements that make every new connection read-only, per dialect
+_READ_ONLY_STATEMENTS = {
+    "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+    "mysql": "SET SESSION TRANSACTION READ ONLY",
+    "mariadb": "SET SESSION TRANSACTION READ ONLY",
+    "sqlite": "PRAGMA query_only = ON",
+}
+
+
+class EngineRegistry:
+    """
+    Owns one tuned async engine (and connection pool) per metric database and
+    leases sessions from it.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the EngineRegistry class."""
+        self._engines: dict[str, AsyncEngine] = {}
+        self._pool_sizes: dict[str, int] = {}
+        self._lease_stats: dict[str, dict[str, float]] = {}
+
+    def register(
+        self,
+        metric_db_id: str,
+        url: str,
+        pool_size: int = 5,
+        max_overflow: int = 5,
+        pool_timeout: float = 30,
+        pool_recycle: int = 60 * 30,
+        pool_pre_ping: bool = True,
+        read_only: bool = True,
+        **engine_kwargs: Any,
+    ) -> AsyncEngine:
+        """
+        Create the engine of a metric database, or return it if it already
+        exists.
+
+        Args:
+            metric_db_id (str): The database id.
+            url (str): The SQLAlchemy URL of the database, with an async driver.
+            pool_size (int): Number of connections kept open in the pool.
+            max_overflow (int): Number of connections allowed above `pool_size`.
+            pool_timeout (float): Seconds to wait for a free connection.
+            pool_recycle (int): Seconds after which connections are recycled.
+            pool_pre_ping (bool): Whether to check connections before use.
+            read_only (bool): Whether to make every connection read-only.
+            engine_kwargs: Other keyword arguments for `create_async_engine`.
+        """
+        if metric_db_id in self._engines:
+            return self._engines[metric_db_id]
+
+        pool_kwargs: dict[str, Any] = {}
+        database_url = make_url(url)
+        if not (
+            database_url.get_backend_name() == "sqlite"
+            and database_url.database in (None, "", ":memory:")
+        ):
+            # In-memory SQLite databases use a single static connection
+            pool_kwargs = {
+                "pool_size": pool_size,
+                "max_overflow": max_overflow,
+                "pool_timeout": pool_timeout,
+            }
+
+        engine = create_async_engine(
+            database_url,
+            pool_pre_ping=pool_pre_ping,
+            pool_recycle=pool_recycle,
+            **pool_kwargs,
+            **engine_kwargs,
+        )
+
+        if read_only:
+            read_only_statement = _READ_ONLY_STATEMENTS.get(engine.dialect.name)
+            if read_only_statement is not None:
+
+                @event.listens_for(engine.sync_engine, "connect")
+                def _set_read_only(dbapi_connection: Any, _: Any) -> None:
+                    """Make the new connection read-only."""
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute(read_only_statement)
+                    cursor.close()
+
+        self._engines[metric_db_id] = engine
+        self._pool_sizes[metric_db_id] = pool_size + max_overflow
+        self._lease_stats[metric_db_id] = {"leases": 0, "wait_time": 0.0}
+        return engine
+
+    def register_sqlite_readers(
+        self,
+        metric_db_id: str,
+        database_path: str,
+        num_readers: int = 4,
+        immutable: bool = False,
+        wal: bool = False,
+        **engine_kwargs: Any,
+    ) -> AsyncEngine:
+        """
+        Create a pool of read-only reader connections to a SQLite metric
+        database, or return it if it already exists.
+
+        aiosqlite runs each connection on its own background thread, so
+        sessions leased from this pool run their queries in parallel instead
+        of queuing behind each other on a single connection.
+
+        Args:
+            metric_db_id (str): The database id.
+            database_path (str): The path to the SQLite database file.
+            num_readers (int): Number of reader connections.
+            immutable (bool): Whether to open the file as immutable, which
+                skips all locking. Only safe if nothing writes to the file
+                while it is open.
+            wal (bool): Whether to switch the file to write-ahead logging
+                first, so that readers are not blocked by a writer. The
+                journal mode is stored in the file, so this changes it for
+                every other user of the file too. Ignored if `immutable` is
+                True. Defaults to False, leaving the journal mode unchanged.
+            engine_kwargs: Other keyword arguments for `create_async_engine`.
+        """
+        if metric_db_id in self._engines:
+            return self._engines[metric_db_id]
+
+        database_path = os.path.abspath(database_path)
+        if not os.path.exists(database_path):
+            raise FileNotFoundError(f"SQLite database not found: {database_path}")
+        if wal and not immutable:
+            _enable_sqlite_wal(database_path)
+
+        uri_params = "mode=ro&immutable=1" if immutable else "mode=ro"
+        url = f"sqlite+aiosqlite:///file:{database_path}?{uri_params}&uri=true"
+        return self.register(
+            metric_db_id,
+            url,
+            pool_size=num_readers,
+            max_overflow=0,
+            **engine_kwargs,
+        )
+
+    def get_engine(self, metric_db_id: str) -> AsyncEngine:
+        """
+        Return the engine of a registered metric database.
+
+        Args:
+            metric_db_id (str): The database id.
+        """
+        if metric_db_id not in self._engines:
+            raise KeyError(f"No engine registered for metric database {metric_db_id}")
+        return self._engines[metric_db_id]
+
+    def is_registered(self, metric_db_id: str) -> bool:
+        """Check whether a metric database has an engine."""
+        return metric_db_id in self._engines
+
+    @asynccontextmanager
+    async def lease_session(self, metric_db_id: str) -> AsyncIterator[AsyncSession]:
+        """
+        Lease a session on a pooled connection of a metric database. The
+        connection is returned to the pool when the context exits.
+
+        Args:
+            metric_db_id (str): The database id.
+        """
+        engine = self.get_engine(metric_db_id)
+        lease_stats = self._lease_stats[metric_db_id]
+
+        async with AsyncSession(engine, expire_on_commit=False) as asession:
+            start_time = time.time()
+            # Check out the connection now, to measure the pool wait time
+            await asession.connection()
+            lease_stats["wait_time"] += time.time() - start_time
+            lease_stats["leases"] += 1
+            yield asession
+
+    def pool_metrics(self, metric_db_id: str) -> dict[str, Any]:
+        """
+        Return the pool saturation metrics of a metric database.
+
+        Args:
+            metric_db_id (str): The database id.
+        """
+        pool = self.get_engine(metric_db_id).pool
+        lease_stats = self._lease_stats[metric_db_id]
+        metrics: dict[str, Any] = {
+            "leases": int(lease_stats["leases"]),
+            "mean_wait_time": (
+                lease_stats["wait_time"] / lease_stats["leases"]
+                if lease_stats["leases"]
+                else 0.0
+            ),
+        }
+        if isinstance(pool, QueuePool):
+            metrics.update(
+                {
+                    "pool_size": pool.size(),
+                    "checked_out": pool.checkedout(),
+                    "checked_in": pool.checkedin(),
+                    "overflow": pool.overflow(),
+                    "saturation": pool.checkedout() / self._pool_sizes[metric_db_id],
+                }
+            )
+        return metrics
+
+    async def dispose(self, metric_db_id: str | None = None) -> None:
+        """
+        Dispose of the engine of a metric database, or of all engines.
+
+        Args:
+            metric_db_id (str | None): (Optional) The database id. If None,
+                all engines are disposed of.
+        """
+        metric_db_ids = (
+            [metric_db_id] if metric_db_id is not None else list(self._engines)
+        )
+        for db_id in metric_db_ids:
+            engine = self._engines.pop(db_id, None)
+            self._pool_sizes.pop(db_id, None)
+            self._lease_stats.pop(db_id, None)
+            if engine is not None:
+                await engine.dispose()
+
+
+def _enable_sqlite_wal(database_path: str) -> None:
+    """
+    Switch a SQLite database file to write-ahead logging. The journal mode is
+    persistent, so this is a no-op for files already in WAL mode. Read-only
+    files are left as they are.
+    """
+    try:
+        with closing(sqlite3.connect(database_path)) as connection:
+            journal_mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+            if journal_mode.lower() != "wal":
+                connection.execute("PRAGMA journal_mode = WAL")
+    except sqlite3.OperationalError:
+        pass
+
+
+def get_engine_registry() -> EngineRegistry:
+    """Return the EngineRegistry instance."""
+    global _engine_registry_instance
+    if _engine_registry_instance is None:
+        _engine_registry_instance = EngineRegistry()
+    return _engine_registry_instance
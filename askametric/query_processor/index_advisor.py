@@ -0,0 +1,391 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List
+
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError
+
+from .query_log import QueryLog
+from .sql_rewriter import get_sqlglot_dialect
+
+# Fraction of the execution time of a query assumed to be saved by an index on
+# its filter (or join) columns, and by a pre-computed aggregate it can read from
+INDEX_TIME_SAVED_FRACTION = 0.8
+AGGREGATE_TIME_SAVED_FRACTION = 0.95
+
+# Longest identifier accepted by all supported dialects (PostgreSQL: 63)
+_MAX_IDENTIFIER_LENGTH = 63
+
+_EQUALITY_PREDICATES = (exp.EQ, exp.In, exp.Is)
+_RANGE_PREDICATES = (exp.GT, exp.GTE, exp.LT, exp.LTE, exp.Between, exp.Like)
+
+
+def _identifier(name: str, dialect: str | None) -> str:
+    """Quote an identifier for a dialect if needed."""
+    return exp.to_identifier(name).sql(dialect=dialect)
+
+
+def _table_identifier(table: str, dialect: str | None) -> str:
+    """Quote a (schema-qualified) table name for a dialect if needed."""
+    return ".".join([_identifier(part, dialect) for part in table.split(".")])
+
+
+def _qualified_name(table: exp.Table) -> str:
+    """Return the name of a table with its schema (and catalog), if given."""
+    return ".".join([part for part in (table.catalog, table.db, table.name) if part])
+
+
+def _object_name(prefix: str, table: str, columns: Iterable[str]) -> str:
+    """Name an index or aggregate after its table and columns."""
+    name = re.sub(r"\W+", "_", f"{prefix}_{table}_{'_'.join(columns)}").lower()
+    return name[:_MAX_IDENTIFIER_LENGTH].rstrip("_")
+
+
+def _unique(values: Iterable[str]) -> List[str]:
+    """Deduplicate values, keeping their order."""
+    return list(dict.fromkeys(values))
+
+
+class _SelectScope:
+    """The tables of a SELECT and how its columns resolve to them."""
+
+    def __init__(self, select: exp.Select, best_columns: Dict[str, List[str]]):
+        """Collect the tables (and their aliases) read by a SELECT."""
+        self.select = select
+        self.best_columns = best_columns
+        self.tables: Dict[str, str] = {}
+        # The FROM clause is stored under "from_" in recent sqlglot versions
+        from_clause = select.args.get("from_") or select.args.get("from")
+        sources = [from_clause.this] if from_clause is not None else []
+        sources += [join.this for join in select.args.get("joins") or []]
+        for source in sources:
+            if isinstance(source, exp.Table):
+                self.tables[source.alias_or_name] = _qualified_name(source)
+
+    def resolve(self, column: exp.Column) -> str | None:
+        """Return the table of a column, or None if it cannot be resolved."""
+        if column.table:
+            return self.tables.get(column.table)
+        table_names = _unique(self.tables.values())
+        if len(table_names) == 1:
+            return table_names[0]
+        # Fall back on the columns chosen for the question
+        candidates = [
+            table
+            for table in table_names
+            if column.name in self._best_columns_of(table)
+        ]
+        return candidates[0] if len(candidates) == 1 else None
+
+    def _best_columns_of(self, table: str) -> List[str]:
+        """Return the columns chosen for a table, qualified by its schema or not."""
+        if table in self.best_columns:
+            return self.best_columns[table]
+        return self.best_columns.get(table.split(".")[-1], [])
+
+    def columns_of(self, expression: exp.Expression) -> List[tuple[str, str]]:
+        """Return the (table, column) pairs an expression refers to."""
+        pairs = []
+        for column in expression.find_all(exp.Column):
+            table = self.resolve(column)
+            if table is not None:
+                pairs.append((table, column.name))
+        return pairs
+
+
+def analyze_select(
+    select: exp.Select, best_columns: Dict[str, List[str]]
+) -> Dict[str, Any]:
+    """
+    Extract the columns a SELECT filters, joins and groups on.
+
+    Args:
+        select (exp.Select): The parsed SELECT.
+        best_columns (dict[str, list[str]]): The columns chosen per table,
+            used to resolve unqualified columns when several tables are read.
+
+    Returns:
+        dict[str, Any]: The "tables" read, and per table the "equality_columns"
+            and "range_columns" filtered on, the "join_columns", the
+            "group_columns", and the "aggregates" of the projection.
+    """
+    scope = _SelectScope(select, best_columns)
+    analysis: Dict[str, Any] = {
+        "tables": _unique(scope.tables.values()),
+        "equality_columns": defaultdict(list),
+        "range_columns": defaultdict(list),
+        "join_columns": defaultdict(list),
+        "group_columns": defaultdict(list),
+        "aggregates": [],
+    }
+
+    where = select.args.get("where")
+    if where is not None:
+        for predicate in where.find_all(*_EQUALITY_PREDICATES, *_RANGE_PREDICATES):
+            pairs = scope.columns_of(predicate)
+            if len(pairs) == 1:
+                kind = (
+                    "equality_columns"
+                    if isinstance(predicate, _EQUALITY_PREDICATES)
+                    else "range_columns"
+                )
+                analysis[kind][pairs[0][0]].append(pairs[0][1])
+            elif len(pairs) == 2 and isinstance(predicate, exp.EQ):
+                # Join condition written in the WHERE clause
+                for table, column in pairs:
+                    analysis["join_columns"][table].append(column)
+
+    for join in select.args.get("joins") or []:
+        on = join.args.get("on")
+        if on is None:
+            continue
+        for predicate in on.find_all(exp.EQ):
+            for table, column in scope.columns_of(predicate):
+                analysis["join_columns"][table].append(column)
+
+    group = select.args.get("group")
+    if group is not None:
+        for group_expression in group.expressions:
+            if isinstance(group_expression, exp.Literal) and group_expression.is_int:
+                # GROUP BY 1 refers to the first projection
+                position = int(group_expression.name) - 1
+                if position < len(select.expressions):
+                    group_expression = select.expressions[position]
+            for table, column in scope.columns_of(group_expression):
+                analysis["group_columns"][table].append(column)
+
+        analysis["aggregates"] = [
+            projection.unalias()
+            for projection in select.expressions
+            if projection.find(exp.AggFunc) is not None
+        ]
+
+    for kind in ("equality_columns", "range_columns", "join_columns", "group_columns"):
+        analysis[kind] = {
+            table: _unique(columns) for table, columns in analysis[kind].items()
+        }
+    return analysis
+
+
+def _index_ddl(name: str, table: str, columns: List[str], db_type: str) -> str:
+    """Render the CREATE INDEX statement of a dialect."""
+    dialect = get_sqlglot_dialect(db_type)
+    if_not_exists = "" if dialect == "mysql" else "IF NOT EXISTS "
+    column_list = ", ".join([_identifier(column, dialect) for column in columns])
+    return (
+        f"CREATE INDEX {if_not_exists}{_identifier(name, dialect)} "
+        f"ON {_table_identifier(table, dialect)} ({column_list});"
+    )
+
+
+def _aggregate_ddl(
+    name: str,
+    table: str,
+    group_columns: List[str],
+    aggregates: List[exp.Expression],
+    db_type: str,
+) -> str:
+    """Render the statement creating a pre-computed aggregate in a dialect."""
+    dialect = get_sqlglot_dialect(db_type)
+    projections = [_identifier(column, dialect) for column in group_columns]
+    for aggregate in aggregates:
+        aggregate_sql = aggregate.sql(dialect=dialect)
+        alias = re.sub(r"\W+", "_", aggregate_sql.lower()).strip("_")
+        projections.append(f"{aggregate_sql} AS {_identifier(alias, dialect)}")
+    select_sql = (
+        f"SELECT {', '.join(projections)} FROM {_table_identifier(table, dialect)} "
+        f"GROUP BY {', '.join([_identifier(c, dialect) for c in group_columns])}"
+    )
+    if dialect == "postgres":
+        return (
+            f"CREATE MATERIALIZED VIEW IF NOT EXISTS {_identifier(name, dialect)} "
+            f"AS {select_sql};"
+        )
+    # Without materialized views, refresh the table when the data changes
+    return f"CREATE TABLE IF NOT EXISTS {_identifier(name, dialect)} AS {select_sql};"
+
+
+def _candidates_of_select(
+    analysis: Dict[str, Any]
+) -> List[tuple[tuple, Dict[str, Any]]]:
+    """
+    Return the candidate indexes and aggregates that would speed up a SELECT,
+    keyed so that identical candidates of different queries are merged.
+    """
+    candidates = []
+    for table in analysis["tables"]:
+        equality_columns = analysis["equality_columns"].get(table, [])
+        range_columns = analysis["range_columns"].get(table, [])
+        # Equality columns first: only one range column can use the index
+        filter_columns = _unique(equality_columns + range_columns[:1])
+        if filter_columns:
+            candidates.append(
+                (
+                    ("index", table, tuple(filter_columns)),
+                    {"kind": "index", "table": table, "columns": filter_columns},
+                )
+            )
+        join_columns = analysis["join_columns"].get(table, [])
+        if join_columns and join_columns != filter_columns:
+            candidates.append(
+                (
+                    ("index", table, tuple(join_columns)),
+                    {"kind": "index", "table": table, "columns": join_columns},
+                )
+            )
+
+    # A single-table aggregate with at most equality filters can be served by
+    # an aggregate grouped by the filter and group columns
+    if (
+        len(analysis["tables"]) == 1
+        and analysis["aggregates"]
+        and not analysis["range_columns"]
+        and not analysis["join_columns"]
+    ):
+        table = analysis["tables"][0]
+        group_columns = _unique(
+            analysis["equality_columns"].get(table, [])
+            + analysis["group_columns"].get(table, [])
+        )
+        if group_columns:
+            aggregates = [
+                aggregate.transform(
+                    lambda node: (
+                        exp.column(node.name) if isinstance(node, exp.Column) else node
+                    )
+                )
+                for aggregate in analysis["aggregates"]
+            ]
+            candidates.append(
+                (
+                    (
+                        "materialized_aggregate",
+                        table,
+                        tuple(group_columns),
+                        tuple(sorted(aggregate.sql() for aggregate in aggregates)),
+                    ),
+                    {
+                        "kind": "materialized_aggregate",
+                        "table": table,
+                        "columns": group_columns,
+                        "aggregates": aggregates,
+                    },
+                )
+            )
+    return candidates
+
+
+def advise(
+    entries: Iterable[Dict[str, Any]],
+    metric_db_id: str | None = None,
+    top_n: int = 10,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Rank the indexes and pre-computed aggregates that would save the most
+    query time, per metric database, from a query log.
+
+    Each logged query credits a fixed fraction of its execution time
+    (`INDEX_TIME_SAVED_FRACTION` or `AGGREGATE_TIME_SAVED_FRACTION`) to every
+    candidate that would speed it up. This is a ranking heuristic, not a
+    measurement: check the suggestions with EXPLAIN before applying them.
+
+    Args:
+        entries (Iterable[dict]): The logged queries, e.g. `QueryLog.read()`.
+        metric_db_id (str | None): (Optional) Only advise this database.
+        top_n (int): Number of suggestions per database.
+
+    Returns:
+        dict[str, list[dict]]: The suggestions of each database, ranked by
+            "estimated_time_saved", with the "ddl" to create them in the
+            "db_type" of the queries they speed up.
+    """
+    candidates: Dict[str, Dict[tuple, Dict[str, Any]]] = defaultdict(dict)
+
+    for entry in entries:
+        if metric_db_id is not None and entry["metric_db_id"] != metric_db_id:
+            continue
+        try:
+            query = sqlglot.parse_one(
+                entry["sql_query"], read=get_sqlglot_dialect(entry["db_type"])
+            )
+        except ParseError:
+            continue
+
+        query_candidates: Dict[tuple, Dict[str, Any]] = {}
+        for select in query.find_all(exp.Select):
+            analysis = analyze_select(select, entry.get("best_columns") or {})
+            query_candidates.update(_candidates_of_select(analysis))
+
+        for key, candidate in query_candidates.items():
+            fraction = (
+                INDEX_TIME_SAVED_FRACTION
+                if candidate["kind"] == "index"
+                else AGGREGATE_TIME_SAVED_FRACTION
+            )
+            # The DDL is rendered in the dialect of the queries it speeds up,
+            # so a database logged under several dialects is not mixed up
+            aggregated = candidates[entry["metric_db_id"]].setdefault(
+                (entry["db_type"], *key),
+                {
+                    **candidate,
+                    "db_type": entry["db_type"],
+                    "num_queries": 0,
+                    "total_execution_time": 0.0,
+                    "estimated_time_saved": 0.0,
+                },
+            )
+            aggregated["num_queries"] += 1
+            aggregated["total_execution_time"] += entry["execution_time"]
+            aggregated["estimated_time_saved"] += fraction * entry["execution_time"]
+
+    suggestions: Dict[str, List[Dict[str, Any]]] = {}
+    for db_id, db_candidates in candidates.items():
+        ranked = sorted(
+            db_candidates.values(),
+            key=lambda candidate: candidate["estimated_time_saved"],
+            reverse=True,
+        )[:top_n]
+        for candidate in ranked:
+            if candidate["kind"] == "index":
+                name = _object_name("ix", candidate["table"], candidate["columns"])
+                candidate["ddl"] = _index_ddl(
+                    name, candidate["table"], candidate["columns"], candidate["db_type"]
+                )
+            else:
+                name = _object_name("agg", candidate["table"], candidate["columns"])
+                candidate["ddl"] = _aggregate_ddl(
+                    name,
+                    candidate["table"],
+                    candidate["columns"],
+                    candidate.pop("aggregates"),
+                    candidate["db_type"],
+                )
+        suggestions[db_id] = ranked
+    return suggestions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Suggest indexes and aggregates from a query log."
+    )
+    parser.add_argument("--query_log", type=str, required=True)
+    parser.add_argument("--metric_db_id", type=str, default=None)
+    parser.add_argument("--top_n", type=int, default=10)
+    args = parser.parse_args()
+
+    all_suggestions = advise(
+        QueryLog(args.query_log).read(), args.metric_db_id, args.top_n
+    )
+    for db_id, db_suggestions in all_suggestions.items():
+        print(f"-- {db_id}")
+        for suggestion in db_suggestions:
+            print(
+                f"-- {suggestion['kind']} on {suggestion['table']}: "
+                f"{suggestion['num_queries']} queries, "
+                f"{suggestion['total_execution_time']:.2f}s total, "
+                f"~{suggestion['estimated_time_saved']:.2f}s saved"
+            )
+            print(suggestion["ddl"])
@@ -0,0 +1,155 @@
+import json
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy.types import JSON, TypeEngine
+
+
+def is_json_type(column_type: TypeEngine) -> bool:
+    """Check whether a column type is a JSON type (JSON, JSONB)."""
+    return isinstance(column_type, JSON)
+
+
+def parse_json_object(value: Any) -> Dict[str, Any] | None:
+    """Return a JSON object stored as a dict or as text, or None."""
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", errors="ignore")
+    if not isinstance(value, str) or not value.lstrip().startswith("{"):
+        return None
+    try:
+        parsed = json.loads(value)
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
+def _json_type_name(value: Any) -> str:
+    """Return the SQL-like type name of a JSON scalar."""
+    if isinstance(value, bool):
+        return "BOOLEAN"
+    if isinstance(value, int):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    return "TEXT"
+
+
+def _flatten(
+    json_object: Dict[str, Any], prefix: Tuple[str, ...], max_depth: int
+) -> Iterable[Tuple[Tuple[str, ...], str]]:
+    """Yield the key path and type of each scalar in a JSON object."""
+    for key, value in json_object.items():
+        # Keys with quotes or dots cannot be written safely in key paths
+        if not isinstance(key, str) or any(char in key for char in "'\"."):
+            continue
+        path = prefix + (key,)
+        if isinstance(value, dict) and len(path) < max_depth:
+            yield from _flatten(value, path, max_depth)
+        elif value is not None and not isinstance(value, (dict, list)):
+            yield path, _json_type_name(value)
+
+
+def discover_json_paths(
+    values: Iterable[Any],
+    min_frequency: float = 0.5,
+    max_paths: int = 20,
+    max_depth: int = 3,
+) -> List[Tuple[str, str]]:
+    """
+    Discover the frequent scalar key paths of a sample of JSON objects.
+
+    Args:
+        values (Iterable[Any]): The sampled values of a column.
+        min_frequency (float): Minimum share of the sampled objects a key path
+            must appear in.
+        max_paths (int): Maximum number of key paths to return.
+        max_depth (int): Maximum depth of the key paths.
+
+    Returns:
+        list[tuple[str, str]]: The dotted key paths and their types, most
+            frequent first. Empty if the values are not JSON objects.
+    """
+    json_objects = [parse_json_object(value) for value in values]
+    json_objects = [json_object for json_object in json_objects if json_object]
+    if not json_objects:
+        return []
+
+    path_counts: Counter = Counter()
+    path_types: Dict[Tuple[str, ...], str] = {}
+    for json_object in json_objects:
+        for path, type_name in dict.fromkeys(_flatten(json_object, (), max_depth)):
+            path_counts[path] += 1
+            # Mixed numeric types are reported as REAL, other mixes as TEXT
+            previous_type = path_types.setdefault(path, type_name)
+            if previous_type != type_name:
+                numeric_types = {"INTEGER", "REAL"}
+                path_types[path] = (
+                    "REAL" if {previous_type, type_name} <= numeric_types else "TEXT"
+                )
+
+    min_count = min_frequency * len(json_objects)
+    return [
+        (".".join(path), path_types[path])
+        for path, count in path_counts.most_common(max_paths)
+        if count >= min_count
+    ]
+
+
+def _quote_identifier(name: str, dialect_name: str) -> str:
+    """Quote an identifier for a dialect."""
+    if dialect_name in ("mysql", "mariadb"):
+        return "`" + name.replace("`", "``") + "`"
+    return '"' + name.replace('"', '""') + '"'
+
+
+def json_path_expression(column: str, path: str, dialect_name: str) -> str:
+    """
+    Render the expression extracting a key path of a JSON column as text, in
+    the SQL dialect of the database.
+
+    Args:
+        column (str): The JSON column.
+        path (str): The dotted key path.
+        dialect_name (str): The name of the SQL dialect of the database.
+
+    Returns:
+        str: e.g. `json_extract(col, '$.a.b')` (SQLite), `col->'a'->>'b'`
+            (PostgreSQL) or `col->>'$.a.b'` (MySQL).
+    """
+    quoted_column = _quote_identifier(column, dialect_name)
+    keys = path.split(".")
+    json_path = "$" + "".join(
+        [f".{key}" if key.isidentifier() else f'."{key}"' for key in keys]
+    )
+    if dialect_name == "postgresql":
+        accessors = "".join([f"->'{key}'" for key in keys[:-1]])
+        return f"{quoted_column}{accessors}->>'{keys[-1]}'"
+    if dialect_name in ("mysql", "mariadb"):
+        return f"{quoted_column}->>'{json_path}'"
+    if dialect_name == "duckdb":
+        return f"json_extract_string({quoted_column}, '{json_path}')"
+    return f"json_extract({quoted_column}, '{json_path}')"
+
+
+def render_json_paths(
+    column: str, json_paths: List[Tuple[str, str]], dialect_name: str
+) -> str:
+    """
+    Render the key paths of a JSON column as virtual columns for the schema.
+
+    Args:
+        column (str): The JSON column.
+        json_paths (list[tuple[str, str]]): The key paths and their types.
+        dialect_name (str): The name of the SQL dialect of the database.
+
+    Returns:
+        str: One line per key path, with the expression to query it.
+    """
+    lines = [
+        f"  {column}.{path} {type_name}: "
+        f"{json_path_expression(column, path, dialect_name)}"
+        for path, type_name in json_paths
+    ]
+    return f"JSON keys of {column} (virtual columns):\n" + "\n".join(lines) + "\n"
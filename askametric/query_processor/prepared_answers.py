@@ -0,0 +1,281 @@
+import asyncio
+import copy
+import json
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from cachetools import LRUCache
+
+from ..utils import get_log_level_from_str, setup_logger
+from .engine_registry import get_engine_registry
+from .tools import get_tools
+
+_answer_store_instance = None
+
+
+class PreparedAnswerStore:
+    """
+    Prepared answers (plan and final answer) of the questions warmed ahead of
+    time, e.g. the suggested questions, keyed by question and invalidated by
+    the data version of the database.
+    """
+
+    def __init__(self, max_entries: int = 1000, max_tracked: int = 10_000) -> None:
+        """
+        Initialize the PreparedAnswerStore class.
+
+        Args:
+            max_entries (int): Maximum number of prepared answers kept.
+            max_tracked (int): Maximum number of warmed questions remembered.
+        """
+        self._answers: LRUCache = LRUCache(maxsize=max_entries)
+        self._tracked: LRUCache = LRUCache(maxsize=max_tracked)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(metric_db_id: str, query: dict) -> Tuple[str, str, str]:
+        """
+        Key a question by its database, its text (ignoring case and extra
+        whitespace) and its metadata.
+        """
+        query_text = " ".join(str(query.get("query_text", "")).casefold().split())
+        query_metadata = json.dumps(
+            query.get("query_metadata") or {}, sort_keys=True, default=str
+        )
+        return (metric_db_id, query_text, query_metadata)
+
+    def track(self, key: Hashable) -> None:
+        """Mark a question as warmed, so that its answer is kept fresh."""
+        self._tracked[key] = True
+
+    def is_tracked(self, key: Hashable) -> bool:
+        """Check whether a question is warmed."""
+        return self._tracked.get(key, False)
+
+    def get(self, key: Hashable, data_version: str | None) -> Dict[str, Any] | None:
+        """
+        Return the prepared answer of a question if it was computed at the
+        current data version. Stale answers are dropped.
+
+        Args:
+            key (Hashable): The question key.
+            data_version (str | None): The current data version of the database.
+        """
+        entry = self._answers.get(key)
+        if entry is None or data_version is None:
+            self.misses += 1
+            return None
+        if entry["data_version"] != data_version:
+            self.misses += 1
+            del self._answers[key]
+            return None
+        self.hits += 1
+        return copy.deepcopy(entry["answer"])
+
+    def is_fresh(self, key: Hashable, data_version: str | None) -> bool:
+        """Check whether a question has an answer prepared at a data version."""
+        entry = self._answers.get(key)
+        return entry is not None and entry["data_version"] == data_version
+
+    def set(self, key: Hashable, data_version: str | None, answer: Dict) -> None:
+        """
+        Store the prepared answer of a question. Answers without a data version
+        cannot be invalidated and are not stored.
+
+        Args:
+            key (Hashable): The question key.
+            data_version (str | None): The data version the answer was computed at.
+            answer (dict): The processor attributes making up the answer.
+        """
+        if data_version is None:
+            return
+        self._answers[key] = {
+            "data_version": data_version,
+            "answer": copy.deepcopy(answer),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit-rate metrics of the store."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._answers),
+        }
+
+
+class AnswerWarmer:
+    """
+    Background job running questions through the pipeline ahead of time, so
+    that their answers are served instantly from a PreparedAnswerStore. The
+    answers are prepared again whenever the data of the database changes.
+
+    Typically started with the suggested questions of a database, right after
+    they are generated by the DatabaseDescriptor.
+    """
+
+    def __init__(
+        self,
+        answer_store: PreparedAnswerStore,
+        max_concurrency: int = 2,
+        refresh_interval: float = 60 * 5,
+        log_level: str = "INFO",
+    ) -> None:
+        """
+        Initialize the AnswerWarmer class.
+
+        Args:
+            answer_store (PreparedAnswerStore): The store of prepared answers.
+            max_concurrency (int): Maximum number of questions answered at once.
+            refresh_interval (float): How often, in seconds, the data version is
+                checked for changes.
+            log_level (str): The log level to use.
+        """
+        self.answer_store = answer_store
+        self.max_concurrency = max_concurrency
+        self.refresh_interval = refresh_interval
+        self.logger = setup_logger("answer_warmer", get_log_level_from_str(log_level))
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def warm(
+        self,
+        metric_db_id: str,
+        questions: List[str],
+        make_processor: Callable[[dict], Any],
+        api_key: str | None = None,
+    ) -> Dict[str, str]:
+        """
+        Answer the questions that have no prepared answer at the current data
+        version, and store their answers.
+
+        Args:
+            metric_db_id (str): The database id, registered in the engine registry.
+            questions (list[str]): The questions to warm.
+            make_processor (Callable[[dict], LLMQueryProcessor]): Builds the
+                processor answering a query ({"query_text", "query_metadata"}).
+            api_key (str | None): (Optional) API key to use for the LLM calls.
+
+        Returns:
+            dict[str, str]: The outcome for each question: "fresh" if it already
+                had a prepared answer, or the status of the processor.
+        """
+        async with get_engine_registry().lease_session(metric_db_id) as asession:
+            data_version = await get_tools().get_data_version(asession)
+        if data_version is None:
+            self.logger.warning(
+                f"Cannot warm {metric_db_id}: its data version is unknown, so "
+                "prepared answers could not be invalidated"
+            )
+            return {}
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _warm_question(question: str) -> str:
+            """Answer a question, unless its prepared answer is fresh."""
+            query = {"query_text": question, "query_metadata": {}}
+            key = self.answer_store.key(metric_db_id, query)
+            self.answer_store.track(key)
+            if self.answer_store.is_fresh(key, data_version):
+                return "fresh"
+
+            async with semaphore:
+                processor = make_processor(query)
+                await processor.process_query(api_key=api_key)
+            prepared_answer = processor.prepared_answer()
+            if prepared_answer is not None:
+                self.answer_store.set(key, data_version, prepared_answer)
+            else:
+                self.logger.warning(
+                    f"Could not warm '{question}' ({metric_db_id}): "
+                    f"{processor.status.value} {processor.error}"
+                )
+            return processor.status.value
+
+        outcomes = await asyncio.gather(
+            *[_warm_question(question) for question in questions],
+            return_exceptions=True,
+        )
+        return {
+            question: outcome if isinstance(outcome, str) else f"Error: {outcome}"
+            for question, outcome in zip(questions, outcomes)
+        }
+
+    def start(
+        self,
+        metric_db_id: str,
+        questions: List[str],
+        make_processor: Callable[[dict], Any],
+        api_key: str | None = None,
+    ) -> asyncio.Task:
+        """
+        Start warming the questions of a database in the background, now and
+        whenever its data changes. Replaces the job already running for the
+        database, if any.
+
+        Args:
+            metric_db_id (str): The database id, registered in the engine registry.
+            questions (list[str]): The questions to warm.
+            make_processor (Callable[[dict], LLMQueryProcessor]): Builds the
+                processor answering a query.
+            api_key (str | None): (Optional) API key to use for the LLM calls.
+
+        Returns:
+            asyncio.Task: The background job.
+        """
+
+        async def _run() -> None:
+            """Warm the questions, then check for data changes periodically."""
+            while True:
+                try:
+                    outcomes = await self.warm(
+                        metric_db_id, questions, make_processor, api_key=api_key
+                    )
+                    self.logger.debug(f"Warmed {metric_db_id}: {outcomes}")
+                except Exception as e:
+                    self.logger.error(f"Failed to warm {metric_db_id}: {e}")
+                await asyncio.sleep(self.refresh_interval)
+
+        self.stop(metric_db_id)
+        self._tasks[metric_db_id] = asyncio.create_task(_run())
+        return self._tasks[metric_db_id]
+
+    def suggested_questions_hook(
+        self,
+        make_processor: Callable[[str, dict], Any],
+        api_key: str | None = None,
+    ) -> Callable[[str, List[str]], None]:
+        """
+        Return a callback starting to warm the suggested questions of a
+        database, to be passed to the DatabaseDescriptor.
+
+        Args:
+            make_processor (Callable[[str, dict], LLMQueryProcessor]): Builds the
+                processor answering a query on a database.
+            api_key (str | None): (Optional) API key to use for the LLM calls.
+        """
+
+        def _warm_suggested_questions(metric_db_id: str, questions: List[str]) -> None:
+            """Start warming the suggested questions of a database."""
+            self.start(
+                metric_db_id,
+                questions,
+                lambda query: make_processor(metric_db_id, query),
+                api_key=api_key,
+            )
+
+        return _warm_suggested_questions
+
+    def stop(self, metric_db_id: str) -> None:
+        """Stop the background job of a database, if any."""
+        task = self._tasks.pop(metric_db_id, None)
+        if task is not None:
+            task.cancel()
+
+
+def get_answer_store() -> PreparedAnswerStore:
+    """Return the PreparedAnswerStore instance."""
+    global _answer_store_instance
+    if _answer_store_instance is None:
+        _answer_store_instance = PreparedAnswerStore()
+    return _answer_store_instance
@@ -0,0 +1,75 @@
+import asyncio
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator
+
+
+class QueryLog:
+    """
+    Append-only JSON Lines log of the SQL queries run by the pipeline, used
+    offline by the index advisor.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Initialize the QueryLog class.
+
+        Args:
+            path (str): The path of the JSON Lines file to append to.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+
+    async def log(
+        self,
+        metric_db_id: str,
+        db_type: str,
+        best_tables: list[str],
+        best_columns: dict[str, list[str]],
+        sql_query: str,
+        execution_time: float,
+        num_rows: int,
+    ) -> None:
+        """
+        Append a query to the log. The file is written on a worker thread, so
+        that the event loop is not blocked by disk I/O.
+
+        Args:
+            metric_db_id (str): The database id.
+            db_type (str): The type of the database (SQL dialect).
+            best_tables (list[str]): The tables chosen for the question.
+            best_columns (dict[str, list[str]]): The columns chosen per table.
+            sql_query (str): The SQL query that was run.
+            execution_time (float): The time the query took, in seconds.
+            num_rows (int): The number of rows returned.
+        """
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "metric_db_id": metric_db_id,
+            "db_type": db_type,
+            "best_tables": best_tables,
+            "best_columns": best_columns,
+            "sql_query": sql_query,
+            "execution_time": execution_time,
+            "num_rows": num_rows,
+        }
+        await asyncio.to_thread(self._write, json.dumps(entry, default=str) + "\n")
+
+    def _write(self, line: str) -> None:
+        """Append a line to the log file."""
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as log_file:
+                log_file.write(line)
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over the logged queries, skipping malformed lines."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as log_file:
+            for line in log_file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
@@ -217,8 +217,29 @@ def create_sql_generating_prompt(
     columns_description: str,
     num_common_values: int,
     indicator_vars: list,
+    value_hints: dict[str, dict] | None = None,
+    previous_sql_query: str | None = None,
 ) -> str:
     """Create prompt for generating SQL query."""
+    value_hints_section = ""
+    if value_hints is not None:
+        value_hints_section = f"""
+    ===== Values mentioned in the question =====
+    These values from the database match the question. When filtering on
+    them, use the values exactly as written, in the given table and column
+    (might be empty if none match):
+    <<<{value_hints}>>>
+    """
+
+    previous_sql_query_section = ""
+    if previous_sql_query:
+        previous_sql_query_section = f"""
+    ===== Previous SQL query =====
+    The question follows up on a previous question, which was answered with
+    the SQL query below. Adapt it if it helps:
+    <<<{previous_sql_query}>>>
+    """
+
     prompt = f"""
     ===== Question =====
     <<< {query_model["query_text"]} >>>
@@ -240,7 +261,8 @@ def create_sql_generating_prompt(
     a variable is in this special list: {indicator_vars}, the list of their unique
     values is exhaustive.
     <<<{top_k_common_values}>>>
-
+    {value_hints_section}
+    {previous_sql_query_section}
 
     ==== Instruction ====
     Given the above, generate a SQL query that will answer the user's query.
@@ -287,7 +309,7 @@ def create_sql_generating_prompt(
 def create_final_answer_prompt(
     query_model: dict,
     final_sql_code_to_run: str,
-    final_sql_response: list,
+    final_sql_response: str,
     language: str,
     script: str,
 ) -> str:
@@ -304,9 +326,14 @@ def create_final_answer_prompt(
     Here is a SQL query generated to answer that question -
     <<<{final_sql_code_to_run}>>>
 
-    Here is the response to the SQL query from the DB -
+    Here is the response to the SQL query from the DB, with the values of
+    each column listed in row order -
     <<<{final_sql_response}>>>
 
+    If the response was truncated, only the first rows of the result were
+    read. If it was summarized, use the per-column summaries for totals and
+    the sample rows for examples.
+
     ===== Instruction =====
     Use the above information to create a final response for the user's
     question. You CANNOT provide information that is not available in the database.
@@ -369,3 +396,32 @@ def create_clarifying_answer_prompt(
     collected a high level.
     """
     return prompt
+
+
+def create_history_summary_prompt(
+    previous_summary: str, chat_turns: list, max_words: int
+) -> tuple[str, str]:
+    """Create prompt to fold older chat turns into a rolling summary."""
+    sys_message = "You are a highly-skilled note taker.\
+    Your job is to keep a short running summary of a conversation between a user \
+    and a data assistant."
+
+    prompt = f"""
+    ===== Summary so far =====
+    Here is the summary of the earlier conversation (might be empty):
+    <<< {previous_summary} >>>
+
+    ===== New turns =====
+    Here are the next turns of the conversation, oldest first:
+    <<< {chat_turns} >>>
+
+    ===== Updated summary =====
+    Update the summary with the new turns, in {max_words} WORDS OR LESS.
+    Keep the topics, places, people, time periods and indicators the user asked
+    about, and the key figures in the answers, since later questions may refer to
+    them. Drop greetings and repetitions.
+
+    ==== Response format ====
+    python parsable json with key "summary".
+    """
+    return sys_message, prompt
@@ -1,9 +1,20 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from enum import Enum
+from typing import AsyncIterator, Callable
 
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..utils import ask_llm_json, get_log_level_from_str, setup_logger, track_time
+from .answer_templates import TemplateAnswerPolicy, render_template_answer
+from .chat_history import ChatHistoryManager
+from .conversation_state import CONVERSATION_STATE_ATTRIBUTES, ConversationStateStore
+from .duckdb_accelerator import DuckDBAccelerator, get_duckdb_accelerator
+from .engine_registry import EngineRegistry, get_engine_registry
 from .guardrails.guardrails import LLMGuardRails
+from .prepared_answers import PreparedAnswerStore
+from .query_log import QueryLog
 from .query_processing_prompts import (
     create_best_columns_prompt,
     create_best_tables_prompt,
@@ -15,7 +26,23 @@ from .query_processing_prompts import (
     get_query_language_prompt,
     translation_prompt,
 )
-from .tools import SQLTools, get_tools, get_tools_multiturn
+from .result_formatter import format_sql_result
+from .retrieval import (
+    SchemaRetriever,
+    filter_column_description,
+    filter_table_description,
+    get_retriever,
+    parse_table_description,
+)
+from .sql_rewriter import UnsafeSQLError, rewrite_sql
+from .tools import (
+    SQLCostExceededError,
+    SQLTimeoutError,
+    SQLTools,
+    get_tools,
+    get_tools_multiturn,
+)
+from .value_index import ValueIndex
 
 
 class ProcessorStatus(Enum):
@@ -23,16 +50,43 @@ class ProcessorStatus(Enum):
 
     NOT_RUN = "Did not run"
     INTERNAL_ERROR = "Internal Error"
+    SQL_TIMEOUT = "SQL Timeout"
+    QUERY_TOO_EXPENSIVE = "Query too expensive"
+    UNSAFE_SQL = "Unsafe SQL"
     SUCCESS = "Success"
 
 
+class FinalAnswerPath(Enum):
+    """How the final answer was produced."""
+
+    NOT_RUN = "Did not run"
+    LLM = "LLM"
+    TEMPLATE = "Template"
+    PREPARED = "Prepared"
+
+
+# The attributes of a processor making up the plan and answer of a query,
+# served again for warmed queries
+PREPARED_ANSWER_ATTRIBUTES = (
+    "query_language",
+    "query_script",
+    "eng_translation",
+    "best_tables",
+    "best_columns",
+    "sql_query",
+    "final_answer",
+    "query_type",
+    "translated_final_answer",
+)
+
+
 class LLMQueryProcessor:
     """Processes the user query and returns the final answer."""
 
     def __init__(
         self,
         query: dict,
-        asession: AsyncSession,
+        asession: AsyncSession | None,
         metric_db_id: str,
         db_type: str,
         llm: str,
@@ -43,13 +97,27 @@ class LLMQueryProcessor:
         indicator_vars: list,
         num_common_values: int,
         log_level: str = "INFO",
+        schema_format: str = "ddl",
+        sql_timeout: float | None = None,
+        max_query_cost: float | None = None,
+        max_result_rows: int | None = None,
+        template_answer_policy: TemplateAnswerPolicy | None = None,
+        use_duckdb: bool = False,
+        query_log: QueryLog | None = None,
+        max_candidate_tables: int | None = None,
+        max_candidate_columns: int | None = None,
+        value_index: ValueIndex | None = None,
+        answer_store: PreparedAnswerStore | None = None,
+        columnar_results: bool = False,
     ) -> None:
         """
         Initialize the LLMQueryProcessor class.
 
         Args:
             query (dict): The user query and query metadata.
-            asession (AsyncSession): The SQLAlchemy AsyncSession object.
+            asession (AsyncSession or None): The SQLAlchemy AsyncSession object.
+                If None, each stage leases its own session from the engine
+                registered for `metric_db_id` in the EngineRegistry.
             metric_db_id (str): The database id to query.
             db_type (str): The type of the database.
             llm (str): The LLM model to use.
@@ -60,20 +128,93 @@ class LLMQueryProcessor:
             indicator_vars (list): The indicator variables.
             num_common_values (int): The number of common values to get.
             log_level (str): The logging level to use (default is "INFO").
+            schema_format (str): How table schemas are rendered in prompts.
+                "ddl" for full CREATE TABLE statements, or "compact" for
+                token-efficient `table(col TYPE, ...)` signatures that are
+                narrowed to the best columns for SQL generation
+                (default is "ddl").
+            sql_timeout (float or None): Timeout in seconds for each SQL
+                statement run against the database (default is the SQLTools
+                default).
+            max_query_cost (float or None): If set, the generated SQL query is
+                first EXPLAINed and rejected when its estimated cost is above
+                this threshold. The cost is dialect-specific: the planner cost
+                for PostgreSQL, and estimated rows examined for MySQL and SQLite
+                (default is None, i.e. no cost gate).
+            max_result_rows (int or None): If set, a LIMIT is injected into (or
+                tightened on) generated row-level queries so they return at most
+                this many rows (default is None).
+            template_answer_policy (TemplateAnswerPolicy or None): If set,
+                scalar and small labeled results that the policy accepts are
+                answered from a template instead of asking the LLM
+                (default is None).
+            use_duckdb (bool): If True and `metric_db_id` is registered with the
+                DuckDBAccelerator, the SQL query is generated in the DuckDB
+                dialect and run, together with the column profiling, on the
+                DuckDB mirror of the database. The cost gate is skipped in that
+                case (default is False).
+            query_log (QueryLog or None): If set, every SQL query run is logged
+                with its best columns and execution time, for the index
+                advisor (default is None).
+            max_candidate_tables (int or None): If set, only the tables that
+                best match the question lexically (up to this many) are shown
+                to the LLM to choose the best tables from. The full list is used
+                when the retrieval is not confident (default is None).
+            max_candidate_columns (int or None): If set, only the columns of
+                each best table whose names, descriptions and categorical values
+                best match the question (up to this many) are shown to the LLM
+                to choose the best columns from (default is None).
+            value_index (ValueIndex or None): If set, the SQL prompt gets the
+                categorical values of the database mentioned in the question,
+                instead of the most common values of the indexed columns
+                (default is None).
+            answer_store (PreparedAnswerStore or None): If set, questions warmed
+                ahead of time (see AnswerWarmer) are answered from the store
+                when the data has not changed since, and re-answered otherwise
+                (default is None).
+            columnar_results (bool): If True, SQL results are read into
+                NumPy-backed ColumnarResult objects instead of lists of rows,
+                which is faster to summarize for large results
+                (default is False).
         """
         self.query = query
         self.asession = asession
+        self.engine_registry: EngineRegistry = get_engine_registry()
         self.metric_db_id = metric_db_id
         self.db_type = db_type
         self.tools: SQLTools = get_tools()
         self.temperature = 0.1
+        self.max_verbatim_result_rows = 50
+        self.columnar_results = columnar_results
         self.llm = llm
         self.system_message = sys_message
         self.table_description = db_description
         self.column_description = column_description
         self.indicator_vars = indicator_vars
         self.num_common_values = num_common_values
+        self.schema_format = schema_format
+        self.sql_timeout = sql_timeout
+        self.max_query_cost = max_query_cost
+        self.max_result_rows = max_result_rows
+        self.template_answer_policy = template_answer_policy
+        self.query_log = query_log
+        self.max_candidate_tables = max_candidate_tables
+        self.max_candidate_columns = max_candidate_columns
+        self.value_index = value_index
+        self.answer_store = answer_store
+        self._data_version: str | None = None
+        self.retriever: SchemaRetriever = get_retriever()
         self.logger = setup_logger("query_processor", get_log_level_from_str(log_level))
+        self.duckdb_accelerator: DuckDBAccelerator | None = None
+        if use_duckdb:
+            if get_duckdb_accelerator().is_registered(metric_db_id):
+                self.duckdb_accelerator = get_duckdb_accelerator()
+            else:
+                self.logger.warning(
+                    f"{metric_db_id} is not registered with the DuckDB "
+                    "accelerator, running SQL on the database itself"
+                )
+        self.sql_dialect = "duckdb" if self.duckdb_accelerator is not None else db_type
         self.status = ProcessorStatus.NOT_RUN
         self.guardrails: LLMGuardRails = LLMGuardRails(
             guardrails_llm, self.system_message, self.logger
@@ -83,12 +224,26 @@ class LLMQueryProcessor:
         self.query_language = ""
         self.script = ""
         self.eng_translation: dict = {}
+        self.candidate_tables: list[str] = []
+        self.candidate_columns: dict[str, list[str]] = {}
         self.best_tables: list[str] = []
         self.best_columns: dict[str, list[str]] = {}
         self.top_k_common_values: dict[str, dict] = {}
+        self.value_hints: dict[str, dict] | None = None
         self.sql_query: str = ""
+        # SQL query of the previous question, for follow-up questions
+        self.previous_sql_query: str | None = None
+        self.rewritten_sql_query: str = ""
+        self.normalized_sql_query: str = ""
+        self.sql_rewrite_reasons: list[str] = []
+        self.query_plan_summary: str = ""
+        self.estimated_query_cost: float | None = None
+        self.estimated_rows: int | None = None
+        self.sql_result: dict = {}
         self.final_answer: str = ""
+        self.final_answer_path = FinalAnswerPath.NOT_RUN
         self.relevant_schemas: str = ""
+        self.best_columns_schemas: str = ""
         self.best_tables_prompt: str = ""
         self.best_columns_prompt: str = ""
         self.sql_generating_prompt: str = ""
@@ -96,6 +251,29 @@ class LLMQueryProcessor:
         self.error: str = ""
         self._api_key: str | None = None
 
+    @asynccontextmanager
+    async def _lease_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Yield the session passed to the processor, or lease one from the
+        engine registry if none was passed.
+        """
+        if self.asession is not None:
+            yield self.asession
+        else:
+            async with self.engine_registry.lease_session(
+                self.metric_db_id
+            ) as asession:
+                yield asession
+
+    def _lease_session_factory(self) -> Callable | None:
+        """
+        Return a factory of leased sessions for concurrent SQL work, or None
+        if the processor was given a single session.
+        """
+        if self.asession is not None:
+            return None
+        return lambda: self.engine_registry.lease_session(self.metric_db_id)
+
     @track_time(create_class_attr="timings")
     async def _get_query_language_from_llm(self) -> None:
         """
@@ -151,13 +329,75 @@ class LLMQueryProcessor:
             self.eng_translation = eng_translation_llm_response["answer"]
             self.cost += float(eng_translation_llm_response["cost"])
 
+    @track_time(create_class_attr="timings")
+    async def _check_safety(self) -> None:
+        """
+        The function checks the safety of the (English) query.
+        """
+        await self.guardrails.check_safety(
+            self.eng_translation["query_text"],
+            self.query_language,
+            self.query_script,
+            api_key=self._api_key,
+        )
+        self.logger.debug(f"(Guardrails) Safety: {self.guardrails.safe}")
+
+    @track_time(create_class_attr="timings")
+    async def _check_relevance(self) -> None:
+        """
+        The function checks the relevance of the (English) query to the
+        database.
+        """
+        await self.guardrails.check_relevance(
+            self.eng_translation["query_text"],
+            self.query_language,
+            self.query_script,
+            self.table_description,
+            api_key=self._api_key,
+        )
+        self.logger.debug(f"(Guardrails) Relevance: {self.guardrails.relevant}")
+
+    @track_time(create_class_attr="timings")
+    async def _get_candidate_table_description(self) -> str:
+        """
+        The function shortlists the tables that best match the question, and
+        returns the table description of the shortlisted tables (or the full
+        table description if retrieval is not confident).
+        """
+        tables = parse_table_description(self.table_description)
+        if tables is None:
+            return self.table_description
+
+        async with self._lease_session() as asession:
+            table_columns = await self.tools.get_table_columns(
+                [table["name"] for table in tables], asession, self.metric_db_id
+            )
+        candidate_tables = self.retriever.retrieve_tables(
+            self.metric_db_id,
+            f"{self.eng_translation['query_text']} "
+            f"{self.eng_translation.get('query_metadata') or ''}",
+            self.table_description,
+            table_columns,
+            top_n=self.max_candidate_tables,
+        )
+        self.logger.debug(f"(Retrieval) Candidate tables: {candidate_tables}")
+        if candidate_tables is None:
+            return self.table_description
+
+        self.candidate_tables = candidate_tables
+        return filter_table_description(self.table_description, candidate_tables)
+
     @track_time(create_class_attr="timings")
     async def _get_best_tables_from_llm(self) -> None:
         """
         The function asks the LLM model to identify the best
         tables to answer a question.
         """
-        prompt = create_best_tables_prompt(self.eng_translation, self.table_description)
+        table_description = self.table_description
+        if self.max_candidate_tables is not None:
+            table_description = await self._get_candidate_table_description()
+
+        prompt = create_best_tables_prompt(self.eng_translation, table_description)
         self.logger.debug(f"(Prompt) Best Tables: {prompt}")
 
         best_tables_llm_response = await ask_llm_json(
@@ -173,21 +413,71 @@ class LLMQueryProcessor:
         self.cost += float(best_tables_llm_response["cost"])
         self.best_tables_prompt = prompt
 
+    @track_time(create_class_attr="timings")
+    async def _get_candidate_columns(
+        self,
+    ) -> tuple[dict[str, list[str]] | None, str]:
+        """
+        The function shortlists the columns of the wide best tables that best
+        match the question. It returns the shortlisted columns of each table
+        (None if no table is wide) and the matching column description.
+        """
+        async with self._lease_session() as asession:
+            table_columns = await self.tools.get_table_columns(
+                self.best_tables, asession, self.metric_db_id
+            )
+            wide_tables = [
+                table
+                for table, columns in table_columns.items()
+                if len(columns) > self.max_candidate_columns
+            ]
+            if not wide_tables:
+                return None, self.column_description
+
+            categorical_values = await self.tools.get_categorical_values(
+                wide_tables, asession, self.metric_db_id
+            )
+
+        candidate_columns = self.retriever.retrieve_columns(
+            self.metric_db_id,
+            f"{self.eng_translation['query_text']} "
+            f"{self.eng_translation.get('query_metadata') or ''}",
+            table_columns,
+            self.column_description,
+            categorical_values,
+            top_m=self.max_candidate_columns,
+        )
+        self.logger.debug(f"(Retrieval) Candidate columns: {candidate_columns}")
+        self.candidate_columns = candidate_columns
+        return candidate_columns, filter_column_description(
+            self.column_description, table_columns, candidate_columns
+        )
+
     @track_time(create_class_attr="timings")
     async def _get_best_columns_from_llm(self) -> None:
         """
         The function asks the LLM model to identify the best columns
         to answer a question.
         """
-        self.relevant_schemas = await self.tools.get_tables_schema(
-            self.best_tables, self.asession, metric_db_id=self.metric_db_id
-        )
+        candidate_columns = None
+        column_description = self.column_description
+        if self.max_candidate_columns is not None:
+            candidate_columns, column_description = await self._get_candidate_columns()
+
+        async with self._lease_session() as asession:
+            self.relevant_schemas = await self.tools.get_tables_schema(
+                self.best_tables,
+                asession,
+                metric_db_id=self.metric_db_id,
+                schema_format=self.schema_format,
+                table_columns=candidate_columns,
+            )
         self.logger.debug(f"(Tool Response) Relevant schemas: {self.relevant_schemas}")
 
         prompt = create_best_columns_prompt(
             self.eng_translation,
             self.relevant_schemas,
-            columns_description=self.column_description,
+            columns_description=column_description,
         )
         self.logger.debug(f"(Prompt) Best Columns: {prompt}")
 
@@ -205,30 +495,90 @@ class LLMQueryProcessor:
         self.best_columns_prompt = prompt
 
     @track_time(create_class_attr="timings")
-    async def _get_sql_query_from_llm(self) -> None:
+    async def _get_top_k_common_values(
+        self, table_column_dict: dict[str, list[str]]
+    ) -> None:
         """
-        The function asks the LLM model to generate a SQL query to
-        answer the user's question.
+        The function gets the most common values of the given columns.
         """
-        self.top_k_common_values = await self.tools.get_common_column_values(
-            table_column_dict=self.best_columns,
-            asession=self.asession,
-            num_common_values=self.num_common_values,
-            indicator_vars=self.indicator_vars,
-        )
+        if self.duckdb_accelerator is not None:
+            self.top_k_common_values = (
+                await self.duckdb_accelerator.get_common_column_values(
+                    self.metric_db_id,
+                    table_column_dict,
+                    num_common_values=self.num_common_values,
+                    indicator_vars=self.indicator_vars,
+                    timeout=self.sql_timeout,
+                )
+            )
+        else:
+            self.top_k_common_values = await self.tools.get_common_column_values(
+                table_column_dict=table_column_dict,
+                asession=self.asession,
+                num_common_values=self.num_common_values,
+                indicator_vars=self.indicator_vars,
+                timeout=self.sql_timeout,
+                lease_session=self._lease_session_factory(),
+                metric_db_id=self.metric_db_id,
+            )
         self.logger.debug(
             f"(Tool Response) Top k common values: {self.top_k_common_values}"
         )
 
+    @track_time(create_class_attr="timings")
+    async def _get_sql_query_from_llm(self) -> None:
+        """
+        The function asks the LLM model to generate a SQL query to
+        answer the user's question.
+        """
+        common_values_columns = self.best_columns
+        if self.value_index is not None:
+            self.value_hints = self.value_index.lookup(
+                f"{self.eng_translation['query_text']} "
+                f"{self.eng_translation.get('query_metadata') or ''}",
+                tables=self.best_tables,
+            )
+            self.logger.debug(f"(Tool Response) Value hints: {self.value_hints}")
+            # The values of indexed columns are given by the hints, except for
+            # indicator variables whose values are listed exhaustively
+            indicator_vars = [var.lower() for var in self.indicator_vars]
+            common_values_columns = {
+                table: [
+                    column
+                    for column in columns
+                    if column not in self.value_index.categorical_values.get(table, {})
+                    or column.lower() in indicator_vars
+                ]
+                for table, columns in self.best_columns.items()
+            }
+
+        await self._get_top_k_common_values(common_values_columns)
+
+        self.best_columns_schemas = self.relevant_schemas
+        best_columns_tables = [
+            table for table in self.best_tables if table in self.best_columns
+        ]
+        if self.schema_format == "compact" and best_columns_tables:
+            async with self._lease_session() as asession:
+                self.best_columns_schemas = await self.tools.get_tables_schema(
+                    best_columns_tables,
+                    asession,
+                    metric_db_id=self.metric_db_id,
+                    schema_format=self.schema_format,
+                    table_columns=self.best_columns,
+                )
+
         prompt = create_sql_generating_prompt(
             self.eng_translation,
-            self.db_type,
-            self.relevant_schemas,
+            self.sql_dialect,
+            self.best_columns_schemas,
             self.top_k_common_values,
             self.column_description,
             self.num_common_values,
             # Maybe want to restrict to where theres intersection with best columns
             self.indicator_vars,
+            self.value_hints,
+            self.previous_sql_query,
         )
         self.logger.debug(f"(Prompt) SQL Generation: {prompt}")
 
@@ -245,19 +595,101 @@ class LLMQueryProcessor:
         self.cost += float(sql_query_llm_response["cost"])
         self.sql_generating_prompt = prompt
 
+        (
+            self.rewritten_sql_query,
+            self.normalized_sql_query,
+            self.sql_rewrite_reasons,
+        ) = rewrite_sql(self.sql_query, self.sql_dialect, max_rows=self.max_result_rows)
+        self.logger.debug(
+            f"(Rewrite) SQL query: {self.rewritten_sql_query} "
+            f"({self.sql_rewrite_reasons})"
+        )
+
+    @track_time(create_class_attr="timings")
+    async def _check_sql_query_cost(self) -> None:
+        """
+        The function EXPLAINs the generated SQL query and rejects it
+        if its estimated cost is above `max_query_cost`.
+        """
+        async with self._lease_session() as asession:
+            query_plan = await self.tools.explain_sql(
+                self.rewritten_sql_query, asession, timeout=self.sql_timeout
+            )
+        self.logger.debug(f"(Tool Response) Query plan: {query_plan}")
+
+        self.query_plan_summary = query_plan["summary"]
+        self.estimated_query_cost = query_plan["estimated_cost"]
+        self.estimated_rows = query_plan["estimated_rows"]
+
+        if (
+            self.max_query_cost is not None
+            and self.estimated_query_cost > self.max_query_cost
+        ):
+            raise SQLCostExceededError(
+                f"Estimated query cost {self.estimated_query_cost} is above "
+                f"the threshold of {self.max_query_cost}"
+            )
+
     @track_time(create_class_attr="timings")
     async def _get_final_answer_from_llm(self) -> None:
         """
         The function asks the LLM model to generate the final
         answer to the user's question.
         """
-        sql_result = await self.tools.run_sql(self.sql_query, self.asession)
-        self.logger.debug(f"(Tool Response) SQL result: {sql_result}")
+        if self.duckdb_accelerator is None and self.max_query_cost is not None:
+            await self._check_sql_query_cost()
+
+        start_time = time.time()
+        if self.duckdb_accelerator is not None:
+            self.sql_result = await self.duckdb_accelerator.run_sql(
+                self.rewritten_sql_query,
+                self.metric_db_id,
+                timeout=self.sql_timeout,
+                normalized_sql_query=self.normalized_sql_query,
+                columnar=self.columnar_results,
+            )
+        else:
+            async with self._lease_session() as asession:
+                self.sql_result = await self.tools.run_sql(
+                    self.rewritten_sql_query,
+                    asession,
+                    timeout=self.sql_timeout,
+                    metric_db_id=self.metric_db_id,
+                    normalized_sql_query=self.normalized_sql_query,
+                    columnar=self.columnar_results,
+                )
+        execution_time = time.time() - start_time
+        self.logger.debug(f"(Tool Response) SQL result: {self.sql_result}")
+
+        if self.query_log is not None:
+            await self.query_log.log(
+                metric_db_id=self.metric_db_id,
+                # The dialect of the source database, which the advised
+                # indexes are created in, even when DuckDB ran the query
+                db_type=self.db_type,
+                best_tables=self.best_tables,
+                best_columns=self.best_columns,
+                sql_query=self.rewritten_sql_query,
+                execution_time=execution_time,
+                num_rows=len(self.sql_result["rows"]),
+            )
+
+        if self.template_answer_policy is not None and (
+            self.template_answer_policy.applies(
+                self.sql_result, self.query_language, self.query_script
+            )
+        ):
+            self.final_answer = render_template_answer(self.sql_result)
+            self.final_answer_path = FinalAnswerPath.TEMPLATE
+            self.logger.debug(f"(Template) Final answer: {self.final_answer}")
+            return None
 
         prompt = create_final_answer_prompt(
             self.eng_translation,
-            self.sql_query,
-            sql_result,
+            self.rewritten_sql_query,
+            format_sql_result(
+                self.sql_result, max_verbatim_rows=self.max_verbatim_result_rows
+            ),
             self.query_language,
             self.query_script,
         )
@@ -273,6 +705,7 @@ class LLMQueryProcessor:
         self.logger.debug(f"(Response) Final answer: {final_answer_llm_response}")
 
         self.final_answer = final_answer_llm_response["answer"]["answer"]
+        self.final_answer_path = FinalAnswerPath.LLM
         self.cost += float(final_answer_llm_response["cost"])
         self.final_answer_prompt = prompt
 
@@ -284,6 +717,27 @@ class LLMQueryProcessor:
             await self._get_sql_query_from_llm()
             await self._get_final_answer_from_llm()
 
+        except SQLTimeoutError as e:
+            self.logger.error(f"SQL timeout processing query: {e}")
+            self.final_answer = ""
+            self.error = str(e)
+
+            self.status = ProcessorStatus.SQL_TIMEOUT
+
+        except SQLCostExceededError as e:
+            self.logger.error(f"SQL query too expensive: {e}")
+            self.final_answer = ""
+            self.error = str(e)
+
+            self.status = ProcessorStatus.QUERY_TOO_EXPENSIVE
+
+        except UnsafeSQLError as e:
+            self.logger.error(f"Unsafe SQL query: {e}")
+            self.final_answer = ""
+            self.error = str(e)
+
+            self.status = ProcessorStatus.UNSAFE_SQL
+
         except Exception as e:
             self.logger.error(f"Error processing query: {e}")
             self.final_answer = ""
@@ -291,6 +745,59 @@ class LLMQueryProcessor:
 
             self.status = ProcessorStatus.INTERNAL_ERROR
 
+    def prepared_answer(self) -> dict | None:
+        """
+        The function returns the plan and final answer of a successfully
+        processed query, to be served again by a PreparedAnswerStore.
+        """
+        if self.status != ProcessorStatus.SUCCESS:
+            return None
+        return {
+            attribute: getattr(self, attribute)
+            for attribute in PREPARED_ANSWER_ATTRIBUTES
+            if hasattr(self, attribute)
+        }
+
+    @track_time(create_class_attr="timings")
+    async def _serve_prepared_answer(self) -> bool:
+        """
+        The function serves the prepared answer of the query, if it was warmed
+        and the data has not changed since. Returns whether it was served.
+        """
+        if self.answer_store is None:
+            return False
+        # Questions on databases without an engine go through the pipeline
+        if self.asession is None and not self.engine_registry.is_registered(
+            self.metric_db_id
+        ):
+            return False
+
+        async with self._lease_session() as asession:
+            self._data_version = await self.tools.get_data_version(asession)
+        prepared_answer = self.answer_store.get(
+            self.answer_store.key(self.metric_db_id, self.query), self._data_version
+        )
+        if prepared_answer is None:
+            return False
+
+        for attribute, value in prepared_answer.items():
+            setattr(self, attribute, value)
+        self.final_answer_path = FinalAnswerPath.PREPARED
+        self.status = ProcessorStatus.SUCCESS
+        return True
+
+    def _store_prepared_answer(self) -> None:
+        """
+        The function refreshes the prepared answer of a warmed query that was
+        answered through the pipeline, e.g. after the data changed.
+        """
+        if self.answer_store is None:
+            return
+        key = self.answer_store.key(self.metric_db_id, self.query)
+        prepared_answer = self.prepared_answer()
+        if prepared_answer is not None and self.answer_store.is_tracked(key):
+            self.answer_store.set(key, self._data_version, prepared_answer)
+
     @track_time(create_class_attr="timings")
     async def process_query(self, api_key: str | None = None) -> None:
         """
@@ -299,6 +806,9 @@ class LLMQueryProcessor:
         Args:
             api_key (str or None): (Optional) API key to use for the LLM call
         """
+        if await self._serve_prepared_answer():
+            return None
+
         self._api_key = api_key
 
         # Get query language and translation
@@ -309,26 +819,13 @@ class LLMQueryProcessor:
             await self._english_translation()
 
         # Check query safety
-        await self.guardrails.check_safety(
-            self.eng_translation["query_text"],
-            self.query_language,
-            self.query_script,
-            api_key=self._api_key,
-        )
-        self.logger.debug(f"(Guardrails) Safety: {self.guardrails.safe}")
+        await self._check_safety()
         if self.guardrails.safe is False:
             self.final_answer = self.guardrails.safety_response
             return None
 
         # Check answer relevance
-        await self.guardrails.check_relevance(
-            self.eng_translation["query_text"],
-            self.query_language,
-            self.query_script,
-            self.table_description,
-            api_key=self._api_key,
-        )
-        self.logger.debug(f"(Guardrails) Relevance: {self.guardrails.relevant}")
+        await self._check_relevance()
         if self.guardrails.relevant is False:
             self.final_answer = self.guardrails.relevance_response
             return None
@@ -337,9 +834,10 @@ class LLMQueryProcessor:
 
         self._api_key = None
 
-        # Set to success if no Internal Errors
-        if self.status != ProcessorStatus.INTERNAL_ERROR:
+        # Set to success if the data analysis did not fail
+        if self.status == ProcessorStatus.NOT_RUN:
             self.status = ProcessorStatus.SUCCESS
+            self._store_prepared_answer()
 
 
 class MultiTurnQueryProcessor(LLMQueryProcessor):
@@ -350,7 +848,7 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
     def __init__(
         self,
         query: dict,
-        asession: AsyncSession,
+        asession: AsyncSession | None,
         metric_db_id: str,
         db_type: str,
         llm: str,
@@ -362,13 +860,30 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         num_common_values: int,
         chat_history: list[dict] = [],
         log_level: str = "INFO",
+        schema_format: str = "ddl",
+        sql_timeout: float | None = None,
+        max_query_cost: float | None = None,
+        max_result_rows: int | None = None,
+        template_answer_policy: TemplateAnswerPolicy | None = None,
+        use_duckdb: bool = False,
+        query_log: QueryLog | None = None,
+        max_candidate_tables: int | None = None,
+        max_candidate_columns: int | None = None,
+        value_index: ValueIndex | None = None,
+        answer_store: PreparedAnswerStore | None = None,
+        history_manager: ChatHistoryManager | None = None,
+        conversation_id: str | None = None,
+        state_store: ConversationStateStore | None = None,
+        concurrent_stages: bool = False,
+        columnar_results: bool = False,
     ) -> None:
         """
         Initialize the MultiTurnQueryProcessor class.
 
         Args:
             query: The user query and query metadata.
-            asession: The SQLAlchemy AsyncSession object.
+            asession: The SQLAlchemy AsyncSession object, or None to lease
+                sessions from the EngineRegistry.
             metric_db_id: The database id to query.
             llm: The LLM model to use.
             guardrails_llm: The guardrails LLM model to use.
@@ -380,6 +895,39 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
             chat_memory_length: The number of previous interactions
                 to hold in memory.
             chat_history: The chat history.
+            log_level: The logging level to use.
+            schema_format: How table schemas are rendered in prompts,
+                "ddl" or "compact".
+            sql_timeout: Timeout in seconds for each SQL statement.
+            max_query_cost: Reject generated SQL queries whose estimated
+                cost is above this threshold.
+            max_result_rows: Inject or tighten a LIMIT on generated row-level
+                queries so they return at most this many rows.
+            template_answer_policy: Answer scalar and small labeled results
+                from a template when the policy accepts them.
+            use_duckdb: Generate and run the SQL query on the DuckDB mirror of
+                the database, if it is registered with the DuckDBAccelerator.
+            query_log: Log every SQL query run, for the index advisor.
+            max_candidate_tables: Only show the LLM the tables that best match
+                the question lexically, up to this many.
+            max_candidate_columns: Only show the LLM the columns of each best
+                table that best match the question lexically, up to this many.
+            value_index: Give the SQL LLM the categorical values mentioned in
+                the question instead of the most common values.
+            answer_store: Serve the prepared answers of warmed questions asked
+                at the start of a conversation.
+            history_manager: Compact the chat history passed to the prompts into
+                a rolling summary and the last turns, within a token budget.
+            conversation_id: The id of the conversation, used to keep its
+                rolling summary and state across turns.
+            state_store: Start follow-up questions from the best tables,
+                columns and common values of the previous question of the
+                conversation. Requires a conversation_id.
+            concurrent_stages: Run the query type classification and the
+                guardrails concurrently, where their inputs allow, instead of
+                in sequence.
+            columnar_results: Read SQL results into NumPy-backed
+                ColumnarResult objects instead of lists of rows.
         """
         super().__init__(
             query,
@@ -394,6 +942,18 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
             indicator_vars,
             num_common_values,
             log_level,
+            schema_format,
+            sql_timeout,
+            max_query_cost,
+            max_result_rows,
+            template_answer_policy,
+            use_duckdb,
+            query_log,
+            max_candidate_tables,
+            max_candidate_columns,
+            value_index,
+            answer_store,
+            columnar_results,
         )
         self.tools: SQLTools = get_tools_multiturn()
         self.query_type = None
@@ -401,6 +961,107 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         self.reframe_query_prompt = ""
         self.translated_final_answer = ""
         self.chat_history = chat_history
+        self.history_manager = history_manager
+        self.conversation_id = conversation_id
+        self.state_store = state_store
+        self.concurrent_stages = concurrent_stages
+        # Whether the plan of the previous question was reused
+        self.reused_state = False
+        # The chat history as passed to the prompts
+        self.prompt_chat_history: list[dict] = chat_history
+
+    @track_time(create_class_attr="timings")
+    async def _compact_chat_history(self) -> None:
+        """
+        The function compacts the chat history passed to the prompts, if a
+        history manager is set.
+        """
+        if self.history_manager is None:
+            return None
+        self.prompt_chat_history, cost = await self.history_manager.compact(
+            self.chat_history, self.conversation_id, api_key=self._api_key
+        )
+        self.cost += cost
+
+    async def _get_tables_outside(self, tables: list[str]) -> list[str]:
+        """
+        The function returns the tables that best match the question lexically,
+        or whose values it mentions, but are not among the given tables.
+        """
+        query_text = (
+            f"{self.eng_translation['query_text']} "
+            f"{self.eng_translation.get('query_metadata') or ''}"
+        )
+        new_tables: list[str] = []
+        all_tables = parse_table_description(self.table_description)
+        if all_tables is not None:
+            async with self._lease_session() as asession:
+                table_columns = await self.tools.get_table_columns(
+                    [table["name"] for table in all_tables],
+                    asession,
+                    self.metric_db_id,
+                )
+            best_match = self.retriever.retrieve_tables(
+                self.metric_db_id,
+                query_text,
+                self.table_description,
+                table_columns,
+                top_n=1,
+            )
+            new_tables += [table for table in best_match or [] if table not in tables]
+        if self.value_index is not None:
+            new_tables += [
+                table
+                for table in self.value_index.lookup(query_text)
+                if table not in tables and table not in new_tables
+            ]
+        return new_tables
+
+    @track_time(create_class_attr="timings")
+    async def _restore_conversation_state(self) -> None:
+        """
+        The function starts a follow-up question from the tables and SQL query
+        of the previous question of the conversation, unless the question needs
+        other tables. Its columns are selected again, since a follow-up can
+        ask about columns the previous question did not need.
+        """
+        if self.state_store is None or self.conversation_id is None:
+            return None
+        state = self.state_store.get(self.conversation_id, self.metric_db_id)
+        if state is None or not state["best_tables"]:
+            return None
+
+        new_tables = await self._get_tables_outside(state["best_tables"])
+        if new_tables:
+            self.logger.debug(f"(State) Follow-up needs new tables: {new_tables}")
+            return None
+
+        self.best_tables = state["best_tables"]
+        self.previous_sql_query = state["sql_query"]
+        self.reused_state = True
+        self.logger.debug(f"(State) Reusing the plan of {self.best_tables}")
+
+    def _save_conversation_state(self) -> None:
+        """
+        The function stores the tables and SQL query of the question, for
+        follow-up questions.
+        """
+        if self.state_store is None or self.conversation_id is None:
+            return None
+        self.state_store.set(
+            self.conversation_id,
+            self.metric_db_id,
+            {
+                attribute: getattr(self, attribute)
+                for attribute in CONVERSATION_STATE_ATTRIBUTES
+            },
+        )
+
+    async def _get_best_tables_from_llm(self) -> None:
+        """The best tables of the previous question are reused, if restored."""
+        if self.reused_state:
+            return None
+        await super()._get_best_tables_from_llm()
 
     @track_time(create_class_attr="timings")
     async def _get_query_type(self):
@@ -408,7 +1069,7 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         The function asks the LLM model to identify the type of the user's query.
         """
         system_message, prompt = create_question_type_prompt(
-            self.eng_translation, self.chat_history
+            self.eng_translation, self.prompt_chat_history
         )
         self.logger.debug(f"(Prompt) Query Type: {prompt}")
 
@@ -428,8 +1089,17 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         """
         The function asks the LLM model to reframe the user query
         """
+        self._apply_reframed_query(await self._ask_reframed_query())
+
+    @track_time(create_class_attr="timings")
+    async def _ask_reframed_query(self) -> str:
+        """
+        The function asks the LLM model to reframe the user query, and returns
+        the reframed query without using it.
+        """
         sys_message, prompt = create_reframe_query_prompt(
-            self.eng_translation["query_text"], chat_history=self.chat_history[::-1]
+            self.eng_translation["query_text"],
+            chat_history=self.prompt_chat_history[::-1],
         )
         self.logger.debug(f"(Prompt) Reframe Query: {prompt}")
         self.reframe_query_prompt = prompt
@@ -440,15 +1110,79 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
             temperature=self.temperature,
             api_key=self._api_key,
         )
-
-        self.reframed_query = reframed_query_llm_response["answer"]["reframed_query"]
         self.cost += float(reframed_query_llm_response["cost"])
+        return reframed_query_llm_response["answer"]["reframed_query"]
+
+    def _apply_reframed_query(self, reframed_query: str) -> None:
+        """The function replaces the English query by its reframing."""
+        self.reframed_query = reframed_query
+        self.eng_translation["original_query"] = self.eng_translation["query_text"]
+        self.eng_translation["query_text"] = self.reframed_query
+
+    @track_time(create_class_attr="timings")
+    async def _classify_and_check(self) -> None:
+        """
+        The function identifies the type of the query, reframes it if it is
+        not a new question, and checks the safety and relevance of the
+        (reframed) query, in sequence.
+        """
+        await self._get_query_type()
+
+        # If not a new question, reframe the query
+        if self.query_type != 1:
+            await self._get_reframed_query()
+
+        await self._check_safety()
+        if self.guardrails.safe is False:
+            return None
+        await self._check_relevance()
+
+    @track_time(create_class_attr="timings")
+    async def _classify_and_check_concurrently(self) -> None:
+        """
+        The function identifies the type of the query and checks its safety
+        concurrently, on the English query, and checks the relevance of the
+        (reframed) query once.
+
+        Without a chat history, the query cannot refer to earlier turns, so
+        its relevance is checked concurrently too. Otherwise it depends on
+        the reframing, which is requested concurrently, and cancelled as soon
+        as the query turns out to be a new question or unsafe.
+        """
+        if not self.prompt_chat_history:
+            await asyncio.gather(
+                self._get_query_type(),
+                self._check_safety(),
+                self._check_relevance(),
+            )
+            if self.query_type != 1 and self.guardrails.safe is not False:
+                await self._get_reframed_query()
+            return None
+
+        reframing = asyncio.ensure_future(self._ask_reframed_query())
+
+        async def _classify() -> None:
+            await self._get_query_type()
+            if self.query_type == 1:
+                reframing.cancel()
+
+        try:
+            await asyncio.gather(_classify(), self._check_safety())
+        except BaseException:
+            reframing.cancel()
+            raise
+        if self.guardrails.safe is False:
+            reframing.cancel()
+            return None
+        if self.query_type != 1:
+            self._apply_reframed_query(await reframing)
+        await self._check_relevance()
 
     @track_time(create_class_attr="timings")
     async def _get_clarifying_final_answer(self) -> None:
         prompt = create_clarifying_answer_prompt(
             self.eng_translation,
-            self.chat_history,
+            self.prompt_chat_history,
             self.query_language,
             self.query_script,
         )
@@ -495,8 +1229,20 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         Args:
             api_key (str or None): (Optional) API key to use for the LLM call
         """
+        # Warmed questions only stand on their own without a chat history
+        if not self.chat_history and await self._serve_prepared_answer():
+            # Answers warmed by a single-turn processor have no query type or
+            # translated answer: they answer a new, stand-alone question
+            if self.query_type is None:
+                self.query_type = 1
+            if not self.translated_final_answer:
+                self.translated_final_answer = self.final_answer
+            return None
+
         self._api_key = api_key
 
+        await self._compact_chat_history()
+
         # Get query language
         await self._get_query_language_from_llm()
         if self.query_language == "English" and self.query_script == "Latin":
@@ -504,42 +1250,26 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
         else:
             await self._english_translation()
 
-        # Check query type
-        await self._get_query_type()
-
-        # If not a new question, reframe the query
-        if self.query_type != 1:
-            await self._get_reframed_query()
-            self.eng_translation["original_query"] = self.eng_translation["query_text"]
-            self.eng_translation["query_text"] = self.reframed_query
-
-        # Check query safety
-        await self.guardrails.check_safety(
-            self.eng_translation["query_text"],
-            self.query_language,
-            self.query_script,
-            api_key=self._api_key,
-        )
+        # Check query type, reframe the query if needed, and check its safety
+        # and relevance
+        if self.concurrent_stages:
+            await self._classify_and_check_concurrently()
+        else:
+            await self._classify_and_check()
 
         if self.guardrails.safe is False:
             self.final_answer = self.guardrails.safety_response
             await self._get_translated_final_answer()
             return None
 
-        await self.guardrails.check_relevance(
-            self.eng_translation["query_text"],
-            self.query_language,
-            self.query_script,
-            self.table_description,
-            api_key=self._api_key,
-        )
-
         if self.guardrails.relevant is False:
             self.final_answer = self.guardrails.relevance_response
             await self._get_translated_final_answer()
             return None
 
         if (self.query_type == 1) or (self.query_type == 2):
+            if self.query_type == 2:
+                await self._restore_conversation_state()
             # Step through rest of pipeline
             await self._run_data_analysis()
 
@@ -550,6 +1280,10 @@ class MultiTurnQueryProcessor(LLMQueryProcessor):
 
         self._api_key = None
 
-        # Set to success if no Internal Errors
-        if self.status != ProcessorStatus.INTERNAL_ERROR:
+        # Set to success if the data analysis did not fail
+        if self.status == ProcessorStatus.NOT_RUN:
             self.status = ProcessorStatus.SUCCESS
+            if not self.chat_history:
+                self._store_prepared_answer()
+            if self.query_type in (1, 2):
+                self._save_conversation_state()
@@ -0,0 +1,80 @@
+from typing import Any, Dict, Hashable
+
+from cachetools import LRUCache
+
+
+class SQLResultCache:
+    """
+    Memory-bounded LRU cache of SQL results, invalidated by data version.
+
+    Each entry stores the data version of the database at the time the query
+    ran. A lookup with a different data version is a miss, and the stale entry
+    is dropped.
+    """
+
+    def __init__(self, max_size: int = 50_000_000) -> None:
+        """
+        Initialize the SQLResultCache class.
+
+        Args:
+            max_size (int): Maximum total size of the cached results, measured
+                as the length of their string representation.
+        """
+        self._cache: LRUCache = LRUCache(
+            maxsize=max_size, getsizeof=lambda entry: entry["size"]
+        )
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, data_version: str) -> Any | None:
+        """
+        Return the cached result for `key` if it was computed at `data_version`.
+
+        Args:
+            key (Hashable): The cache key.
+            data_version (str): The current data version of the database.
+        """
+        entry = self._cache.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry["data_version"] != data_version:
+            self.invalidations += 1
+            self.misses += 1
+            del self._cache[key]
+            return None
+        self.hits += 1
+        return entry["result"]
+
+    def set(self, key: Hashable, data_version: str, result: Any, size: int) -> None:
+        """
+        Cache a result. Results larger than the whole cache are not cached.
+
+        Args:
+            key (Hashable): The cache key.
+            data_version (str): The data version the result was computed at.
+            result (Any): The result to cache.
+            size (int): The size of the result.
+        """
+        entry = {"data_version": data_version, "result": result, "size": max(size, 1)}
+        if entry["size"] > self._cache.maxsize:
+            return
+        self._cache[key] = entry
+
+    def clear(self) -> None:
+        """Clear the cache, keeping the metrics."""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the hit-rate metrics and size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache),
+            "size": self._cache.currsize,
+            "max_size": self._cache.maxsize,
+        }
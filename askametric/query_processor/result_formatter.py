@@ -0,0 +1,135 @@
+from decimal import Decimal
+from numbers import Number
+from typing import Any, Sequence
+
+import numpy as np
+
+from .columnar_result import ColumnarResult
+
+
+def format_value(value: Any) -> str:
+    """Render a single value compactly, rounding floats sensibly."""
+    if isinstance(value, bool) or value is None:
+        return str(value)
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        if not np.isfinite(value):
+            return str(value)
+        if value.is_integer():
+            return str(int(value))
+        if abs(value) >= 1:
+            return str(round(value, 2))
+        return f"{value:.3g}"
+    return str(value)
+
+
+def _is_numeric(values: Sequence[Any]) -> bool:
+    """Check whether all non-null values of a column are numbers."""
+    non_null = [value for value in values if value is not None]
+    return bool(non_null) and all(
+        isinstance(value, Number) and not isinstance(value, bool) for value in non_null
+    )
+
+
+def _format_columns(column_names: Sequence[str], columns: Sequence[Sequence]) -> str:
+    """Render columns one per line, with all their values."""
+    return "\n".join(
+        [
+            f"{name}: {', '.join([format_value(value) for value in values])}"
+            for name, values in zip(column_names, columns)
+        ]
+    )
+
+
+def _summarize_column(name: str, values: Sequence[Any], num_top_groups: int) -> str:
+    """Summarize a column with vectorized NumPy aggregations."""
+    non_null = None
+    if isinstance(values, np.ndarray) and values.dtype.kind in "iuf":
+        # Numeric columns of a ColumnarResult have no nulls
+        non_null = values.astype(float)
+    elif _is_numeric(values):
+        array = np.array(
+            [np.nan if value is None else value for value in values], dtype=float
+        )
+        non_null = array[~np.isnan(array)]
+
+    if non_null is not None:
+        return (
+            f"{name}: count={non_null.size}, sum={format_value(non_null.sum())}, "
+            f"min={format_value(non_null.min())}, "
+            f"max={format_value(non_null.max())}, "
+            f"mean={format_value(non_null.mean())}"
+        )
+
+    array = np.array([str(value) for value in values if value is not None])
+    if array.size == 0:
+        return f"{name}: count=0"
+    groups, counts = np.unique(array, return_counts=True)
+    top = np.argsort(-counts, kind="stable")[:num_top_groups]
+    top_groups = ", ".join([f"{groups[i]} ({counts[i]})" for i in top])
+    return (
+        f"{name}: count={array.size}, distinct={groups.size}, top groups: {top_groups}"
+    )
+
+
+def format_sql_result(
+    sql_result: dict,
+    max_verbatim_rows: int = 50,
+    num_sample_rows: int = 10,
+    num_top_groups: int = 5,
+) -> str:
+    """
+    Render the result of `SQLTools.run_sql` compactly for the final answer prompt.
+
+    Results with up to `max_verbatim_rows` rows are rendered column-wise in full.
+    Larger results are replaced by per-column summaries (count, sum, min/max and
+    mean for numeric columns, top groups for the others), followed by a sample
+    of the rows.
+
+    The rows may be a list of rows or a ColumnarResult, whose columns are then
+    used as they are.
+
+    Args:
+        sql_result (dict): The result of `SQLTools.run_sql`.
+        max_verbatim_rows (int): Maximum number of rows to render in full.
+        num_sample_rows (int): Number of rows to show alongside the summaries.
+        num_top_groups (int): Number of top groups to show per column.
+
+    Returns:
+        str: The formatted result.
+    """
+    rows = sql_result["rows"]
+    if not rows:
+        return "The query returned no rows."
+
+    if isinstance(rows, ColumnarResult):
+        column_names = list(rows.column_names)
+        columns: Sequence[Sequence] = rows.columns
+    else:
+        column_names = list(rows[0]._fields)
+        columns = list(zip(*rows))
+
+    header = f"{len(rows)} rows"
+    if sql_result["truncated"]:
+        header = (
+            f"First {len(rows)} rows of more than {len(rows)} rows "
+            "(the result was truncated)"
+        )
+
+    if len(rows) <= max_verbatim_rows:
+        return f"{header}:\n{_format_columns(column_names, columns)}"
+
+    summaries = "\n".join(
+        [
+            _summarize_column(name, values, num_top_groups)
+            for name, values in zip(column_names, columns)
+        ]
+    )
+    sample = _format_columns(
+        column_names, [values[:num_sample_rows] for values in columns]
+    )
+    return (
+        f"{header}, summarized per column:\n{summaries}\n\n"
+        f"Sample of the first {min(num_sample_rows, len(rows))} rows:\n{sample}"
+    )
@@ -0,0 +1,351 @@
+import json
+import math
+import re
+from collections import Counter
+from typing import Dict, Hashable, List, Tuple
+
+from cachetools import TTLCache
+
+_retriever_instance = None
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by do does for from has have how in is it its many
+    much of on or per the their there this to was were what when where which
+    who will with
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase word tokens for lexical retrieval: identifiers
+    are split on underscores, stopwords are dropped and plurals are reduced
+    to their singular.
+    """
+    tokens = []
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 index over a small collection of documents."""
+
+    def __init__(
+        self, documents: Dict[Hashable, str], k1: float = 1.5, b: float = 0.75
+    ) -> None:
+        """
+        Initialize the BM25Index class.
+
+        Args:
+            documents (dict[Hashable, str]): The text of each document.
+            k1 (float): Term frequency saturation.
+            b (float): Document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.keys = list(documents)
+        self._term_counts = [Counter(tokenize(documents[key])) for key in self.keys]
+        self._lengths = [sum(counts.values()) for counts in self._term_counts]
+        self._mean_length = (
+            sum(self._lengths) / len(self._lengths) if self._lengths else 0.0
+        )
+        document_frequencies: Counter = Counter()
+        for counts in self._term_counts:
+            document_frequencies.update(counts.keys())
+        num_documents = len(self.keys)
+        self._idf = {
+            term: math.log(1 + (num_documents - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequencies.items()
+        }
+
+    def search(
+        self, query: str, top_n: int | None = None
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Rank the documents by their BM25 score for a query.
+
+        Args:
+            query (str): The query text.
+            top_n (int | None): (Optional) Number of documents to return.
+
+        Returns:
+            list[tuple[Hashable, float]]: The document keys and their scores,
+                best first.
+        """
+        query_terms = [term for term in tokenize(query) if term in self._idf]
+        scores = []
+        for key, counts, length in zip(self.keys, self._term_counts, self._lengths):
+            score = 0.0
+            for term in query_terms:
+                frequency = counts.get(term, 0)
+                if frequency:
+                    score += (
+                        self._idf[term]
+                        * frequency
+                        * (self.k1 + 1)
+                        / (
+                            frequency
+                            + self.k1
+                            * (1 - self.b + self.b * length / (self._mean_length or 1))
+                        )
+                    )
+            scores.append((key, score))
+        scores.sort(key=lambda key_score: key_score[1], reverse=True)
+        return scores[:top_n] if top_n is not None else scores
+
+
+def parse_table_description(table_description: str) -> List[Dict[str, str]] | None:
+    """
+    Parse a table description, a JSON list of {"name", "description"} objects.
+    Return None if it is not in that format.
+    """
+    try:
+        tables = json.loads(table_description)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(tables, list) or not all(
+        isinstance(table, dict) and "name" in table for table in tables
+    ):
+        return None
+    return tables
+
+
+class SchemaRetriever:
+    """
+    Lexical retrieval of the tables and columns relevant to a question, to
+    shortlist the candidates shown to the LLM. The indexes are built once per metric
+    database and cached.
+    """
+
+    def __init__(self, min_score: float = 1.0) -> None:
+        """
+        Initialize the SchemaRetriever class.
+
+        Args:
+            min_score (float): Minimum score of the best match for retrieval
+                to be trusted. Below it, the full list is used.
+        """
+        self.min_score = min_score
+        self._table_indexes: TTLCache = TTLCache(maxsize=100, ttl=60 * 60 * 24)
+        self._column_indexes: TTLCache = TTLCache(maxsize=1000, ttl=60 * 60 * 24)
+
+    def _get_table_index(
+        self,
+        metric_db_id: str,
+        tables: List[Dict[str, str]],
+        table_columns: Dict[str, List[str]],
+    ) -> BM25Index:
+        """Build, or return the cached, table index of a metric database."""
+        cache_key = (metric_db_id, json.dumps(tables, sort_keys=True))
+        if cache_key not in self._table_indexes:
+            self._table_indexes[cache_key] = BM25Index(
+                {
+                    table["name"]: " ".join(
+                        [
+                            table["name"],
+                            str(table.get("description", "")),
+                            " ".join(table_columns.get(table["name"], [])),
+                        ]
+                    )
+                    for table in tables
+                }
+            )
+        return self._table_indexes[cache_key]
+
+    def retrieve_tables(
+        self,
+        metric_db_id: str,
+        query_text: str,
+        table_description: str,
+        table_columns: Dict[str, List[str]],
+        top_n: int,
+    ) -> List[str] | None:
+        """
+        Shortlist the `top_n` tables that best match a question.
+
+        Args:
+            metric_db_id (str): The database id.
+            query_text (str): The question.
+            table_description (str): The table description of the database, a
+                JSON list of {"name", "description"} objects.
+            table_columns (dict[str, list[str]]): The column names of each table.
+            top_n (int): Number of tables to shortlist.
+
+        Returns:
+            list[str] | None: The shortlisted table names, best first, or None
+                if the full list should be used: the description is not in the
+                expected format, there are no more than `top_n` tables, or the
+                best match scores below `min_score`.
+        """
+        tables = parse_table_description(table_description)
+        if tables is None or len(tables) <= top_n:
+            return None
+
+        ranked_tables = self._get_table_index(
+            metric_db_id, tables, table_columns
+        ).search(query_text, top_n)
+        if not ranked_tables or ranked_tables[0][1] < self.min_score:
+            return None
+        return [table for table, _ in ranked_tables]
+
+    def _get_column_index(
+        self,
+        metric_db_id: str,
+        table: str,
+        columns: List[str],
+        column_description: str,
+        categorical_values: Dict[str, List[str]],
+    ) -> BM25Index:
+        """Build, or return the cached, column index of a table."""
+        cache_key = (metric_db_id, table, tuple(columns), column_description)
+        if cache_key not in self._column_indexes:
+            snippets = column_description_snippets(column_description, columns)
+            self._column_indexes[cache_key] = BM25Index(
+                {
+                    column: " ".join(
+                        [
+                            column,
+                            " ".join(snippets.get(column, [])),
+                            " ".join(categorical_values.get(column, [])),
+                        ]
+                    )
+                    for column in columns
+                }
+            )
+        return self._column_indexes[cache_key]
+
+    def retrieve_columns(
+        self,
+        metric_db_id: str,
+        query_text: str,
+        table_columns: Dict[str, List[str]],
+        column_description: str,
+        categorical_values: Dict[str, Dict[str, List[str]]],
+        top_m: int,
+    ) -> Dict[str, List[str]]:
+        """
+        Shortlist the `top_m` columns of each table that best match a question.
+
+        Args:
+            metric_db_id (str): The database id.
+            query_text (str): The question.
+            table_columns (dict[str, list[str]]): The column names of each table.
+            column_description (str): The description of the columns.
+            categorical_values (dict[str, dict[str, list[str]]]): The distinct
+                values of the categorical columns of each table.
+            top_m (int): Number of columns to shortlist per table.
+
+        Returns:
+            dict[str, list[str]]: The shortlisted columns of each table, in
+                table order. All the columns of a table are kept if it has no
+                more than `top_m` columns or if its best match scores below
+                `min_score`.
+        """
+        candidate_columns = {}
+        for table, columns in table_columns.items():
+            if len(columns) <= top_m:
+                candidate_columns[table] = columns
+                continue
+
+            ranked_columns = self._get_column_index(
+                metric_db_id,
+                table,
+                columns,
+                column_description,
+                categorical_values.get(table, {}),
+            ).search(query_text, top_m)
+            if not ranked_columns or ranked_columns[0][1] < self.min_score:
+                candidate_columns[table] = columns
+                continue
+
+            shortlisted = {column for column, _ in ranked_columns}
+            candidate_columns[table] = [
+                column for column in columns if column in shortlisted
+            ]
+        return candidate_columns
+
+
+def column_description_snippets(
+    column_description: str, columns: List[str]
+) -> Dict[str, List[str]]:
+    """
+    Find the lines of a free-form column description that mention each column.
+
+    Args:
+        column_description (str): The description of the columns.
+        columns (list[str]): The column names.
+
+    Returns:
+        dict[str, list[str]]: The lines mentioning each column.
+    """
+    snippets: Dict[str, List[str]] = {}
+    lines = [line for line in (column_description or "").splitlines() if line.strip()]
+    for column in columns:
+        pattern = re.compile(rf"(?<![\w]){re.escape(column)}(?![\w])", re.IGNORECASE)
+        snippets[column] = [line for line in lines if pattern.search(line)]
+    return snippets
+
+
+def filter_column_description(
+    column_description: str,
+    table_columns: Dict[str, List[str]],
+    candidate_columns: Dict[str, List[str]],
+) -> str:
+    """
+    Drop the lines of a column description that only describe columns that
+    were not shortlisted. Lines that mention no column are kept.
+
+    Args:
+        column_description (str): The description of the columns.
+        table_columns (dict[str, list[str]]): All the column names of each table.
+        candidate_columns (dict[str, list[str]]): The shortlisted columns.
+
+    Returns:
+        str: The filtered column description.
+    """
+    all_columns = {column for columns in table_columns.values() for column in columns}
+    kept_columns = {
+        column for columns in candidate_columns.values() for column in columns
+    }
+    dropped_lines = set()
+    kept_lines = set()
+    for column, lines in column_description_snippets(
+        column_description, list(all_columns)
+    ).items():
+        (kept_lines if column in kept_columns else dropped_lines).update(lines)
+    return "\n".join(
+        [
+            line
+            for line in (column_description or "").splitlines()
+            if line not in dropped_lines or line in kept_lines
+        ]
+    )
+
+
+def filter_table_description(table_description: str, table_names: List[str]) -> str:
+    """
+    Keep only the given tables in a table description, in the given order.
+
+    Args:
+        table_description (str): A JSON list of {"name", "description"} objects.
+        table_names (list[str]): The tables to keep.
+
+    Returns:
+        str: The filtered table description.
+    """
+    tables = {table["name"]: table for table in json.loads(table_description)}
+    return json.dumps([tables[name] for name in table_names if name in tables])
+
+
+def get_retriever() -> SchemaRetriever:
+    """Return the SchemaRetriever instance."""
+    global _retriever_instance
+    if _retriever_instance is None:
+        _retriever_instance = SchemaRetriever()
+    return _retriever_instance
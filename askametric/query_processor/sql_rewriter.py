@@ -0,0 +1,242 @@
+import sqlglot
+from sqlglot import exp
+from sqlglot.errors import ParseError, TokenError
+from sqlglot.tokens import TokenType
+
+# Map the `db_type` used by the pipeline to sqlglot dialects
+SQLGLOT_DIALECTS = {
+    "sqlite": "sqlite",
+    "postgresql": "postgres",
+    "postgres": "postgres",
+    "mysql": "mysql",
+    "mariadb": "mysql",
+    "duckdb": "duckdb",
+}
+
+_FORBIDDEN_EXPRESSIONS = (
+    exp.Insert,
+    exp.Update,
+    exp.Delete,
+    exp.Merge,
+    exp.Create,
+    exp.Drop,
+    exp.Alter,
+    exp.TruncateTable,
+    exp.Command,
+)
+
+# Statement types allowed to start a query, and keywords forbidden anywhere in
+# it, when the query cannot be parsed and only its tokens are checked
+_ALLOWED_FIRST_TOKENS = (TokenType.SELECT, TokenType.WITH, TokenType.L_PAREN)
+_FORBIDDEN_TOKENS = (
+    TokenType.INSERT,
+    TokenType.UPDATE,
+    TokenType.DELETE,
+    TokenType.MERGE,
+    TokenType.CREATE,
+    TokenType.DROP,
+    TokenType.ALTER,
+    TokenType.TRUNCATE,
+    TokenType.REPLACE,
+    TokenType.INTO,
+    TokenType.GRANT,
+    TokenType.ATTACH,
+    TokenType.DETACH,
+    TokenType.PRAGMA,
+    TokenType.SET,
+    TokenType.EXECUTE,
+    TokenType.COPY,
+    TokenType.COMMAND,
+    TokenType.LOCK,
+)
+# Words following FOR in the row-locking clauses of a SELECT
+_LOCK_WORDS = ("UPDATE", "SHARE", "NO", "KEY")
+
+# Functions reading files, URLs or other databases reachable by the server
+# (e.g. DuckDB's read_text or read_csv, PostgreSQL's pg_read_file)
+_FILE_FUNCTION_PREFIXES = ("read_", "pg_read_", "pg_ls_", "lo_")
+_FILE_FUNCTION_SUFFIXES = ("_scan", "_attach", "_metadata", "_schema")
+_FILE_FUNCTIONS = (
+    "glob",
+    "load_file",
+    "pg_stat_file",
+    "parquet_file_metadata",
+    "sniff_csv",
+    "query_table",
+)
+
+
+class UnsafeSQLError(Exception):
+    """Raised when a generated SQL query is not a read-only SELECT query."""
+
+
+def get_sqlglot_dialect(db_type: str) -> str | None:
+    """
+    Return the sqlglot dialect for a database type, or None if unknown.
+    """
+    return SQLGLOT_DIALECTS.get(db_type.lower())
+
+
+def _is_file_function(name: str) -> bool:
+    """Check whether a function reads files, URLs or other databases."""
+    name = name.lower()
+    return (
+        name in _FILE_FUNCTIONS
+        or name.startswith(_FILE_FUNCTION_PREFIXES)
+        or name.endswith(_FILE_FUNCTION_SUFFIXES)
+    )
+
+
+def _check_file_access(query: exp.Expression) -> None:
+    """
+    Check that a query does not read files, URLs or other databases, through
+    table functions or file paths used as table names.
+
+    Raises:
+        UnsafeSQLError: If it does.
+    """
+    for function in query.find_all(exp.Func):
+        name = function.name if isinstance(function, exp.Anonymous) else ""
+        if isinstance(function, (exp.ReadCSV, exp.ReadParquet)) or (
+            name and _is_file_function(name)
+        ):
+            raise UnsafeSQLError(
+                f"SQL queries may not read files, got {name or function.sql_name()}"
+            )
+    for table in query.find_all(exp.Table):
+        if "/" in table.name or "\\" in table.name:
+            raise UnsafeSQLError(f"SQL queries may not read files, got {table.name}")
+
+
+def _returns_single_row(query: exp.Expression) -> bool:
+    """
+    Check whether a query is an aggregate without GROUP BY, which always
+    returns a single row.
+    """
+    return (
+        isinstance(query, exp.Select)
+        and not query.args.get("group")
+        and all(
+            projection.find(exp.AggFunc) is not None for projection in query.expressions
+        )
+    )
+
+
+def _check_unparsed_sql(sql_query: str, dialect: str | None) -> None:
+    """
+    Check, from its tokens only, that a query that could not be parsed is a
+    single read-only SELECT query.
+
+    Raises:
+        UnsafeSQLError: If the query cannot be tokenized, is not a single
+            SELECT query, or contains a DML/DDL keyword.
+    """
+    try:
+        tokens = sqlglot.tokenize(sql_query, read=dialect)
+    except TokenError as e:
+        raise UnsafeSQLError(f"Could not parse SQL query: {e}") from e
+
+    while tokens and tokens[-1].token_type == TokenType.SEMICOLON:
+        tokens.pop()
+    if not tokens or tokens[0].token_type not in _ALLOWED_FIRST_TOKENS:
+        raise UnsafeSQLError("Could not parse SQL query, and it is not a SELECT")
+    for token, next_token in zip(tokens, tokens[1:] + [None]):
+        if token.token_type == TokenType.SEMICOLON:
+            raise UnsafeSQLError("Expected a single SQL statement")
+        if (
+            next_token is not None
+            and next_token.token_type == TokenType.L_PAREN
+            and _is_file_function(token.text)
+        ):
+            raise UnsafeSQLError(f"SQL queries may not read files, got {token.text}")
+        if (
+            token.token_type == TokenType.FOR
+            and next_token is not None
+            and next_token.text.upper() in _LOCK_WORDS
+        ):
+            raise UnsafeSQLError("SELECT queries may not lock rows")
+        if token.token_type in _FORBIDDEN_TOKENS:
+            raise UnsafeSQLError(
+                f"Only SELECT queries are allowed, got {token.text.upper()}"
+            )
+
+
+def rewrite_sql(
+    sql_query: str, db_type: str, max_rows: int | None = None
+) -> tuple[str, str, list[str]]:
+    """
+    Statically checks and rewrites a generated SQL query before execution.
+
+    The query must be a single read-only SELECT (or set operation) query.
+    If `max_rows` is given, a LIMIT is injected into row-level queries that
+    lack one, and tightened on queries whose LIMIT is larger.
+
+    Args:
+        sql_query (str): The SQL query to rewrite.
+        db_type (str): The type of the database.
+        max_rows (int | None): (Optional) Maximum number of rows the query
+            may return.
+
+    Returns:
+        tuple[str, str, list[str]]: The rewritten SQL query, its normalized
+            text (e.g. to use as a cache key), and the reasons for each rewrite.
+
+    Raises:
+        UnsafeSQLError: If the query contains DML/DDL, SELECT INTO, row locks,
+            reads files through table functions, or has several statements.
+            Queries that cannot be parsed are checked from their tokens, and
+            rejected unless they are a single SELECT query.
+    """
+    dialect = get_sqlglot_dialect(db_type)
+    try:
+        statements = [
+            statement
+            for statement in sqlglot.parse(sql_query, read=dialect)
+            if statement is not None
+        ]
+    except (ParseError, TokenError):
+        # Let the database report the error of a read-only query, but do not
+        # rewrite what we could not parse
+        _check_unparsed_sql(sql_query, dialect)
+        return sql_query, sql_query.strip(), ["Could not parse SQL query"]
+
+    if len(statements) != 1:
+        raise UnsafeSQLError(
+            f"Expected a single SQL statement, got {len(statements)} statements"
+        )
+    query = statements[0]
+
+    forbidden = query.find(*_FORBIDDEN_EXPRESSIONS)
+    if forbidden is not None or not isinstance(query, exp.Query):
+        statement_type = type(forbidden or query).__name__.upper()
+        raise UnsafeSQLError(f"Only SELECT queries are allowed, got {statement_type}")
+    for select in query.find_all(exp.Select):
+        # SELECT ... INTO creates a table, and FOR UPDATE/SHARE locks rows
+        if select.args.get("into") is not None:
+            raise UnsafeSQLError("Only SELECT queries are allowed, got SELECT INTO")
+        if select.args.get("locks"):
+            raise UnsafeSQLError("SELECT queries may not lock rows")
+    _check_file_access(query)
+
+    reasons = []
+    if max_rows is not None and not _returns_single_row(query):
+        limit = query.args.get("limit")
+        if limit is None:
+            query = query.limit(max_rows)
+            reasons.append(f"Added LIMIT {max_rows}")
+        else:
+            limit_value = limit.expression
+            if (
+                isinstance(limit_value, exp.Literal)
+                and limit_value.is_int
+                and int(limit_value.name) > max_rows
+            ):
+                query = query.limit(max_rows)
+                reasons.append(
+                    f"Tightened LIMIT {limit_value.name} to LIMIT {max_rows}"
+                )
+
+    rewritten_sql = sql_query if not reasons else query.sql(dialect=dialect)
+    normalized_sql = query.sql(dialect=dialect, normalize=True, comments=False)
+
+    return rewritten_sql, normalized_sql, reasons
@@ -1,19 +1,169 @@
+import asyncio
+import json
+import os
+import re
+import threading
+import time
 from collections import defaultdict
 from functools import wraps
-from typing import Any, Callable, Dict, List
+from typing import (
+    Any,
+    AsyncContextManager,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Sequence,
+    TypeVar,
+)
 
-from aiocache import cached
 from cachetools import TTLCache
-from sqlalchemy import MetaData, inspect, select, text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import (
+    Column,
+    Dialect,
+    MetaData,
+    Row,
+    RowMapping,
+    Table,
+    inspect,
+    select,
+    text,
+)
+from sqlalchemy.exc import CompileError, DBAPIError, NoSuchTableError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
 from sqlalchemy.schema import CreateTable
 
 from ..utils import track_time
+from .columnar_result import ColumnarResult, estimate_size
+from .json_columns import (
+    discover_json_paths,
+    is_json_type,
+    json_path_expression,
+    parse_json_object,
+    render_json_paths,
+)
+from .result_cache import SQLResultCache
 
 
 _tools_instance = None
 _tools_instance_multiturn = None
 
+SCHEMA_FORMATS = ("ddl", "compact")
+
+T = TypeVar("T")
+
+
+class SQLTimeoutError(Exception):
+    """Raised when a SQL statement runs longer than the statement timeout."""
+
+
+class SQLCostExceededError(Exception):
+    """Raised when the estimated cost of a SQL query is above the threshold."""
+
+
+def subset_table(table: Table, columns: List[str]) -> Table:
+    """
+    Returns a copy of a table with only some of its columns, for rendering
+    its DDL. Primary and foreign key columns are always kept so that joins
+    remain possible, but the constraints themselves are not copied.
+
+    Args:
+    - table (Table): The reflected table.
+    - columns (list[str]): The columns to keep.
+
+    Returns:
+    - Table: The table with only the kept columns.
+    """
+    kept_columns = [
+        column
+        for column in table.columns
+        if column.name in columns or column.primary_key or column.foreign_keys
+    ]
+    if not kept_columns:
+        return table
+    return Table(
+        table.name,
+        MetaData(),
+        *[
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                nullable=column.nullable,
+            )
+            for column in kept_columns
+        ],
+        schema=table.schema,
+    )
+
+
+def render_compact_table(
+    table_key: str,
+    table: Table,
+    sample_rows: Sequence[RowMapping],
+    dialect: Dialect,
+    max_value_length: int,
+    columns: List[str] | None = None,
+) -> str:
+    """
+    Renders a table as a compact `table(col TYPE, ...)` signature with
+    PK/FK markers, followed by its sample rows with long values truncated.
+
+    Args:
+    - table_key (str): The (optionally schema-qualified) table name.
+    - table (Table): The reflected table.
+    - sample_rows (Sequence[RowMapping]): The sample rows of the table.
+    - dialect (Dialect): The dialect used to compile the column types.
+    - max_value_length (int): Sample values longer than this are truncated.
+    - columns (list[str] | None): (Optional) Only render these columns. Primary
+        and foreign key columns are always kept so that joins remain possible.
+
+    Returns:
+    - str: The compact schema of the table.
+    """
+    rendered_columns = [
+        column
+        for column in table.columns
+        if columns is None
+        or column.name in columns
+        or column.primary_key
+        or column.foreign_keys
+    ]
+    if not rendered_columns:
+        rendered_columns = list(table.columns)
+
+    column_strs = []
+    for column in rendered_columns:
+        try:
+            column_type = column.type.compile(dialect=dialect)
+        except CompileError:
+            column_type = ""
+        column_str = f"{column.name} {column_type}".strip()
+        if column.primary_key:
+            column_str += " PK"
+        for foreign_key in column.foreign_keys:
+            column_str += f" FK->{foreign_key.target_fullname}"
+        column_strs.append(column_str)
+
+    def _truncate(value: Any) -> str:
+        """Truncate long sample values."""
+        value_str = str(value)
+        if len(value_str) > max_value_length:
+            return value_str[:max_value_length] + "..."
+        return value_str
+
+    sample_rows_str = "\n".join(
+        [
+            "\t".join([_truncate(row[column.name]) for column in rendered_columns])
+            for row in sample_rows
+        ]
+    )
+
+    return (
+        f"\n{table_key}({', '.join(column_strs)})\n"
+        f"Sample rows:\n{sample_rows_str}\n"
+    )
+
 
 class SQLTools:
     """Tools to query the SQL database."""
@@ -22,7 +172,21 @@ class SQLTools:
         """Initialize the SQLTools class."""
         self._max_sql_response_length = 20000
         self._response_too_long_message = "Sorry, SQL response was too long"
+        self._max_sql_response_rows = 1000
+        self._sql_stream_partition_size = 100
+        self._sql_timeout_seconds: float | None = 30
+        self.result_cache = SQLResultCache()
         self._schema_cache: TTLCache = TTLCache(maxsize=100, ttl=60 * 60 * 24)
+        self._max_concurrent_sample_fetches = 4
+        self._max_sample_value_length = 40
+        self._table_columns_cache: TTLCache = TTLCache(maxsize=100, ttl=60 * 60 * 24)
+        self._json_paths_cache: TTLCache = TTLCache(maxsize=1000, ttl=60 * 60 * 24)
+        self._categorical_values_cache: TTLCache = TTLCache(
+            maxsize=100, ttl=60 * 60 * 24
+        )
+        self._common_values_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60 * 60 * 24)
+        self._max_categorical_value_length = 100
+        self._json_sample_size = 100
 
     @staticmethod
     def handle_sql_response_length(func: Callable) -> Callable:
@@ -32,19 +196,20 @@ class SQLTools:
         async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
             """Wrapper"""
             response = await func(self, *args, **kwargs)
-            if len(str(response)) > self._max_sql_response_length:
+            if estimate_size(response) > self._max_sql_response_length:
                 return self._response_too_long_message
             return response
 
         return wrapper
 
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
     @handle_sql_response_length
     async def _get_table_schema(
         self,
         table_list: List[str],
         asession: AsyncSession,
+        schema_format: str = "ddl",
+        table_columns: Dict[str, List[str]] | None = None,
     ) -> dict[str, str]:
         """
         Queries the target SQL database and returns the schema of the tables.
@@ -53,71 +218,223 @@ class SQLTools:
         - table_list (list[str]): The list of table names for which you
             want to get the schema.
         - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - schema_format (str): "ddl" for the full CREATE TABLE statement, or
+            "compact" for a `table(col TYPE, ...)` signature (default is "ddl").
+        - table_columns (dict[str, list[str]] | None): (Optional) Only render
+            these columns of each table.
 
         Returns:
         - dict[str, str]: The schema of all the relevant tables in the database.
         """
+        if schema_format not in SCHEMA_FORMATS:
+            raise ValueError(
+                f"Unknown schema format '{schema_format}'. "
+                f"Expected one of {SCHEMA_FORMATS}."
+            )
 
         metadata = MetaData()
         return_schema = {table: "" for table in table_list}
 
+        requested_schemas_and_tables = defaultdict(list)
+        for table_name in table_list:
+            result = table_name.split(".")
+
+            if len(result) == 2:
+                schema, table = result
+            else:
+                schema = None
+                table = result[0]
+
+            requested_schemas_and_tables[schema].append(table)
+
         def _do_reflect(_: Any) -> defaultdict:
-            """Reflect the tables."""
+            """List the catalog once per schema and reflect the tables in one pass."""
             engine = asession.get_bind()
             inspector = inspect(engine)
             existing_schemas_and_tables = defaultdict(list)
-            for table_name in table_list:
-                result = table_name.split(".")
-
-                if len(result) == 2:
-                    schema, table = result
-                else:
-                    schema = None
-                    table = result[0]
-
-                if inspector.has_table(table, schema=schema):
-                    existing_schemas_and_tables[schema].append(table)
+            for schema, tables in requested_schemas_and_tables.items():
+                catalog = set(inspector.get_table_names(schema=schema))
+                catalog.update(inspector.get_view_names(schema=schema))
+                existing_schemas_and_tables[schema] = [
+                    table for table in tables if table in catalog
+                ]
 
             for schema, tables in existing_schemas_and_tables.items():
-                metadata.reflect(bind=engine, schema=schema, only=tables, views=True)
+                if tables:
+                    metadata.reflect(
+                        bind=engine, schema=schema, only=tables, views=True
+                    )
 
             return existing_schemas_and_tables
 
         # Execute the reflection
         existing_schemas_and_tables = await asession.run_sync(_do_reflect)
 
+        tables_to_render = []
         for schema_name, table_names in existing_schemas_and_tables.items():
             for table_name in table_names:
                 table_key = f"{schema_name + '.' if schema_name else ''}{table_name}"
                 table = metadata.tables.get(table_key)
-
                 if table is not None:
-                    ddl_statement = str(
-                        CreateTable(table).compile(bind=asession.get_bind())
-                    )
+                    tables_to_render.append((table_key, table))
 
-                    return_schema[
-                        table_key
-                    ] += f"\nTable: {table_key}\n{ddl_statement}\n"
+        # Fetching the first three rows from each table concurrently
+        sample_rows = await self._get_sample_rows(
+            [table for _, table in tables_to_render], asession
+        )
 
-                    # Fetching the first three rows from the table
-                    first_n_rows_result = await asession.execute(select(table).limit(3))
-                    first_n_rows = first_n_rows_result.mappings().all()
-                    first_n_rows_str = "\n".join(
-                        ["\t".join(map(str, row.values())) for row in first_n_rows]
+        dialect_name = asession.get_bind().dialect.name
+        for (table_key, table), first_n_rows in zip(tables_to_render, sample_rows):
+            # Key paths of JSON columns, rendered as virtual columns
+            requested_columns = (table_columns or {}).get(table_key)
+            json_paths_str = ""
+            for column in table.columns:
+                if requested_columns is not None and not any(
+                    requested.split(".")[0] == column.name
+                    for requested in requested_columns
+                ):
+                    continue
+                if is_json_type(column.type) or any(
+                    parse_json_object(row[column.name]) for row in first_n_rows
+                ):
+                    json_paths = await self._get_json_paths(
+                        table_key, column.name, asession
                     )
-                    return_schema[table_key] += f"Sample rows:\n{first_n_rows_str}\n"
+                    if json_paths:
+                        json_paths_str += render_json_paths(
+                            column.name, json_paths, dialect_name
+                        )
+
+            if schema_format == "compact":
+                return_schema[table_key] += render_compact_table(
+                    table_key,
+                    table,
+                    first_n_rows,
+                    dialect=asession.get_bind().dialect,
+                    max_value_length=self._max_sample_value_length,
+                    # Keep the JSON columns of the requested virtual columns
+                    columns=(
+                        [requested.split(".")[0] for requested in requested_columns]
+                        if requested_columns is not None
+                        else None
+                    ),
+                )
+                return_schema[table_key] += json_paths_str
+                continue
+
+            if requested_columns is not None:
+                table = subset_table(
+                    table, [requested.split(".")[0] for requested in requested_columns]
+                )
+            ddl_statement = str(CreateTable(table).compile(bind=asession.get_bind()))
+            first_n_rows_str = "\n".join(
+                [
+                    "\t".join([str(row[column.name]) for column in table.columns])
+                    for row in first_n_rows
+                ]
+            )
+
+            return_schema[table_key] += f"\nTable: {table_key}\n{ddl_statement}\n"
+            return_schema[table_key] += f"Sample rows:\n{first_n_rows_str}\n"
+            return_schema[table_key] += json_paths_str
 
         return return_schema
 
+    async def _get_json_paths(
+        self,
+        table_key: str,
+        column: str,
+        asession: AsyncSession,
+        timeout: float | None = None,
+    ) -> List[tuple[str, str]]:
+        """
+        Discovers the frequent key paths of a JSON column from a sample of its
+        values. The key paths are cached per table column.
+
+        Args:
+        - table_key (str): The (optionally schema-qualified) table name.
+        - column (str): The column name.
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - timeout (float | None): (Optional) Statement timeout in seconds of the
+            sampling query. Defaults to `self._sql_timeout_seconds`. If it times
+            out, no key paths are returned (nor cached).
+
+        Returns:
+        - list[tuple[str, str]]: The dotted key paths and their types. Empty if
+            the column does not hold JSON objects.
+        """
+        bind = asession.get_bind()
+        cache_key = (str(bind.url), table_key, column)
+        if cache_key in self._json_paths_cache:
+            return self._json_paths_cache[cache_key]
+
+        quote = bind.dialect.identifier_preparer.quote
+        quoted_table = ".".join([quote(part) for part in table_key.split(".")])
+        query = (
+            f"SELECT {quote(column)} FROM {quoted_table} "
+            f"WHERE {quote(column)} IS NOT NULL LIMIT {self._json_sample_size}"
+        )
+        try:
+            # Use a savepoint so a failed query does not abort the transaction
+            async with asession.begin_nested():
+                sql_response = await self._run_with_timeout(
+                    asession, lambda: asession.execute(text(query)), timeout
+                )
+                json_paths = discover_json_paths(sql_response.scalars().all())
+        except SQLTimeoutError:
+            return []
+        except DBAPIError:
+            json_paths = []
+
+        self._json_paths_cache[cache_key] = json_paths
+        return json_paths
+
+    async def _get_sample_rows(
+        self, tables: List[Table], asession: AsyncSession
+    ) -> List[Sequence[RowMapping]]:
+        """
+        Fetches the first three rows of each table.
+
+        When the session is bound to an `AsyncEngine`, the rows are fetched
+        concurrently on up to `self._max_concurrent_sample_fetches` pooled
+        connections. Otherwise they are fetched one after another on the session.
+
+        Args:
+        - tables (list[Table]): The reflected tables to sample.
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+
+        Returns:
+        - list[Sequence[RowMapping]]: The sample rows of each table, in the
+            order of `tables`.
+        """
+        engine = asession.bind
+        if not isinstance(engine, AsyncEngine):
+            sample_rows = []
+            for table in tables:
+                result = await asession.execute(select(table).limit(3))
+                sample_rows.append(result.mappings().all())
+            return sample_rows
+
+        semaphore = asyncio.Semaphore(self._max_concurrent_sample_fetches)
+
+        async def _fetch(table: Table) -> Sequence[RowMapping]:
+            """Fetch the sample rows of one table on its own connection."""
+            async with semaphore:
+                async with engine.connect() as connection:
+                    result = await connection.execute(select(table).limit(3))
+                    return result.mappings().all()
+
+        return list(await asyncio.gather(*[_fetch(table) for table in tables]))
+
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
     @handle_sql_response_length
     async def get_tables_schema(
         self,
         table_list: List[str],
         asession: AsyncSession,
         metric_db_id: str,
+        schema_format: str = "ddl",
+        table_columns: Dict[str, List[str]] | None = None,
     ) -> str:
         """
         Queries the target SQL database and returns the schema of the tables.
@@ -126,40 +443,231 @@ class SQLTools:
         - table_list (list[str]): The list of table names for which you
             want to get the schema.
         - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - metric_db_id (str): The database id, used to cache the schemas.
+        - schema_format (str): "ddl" or "compact" (default is "ddl").
+        - table_columns (dict[str, list[str]] | None): (Optional) Only render
+            these columns of each table. Not cached since it changes with every
+            question.
 
         Returns:
         - str: The schema of all the relevant tables in the database.
         """
-        if metric_db_id not in self._schema_cache:
-            add_to_cache = await self._get_table_schema(table_list, asession)
-            self._schema_cache[metric_db_id] = add_to_cache
+        if table_columns is not None:
+            subset_schema = await self._get_table_schema(
+                table_list, asession, schema_format, table_columns
+            )
+            return "\n".join([subset_schema[table] for table in table_list])
+
+        cache_key = (metric_db_id, schema_format)
+        if cache_key not in self._schema_cache:
+            add_to_cache = await self._get_table_schema(
+                table_list, asession, schema_format
+            )
+            self._schema_cache[cache_key] = add_to_cache
         else:
             # Update cache with tables if not in cache
             tables_not_in_cache = [
                 table
                 for table in table_list
-                if table not in self._schema_cache[metric_db_id]
+                if table not in self._schema_cache[cache_key]
             ]
             if tables_not_in_cache:
                 add_to_cache = await self._get_table_schema(
-                    tables_not_in_cache, asession
+                    tables_not_in_cache, asession, schema_format
                 )
-                self._schema_cache[metric_db_id].update(add_to_cache)
+                self._schema_cache[cache_key].update(add_to_cache)
         # Add the value for each table in table_list to return schema as a string append
         return_schema = "\n".join(
-            [self._schema_cache[metric_db_id][table] for table in table_list]
+            [self._schema_cache[cache_key][table] for table in table_list]
         )
         return return_schema
 
+    def invalidate_schema_cache(self, metric_db_id: str) -> None:
+        """
+        Drop the cached schemas, column names and categorical values of a
+        database, e.g. after its schema changed.
+
+        Args:
+        - metric_db_id (str): The database id.
+        """
+        for cache in (self._schema_cache, self._categorical_values_cache):
+            for cache_key in list(cache.keys()):
+                if cache_key[0] == metric_db_id:
+                    cache.pop(cache_key, None)
+        self._table_columns_cache.pop(metric_db_id, None)
+
+    @track_time(create_class_attr="timings")
+    async def get_table_columns(
+        self, table_list: List[str], asession: AsyncSession, metric_db_id: str
+    ) -> Dict[str, List[str]]:
+        """
+        Returns the column names of the tables, without sampling them. The
+        column names are cached per database.
+
+        Args:
+        - table_list (list[str]): The (optionally schema-qualified) table names.
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - metric_db_id (str): The database id, used to cache the column names.
+
+        Returns:
+        - dict[str, list[str]]: The column names of each existing table.
+        """
+        cached_columns = self._table_columns_cache.setdefault(metric_db_id, {})
+        tables_not_in_cache = [
+            table for table in table_list if table not in cached_columns
+        ]
+
+        def _get_columns(_: Any) -> Dict[str, List[str]]:
+            """List the columns of the tables that are not cached."""
+            inspector = inspect(asession.get_bind())
+            table_columns = {}
+            for table_key in tables_not_in_cache:
+                schema, _, table = table_key.rpartition(".")
+                try:
+                    columns = inspector.get_columns(table, schema=schema or None)
+                except NoSuchTableError:
+                    continue
+                table_columns[table_key] = [column["name"] for column in columns]
+            return table_columns
+
+        if tables_not_in_cache:
+            cached_columns.update(await asession.run_sync(_get_columns))
+
+        return {
+            table: cached_columns[table]
+            for table in table_list
+            if table in cached_columns
+        }
+
+    @track_time(create_class_attr="timings")
+    async def get_categorical_values(
+        self,
+        table_list: List[str],
+        asession: AsyncSession,
+        metric_db_id: str,
+        max_distinct: int = 50,
+        timeout: float | None = None,
+    ) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Returns the distinct values of the low-cardinality text columns of the
+        tables. The values are cached per database, since listing them runs
+        one query per column.
+
+        When the session is bound to an `AsyncEngine`, the columns are queried
+        concurrently on up to `self._max_concurrent_sample_fetches` sessions.
+        Otherwise they are queried one after another on the session.
+
+        Args:
+        - table_list (list[str]): The (optionally schema-qualified) table names.
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - metric_db_id (str): The database id, used to cache the values.
+        - max_distinct (int): Columns with more distinct values than this are
+            not categorical and are skipped (default is 50).
+        - timeout (float | None): (Optional) Statement timeout in seconds for
+            each query. Defaults to `self._sql_timeout_seconds`. Columns whose
+            query fails or times out are skipped.
+
+        Returns:
+        - dict[str, dict[str, list[str]]]: The distinct values of each
+            categorical column of each existing table.
+        """
+        cached_values = self._categorical_values_cache.setdefault(
+            (metric_db_id, max_distinct), {}
+        )
+        tables_not_in_cache = [
+            table for table in table_list if table not in cached_values
+        ]
+        table_columns = await self.get_table_columns(
+            tables_not_in_cache, asession, metric_db_id
+        )
+
+        quote = asession.get_bind().dialect.identifier_preparer.quote
+
+        async def _get_distinct_values(
+            table_key: str, column: str, column_session: AsyncSession
+        ) -> list | None:
+            """Query the distinct values of a column, or None if it fails."""
+            quoted_table = ".".join([quote(part) for part in table_key.split(".")])
+            query = (
+                f"SELECT DISTINCT {quote(column)} FROM {quoted_table} "
+                f"WHERE {quote(column)} IS NOT NULL LIMIT {max_distinct + 1}"
+            )
+            try:
+                # Use a savepoint so a failed query does not abort the
+                # transaction
+                async with column_session.begin_nested():
+                    sql_response = await self._run_with_timeout(
+                        column_session,
+                        lambda: column_session.execute(text(query)),
+                        timeout,
+                    )
+                    return sql_response.scalars().all()
+            except (DBAPIError, SQLTimeoutError):
+                return None
+
+        table_column_pairs = [
+            (table_key, column)
+            for table_key, columns in table_columns.items()
+            for column in columns
+        ]
+        engine = asession.bind
+        if isinstance(engine, AsyncEngine):
+            semaphore = asyncio.Semaphore(self._max_concurrent_sample_fetches)
+
+            async def _get_distinct_values_on_own_session(
+                table_key: str, column: str
+            ) -> list | None:
+                """Query the distinct values of a column on its own session."""
+                async with semaphore:
+                    async with AsyncSession(engine) as column_session:
+                        return await _get_distinct_values(
+                            table_key, column, column_session
+                        )
+
+            column_values = await asyncio.gather(
+                *[
+                    _get_distinct_values_on_own_session(table_key, column)
+                    for table_key, column in table_column_pairs
+                ]
+            )
+        else:
+            column_values = [
+                await _get_distinct_values(table_key, column, asession)
+                for table_key, column in table_column_pairs
+            ]
+
+        for table_key in table_columns:
+            cached_values[table_key] = {}
+        for (table_key, column), values in zip(table_column_pairs, column_values):
+            if (
+                values
+                and len(values) <= max_distinct
+                and all(
+                    isinstance(value, str)
+                    and len(value) <= self._max_categorical_value_length
+                    and parse_json_object(value) is None
+                    for value in values
+                )
+            ):
+                cached_values[table_key][column] = sorted(values)
+
+        return {
+            table: cached_values[table]
+            for table in table_list
+            if table in cached_values
+        }
+
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
     @handle_sql_response_length
     async def get_common_column_values(
         self,
         table_column_dict: Dict[str, List[str]],
-        asession: AsyncSession,
+        asession: AsyncSession | None,
         num_common_values: int,
         indicator_vars: list,
+        timeout: float | None = None,
+        lease_session: Callable[[], AsyncContextManager[AsyncSession]] | None = None,
+        metric_db_id: str | None = None,
     ) -> Dict[str, Dict]:
         """
         Queries the target SQL database and returns the top k (=num_common_values)
@@ -171,50 +679,573 @@ class SQLTools:
         - asession (AsyncSession): The SQLAlchemy AsyncSession object.
         - num_common_values (int): The number of common values to return.
         - indicator_vars (list): The list of indicator variables
+        - timeout (float | None): (Optional) Statement timeout in seconds for
+            each query. Defaults to `self._sql_timeout_seconds`.
+        - lease_session (Callable | None): (Optional) Returns a context manager
+            leasing a new session, e.g. `EngineRegistry.lease_session`. If
+            given, the columns are queried concurrently, each on its own
+            session, and `asession` is not used.
+        - metric_db_id (str | None): (Optional) The database id, used to cache
+            the values of each column. Defaults to the URL of `asession`; the
+            values are not cached if neither is known.
 
         Returns:
         - dict[str, dict]: A Dictionary with the top common values for each table
             column combination which was asked for.
         """
-        # Create dictionary of tables, their columns, and the columns' types
-        result: Dict[str, Dict] = {}
-        for table, columns in table_column_dict.items():
-            result[table] = {}
-            for column in columns:
-                query = f"""
-                SELECT {column}, COUNT(*)
-                FROM {table}
-                GROUP BY {column}
-                ORDER BY COUNT(*) DESC
-                """
 
-                if column.lower() not in [var.lower() for var in indicator_vars]:
-                    query += f" LIMIT {num_common_values}"
+        async def _get_expression_values(
+            table: str, column: str, expression: str, column_session: AsyncSession
+        ) -> list:
+            """Query the most common values of a column expression."""
+            query = f"""
+            SELECT {expression}, COUNT(*)
+            FROM {table}
+            GROUP BY {expression}
+            ORDER BY COUNT(*) DESC
+            """
+
+            if column.lower() not in [var.lower() for var in indicator_vars]:
+                query += f" LIMIT {num_common_values}"
+
+            sql_response = await self._run_with_timeout(
+                column_session,
+                lambda: column_session.execute(text(query + ";")),
+                timeout,
+            )
+            return sql_response.fetchall()
 
-                sql_response = await asession.execute(text(query + ";"))
-                result[table][column] = sql_response.fetchall()
+        async def _get_column_values(
+            table: str, column: str, column_session: AsyncSession
+        ) -> Dict[str, list]:
+            """
+            Query the most common values of one column. JSON columns are
+            profiled per key path, and "column.key" virtual columns through
+            the dialect's JSON functions.
+            """
+            dialect_name = column_session.get_bind().dialect.name
+            if "." in column:
+                json_column, path = column.split(".", 1)
+                json_paths = await self._get_json_paths(
+                    table, json_column, column_session, timeout
+                )
+                if path in [json_path for json_path, _ in json_paths]:
+                    expression = json_path_expression(json_column, path, dialect_name)
+                    return {
+                        column: await _get_expression_values(
+                            table, column, expression, column_session
+                        )
+                    }
+            else:
+                json_paths = await self._get_json_paths(
+                    table, column, column_session, timeout
+                )
+                if json_paths:
+                    return {
+                        f"{column}.{path}": await _get_expression_values(
+                            table,
+                            f"{column}.{path}",
+                            json_path_expression(column, path, dialect_name),
+                            column_session,
+                        )
+                        for path, _ in json_paths
+                    }
+
+            return {
+                column: await _get_expression_values(
+                    table, column, column, column_session
+                )
+            }
+
+        async def _get_column_values_on_leased_session(
+            table: str, column: str
+        ) -> Dict[str, list]:
+            """Query the most common values of one column on a leased session."""
+            async with lease_session() as leased_session:
+                return await _get_column_values(table, column, leased_session)
+
+        if metric_db_id is None and asession is not None:
+            metric_db_id = str(asession.get_bind().url)
+        indicator_var_names = [var.lower() for var in indicator_vars]
+
+        def _cache_key(table: str, column: str) -> tuple | None:
+            """Key the values of a column, or None if they cannot be cached."""
+            if metric_db_id is None:
+                return None
+            return (
+                metric_db_id,
+                table,
+                column,
+                num_common_values,
+                column.lower() in indicator_var_names,
+            )
+
+        table_columns = [
+            (table, column)
+            for table, columns in table_column_dict.items()
+            for column in columns
+        ]
+        columns_to_query = [
+            (table, column)
+            for table, column in table_columns
+            if _cache_key(table, column) not in self._common_values_cache
+        ]
+        if lease_session is not None:
+            queried_values = await asyncio.gather(
+                *[
+                    _get_column_values_on_leased_session(table, column)
+                    for table, column in columns_to_query
+                ]
+            )
+        else:
+            queried_values = [
+                await _get_column_values(table, column, asession)
+                for table, column in columns_to_query
+            ]
+        values_by_column = dict(zip(columns_to_query, queried_values))
+        for (table, column), values in values_by_column.items():
+            cache_key = _cache_key(table, column)
+            if cache_key is not None:
+                self._common_values_cache[cache_key] = values
+        column_values = [
+            values_by_column.get((table, column))
+            or self._common_values_cache[_cache_key(table, column)]
+            for table, column in table_columns
+        ]
+
+        # Create dictionary of tables, their columns, and the columns' values
+        result: Dict[str, Dict] = {table: {} for table in table_column_dict}
+        for (table, _), values in zip(table_columns, column_values):
+            result[table].update(values)
 
         return result
 
     @track_time(create_class_attr="timings")
-    @cached(ttl=60 * 60 * 24)
-    @handle_sql_response_length
     async def run_sql(
-        self, sql_query: str, asession: AsyncSession
-    ) -> List[Dict[str, Any]]:
+        self,
+        sql_query: str,
+        asession: AsyncSession,
+        max_rows: int | None = None,
+        max_bytes: int | None = None,
+        timeout: float | None = None,
+        metric_db_id: str | None = None,
+        normalized_sql_query: str | None = None,
+        columnar: bool = False,
+    ) -> Dict[str, Any]:
         """
         Executes the SQL query on the target SQL database.
 
+        The result is streamed (using server-side cursors where the driver
+        supports them) and reading stops as soon as the row or byte budget is
+        reached, so a runaway query is never fully materialized in memory.
+
         Args:
         - sql_query (str): The SQL query to execute.
         - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - max_rows (int | None): (Optional) Maximum number of rows to return.
+            Defaults to `self._max_sql_response_rows`.
+        - max_bytes (int | None): (Optional) Maximum size of the returned rows,
+            measured as the (estimated) length of their string representation.
+            Defaults to `self._max_sql_response_length`.
+        - timeout (float | None): (Optional) Statement timeout in seconds.
+            Defaults to `self._sql_timeout_seconds`.
+        - metric_db_id (str | None): (Optional) The database id. If given, the
+            result is cached until the data version of the database changes.
+        - normalized_sql_query (str | None): (Optional) The normalized query
+            text used as cache key. Defaults to `sql_query`.
+        - columnar (bool): If True, the rows are returned as a ColumnarResult
+            instead of a list of rows (default is False).
+
+        Returns:
+        - dict[str, Any]: A dictionary with the returned "rows", whether the
+            rows were "truncated", and the "total_rows_estimate" of the full
+            result (a lower bound if it was truncated).
+        """
+        max_rows = max_rows or self._max_sql_response_rows
+        max_bytes = max_bytes or self._max_sql_response_length
+
+        async def _stream_rows() -> Dict[str, Any]:
+            """Stream rows until the result or a budget is exhausted."""
+            rows: List[Row] = []
+            num_bytes = 0
+            truncated = False
+
+            sql_response = await asession.stream(text(sql_query))
+            column_names = list(sql_response.keys())
+            try:
+                async for partition in sql_response.partitions(
+                    self._sql_stream_partition_size
+                ):
+                    for row in partition:
+                        num_bytes += estimate_size(row)
+                        if len(rows) >= max_rows or num_bytes > max_bytes:
+                            truncated = True
+                            break
+                        rows.append(row)
+                    if truncated:
+                        break
+            finally:
+                await sql_response.close()
+
+            return {
+                "rows": (
+                    ColumnarResult.from_rows(rows, column_names) if columnar else rows
+                ),
+                "truncated": truncated,
+                # The row past the budget was read, so a truncated result has
+                # at least one more row. The query is not run again to count
+                # them all.
+                "total_rows_estimate": len(rows) + 1 if truncated else len(rows),
+            }
+
+        if metric_db_id is None:
+            return await self._run_with_timeout(asession, _stream_rows, timeout)
+
+        data_version = await self.get_data_version(asession)
+        if data_version is None:
+            return await self._run_with_timeout(asession, _stream_rows, timeout)
+
+        cache_key = (
+            metric_db_id,
+            normalized_sql_query or sql_query.strip(),
+            max_rows,
+            max_bytes,
+            columnar,
+        )
+        cached_result = self.result_cache.get(cache_key, data_version)
+        if cached_result is not None:
+            return cached_result
+
+        result = await self._run_with_timeout(asession, _stream_rows, timeout)
+        self.result_cache.set(
+            cache_key, data_version, result, size=estimate_size(result["rows"])
+        )
+        return result
+
+    async def get_data_version(self, asession: AsyncSession) -> str | None:
+        """
+        Returns a cheap probe of the version of the data in the database,
+        which changes whenever the data is modified.
+
+        - SQLite: the modification time and size of the database file (and of
+            its write-ahead log).
+        - PostgreSQL: the insert/update/delete counters in `pg_stat_user_tables`.
+        - MySQL: the latest `UPDATE_TIME` of the tables in the database.
+
+        Args:
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
 
         Returns:
-        - list[dict[str, Any]]: The result of the SQL query.
+        - str | None: The data version, or None if it cannot be determined.
         """
-        sql_response = await asession.execute(text(sql_query))
+        bind = asession.get_bind()
+        dialect_name = bind.dialect.name
+
+        if dialect_name == "sqlite":
+            database = bind.url.database
+            if database and bind.url.query.get("uri") == "true":
+                # e.g. the read-only "file:<path>?mode=ro" URIs of reader pools
+                database = database.removeprefix("file:")
+            if not database or database == ":memory:":
+                return None
+            try:
+                versions = [
+                    f"{stat.st_mtime_ns}-{stat.st_size}"
+                    for stat in [
+                        os.stat(path)
+                        for path in (database, f"{database}-wal")
+                        if os.path.exists(path)
+                    ]
+                ]
+            except OSError:
+                return None
+            return "/".join(versions) or None
+
+        if dialect_name == "postgresql":
+            version_query = """
+            SELECT COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+            FROM pg_stat_user_tables
+            """
+        elif dialect_name in ("mysql", "mariadb"):
+            version_query = """
+            SELECT CONCAT(COALESCE(MAX(UPDATE_TIME), ''), '-', COUNT(*))
+            FROM information_schema.tables
+            WHERE TABLE_SCHEMA = DATABASE()
+            """
+        else:
+            return None
+
+        try:
+            version_response = await asession.execute(text(version_query))
+            return str(version_response.scalar_one())
+        except DBAPIError:
+            return None
+
+    async def _run_with_timeout(
+        self,
+        asession: AsyncSession,
+        statements: Callable[[], Awaitable[T]],
+        timeout: float | None = None,
+    ) -> T:
+        """
+        Runs `statements` on the session while limiting how long each SQL
+        statement can run.
+
+        The timeout is enforced by the database itself, depending on the
+        dialect of the session:
+        - PostgreSQL: `SET LOCAL statement_timeout`, reset to its default
+            afterwards so it does not apply to the next statements of the
+            caller's transaction.
+        - MySQL: `SET SESSION MAX_EXECUTION_TIME` (applies to SELECTs), reset
+            to its previous value afterwards so it does not leak to the next
+            user of the pooled connection.
+        - SQLite: a progress handler that interrupts the statement once the
+            deadline has passed.
+
+        The statements run in their own task so that, if the caller is
+        cancelled, the running statement is stopped on the database before
+        the cancellation propagates.
+
+        Args:
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - statements (Callable[[], Awaitable]): Coroutine function executing
+            the SQL statements on `asession`.
+        - timeout (float | None): (Optional) Timeout in seconds. Defaults to
+            `self._sql_timeout_seconds` if None. No timeout is applied if it
+            is 0 (or the default is None).
+
+        Returns:
+        - The result of `statements`.
+
+        Raises:
+        - SQLTimeoutError: If a statement was stopped because of the timeout.
+        """
+        if timeout is None:
+            timeout = self._sql_timeout_seconds
+        if not timeout:
+            return await statements()
+
+        dialect_name = asession.get_bind().dialect.name
+        timeout_ms = int(timeout * 1000)
+        deadline = time.monotonic() + timeout
+
+        connection = await asession.connection()
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        mysql_connection_id = None
+        mysql_previous_timeout = None
+        cancelled = threading.Event()
+
+        if dialect_name == "postgresql":
+            await asession.execute(text(f"SET LOCAL statement_timeout = {timeout_ms}"))
+        elif dialect_name in ("mysql", "mariadb"):
+            mysql_previous_timeout, mysql_connection_id = (
+                await asession.execute(
+                    text("SELECT @@SESSION.MAX_EXECUTION_TIME, CONNECTION_ID()")
+                )
+            ).one()
+            await asession.execute(
+                text(f"SET SESSION MAX_EXECUTION_TIME = {timeout_ms}")
+            )
+        elif dialect_name == "sqlite":
+            # The handler runs on the driver's thread, between SQLite VM steps
+            await driver_connection.set_progress_handler(
+                lambda: int(cancelled.is_set() or time.monotonic() > deadline),
+                1000,
+            )
+
+        statements_task = asyncio.ensure_future(statements())
+        try:
+            return await asyncio.shield(statements_task)
+        except asyncio.CancelledError:
+            cancelled.set()
+            if mysql_connection_id is not None and isinstance(
+                asession.bind, AsyncEngine
+            ):
+                async with asession.bind.connect() as kill_connection:
+                    await kill_connection.execute(
+                        text(f"KILL QUERY {int(mysql_connection_id)}")
+                    )
+            elif dialect_name != "sqlite":
+                # PostgreSQL drivers cancel the statement on task cancellation
+                statements_task.cancel()
+            await asyncio.gather(statements_task, return_exceptions=True)
+            raise
+        except DBAPIError as e:
+            if time.monotonic() >= deadline:
+                raise SQLTimeoutError(
+                    f"SQL statement exceeded the timeout of {timeout} seconds"
+                ) from e
+            raise
+        finally:
+            if dialect_name == "sqlite":
+                await driver_connection.set_progress_handler(None, 1000)
+            elif dialect_name == "postgresql":
+                # SET LOCAL lasts until the end of the caller's transaction
+                try:
+                    await asession.execute(
+                        text("SET LOCAL statement_timeout = DEFAULT")
+                    )
+                except DBAPIError:
+                    # The transaction was aborted, and rolling it back resets
+                    # the timeout
+                    pass
+            elif mysql_previous_timeout is not None:
+                try:
+                    await asession.execute(
+                        text(
+                            "SET SESSION MAX_EXECUTION_TIME = "
+                            f"{int(mysql_previous_timeout)}"
+                        )
+                    )
+                except DBAPIError:
+                    # The connection is unusable, and will not be reused as is
+                    pass
+
+    @track_time(create_class_attr="timings")
+    async def explain_sql(
+        self, sql_query: str, asession: AsyncSession, timeout: float | None = None
+    ) -> Dict[str, Any]:
+        """
+        Estimates the cost of a SQL query with the dialect's EXPLAIN, without
+        running the query.
+
+        The estimated cost depends on the dialect of the session:
+        - PostgreSQL: the planner's total cost from `EXPLAIN (FORMAT JSON)`.
+        - MySQL: the product of the rows examined per table from `EXPLAIN`.
+        - SQLite: the product of the (approximate) row counts of the tables that
+            are fully scanned according to `EXPLAIN QUERY PLAN`.
+
+        Args:
+        - sql_query (str): The SQL query to explain.
+        - asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        - timeout (float | None): (Optional) Statement timeout in seconds.
+            Defaults to `self._sql_timeout_seconds`.
+
+        Returns:
+        - dict[str, Any]: A dictionary with the "estimated_cost",
+            "estimated_rows", the tables with "full_scans", and a one-line
+            "summary" of the plan.
+        """
+        dialect_name = asession.get_bind().dialect.name
+        sql_query = sql_query.strip().rstrip(";")
+
+        async def _explain() -> Dict[str, Any]:
+            """Run the dialect's EXPLAIN and summarize the plan."""
+            if dialect_name == "postgresql":
+                return await self._explain_postgresql(sql_query, asession)
+            if dialect_name in ("mysql", "mariadb"):
+                return await self._explain_mysql(sql_query, asession)
+            if dialect_name == "sqlite":
+                return await self._explain_sqlite(sql_query, asession)
+            raise ValueError(f"EXPLAIN is not supported for dialect {dialect_name}")
+
+        return await self._run_with_timeout(asession, _explain, timeout)
+
+    async def _explain_postgresql(
+        self, sql_query: str, asession: AsyncSession
+    ) -> Dict[str, Any]:
+        """Summarize the JSON plan of a PostgreSQL query."""
+        explain_response = await asession.execute(
+            text(f"EXPLAIN (FORMAT JSON) {sql_query}")
+        )
+        plan = explain_response.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        root = plan[0]["Plan"]
+
+        nodes = []
+        full_scans = []
+        to_visit = [root]
+        while to_visit:
+            node = to_visit.pop(0)
+            relation = node.get("Relation Name")
+            nodes.append(
+                f"{node['Node Type']}{' on ' + relation if relation else ''}"
+                f" (rows={node.get('Plan Rows')})"
+            )
+            if node["Node Type"] == "Seq Scan" and relation:
+                full_scans.append(relation)
+            to_visit.extend(node.get("Plans", []))
+
+        return {
+            "estimated_cost": float(root["Total Cost"]),
+            "estimated_rows": int(root["Plan Rows"]),
+            "full_scans": full_scans,
+            "summary": "; ".join(nodes),
+        }
+
+    async def _explain_mysql(
+        self, sql_query: str, asession: AsyncSession
+    ) -> Dict[str, Any]:
+        """Summarize the tabular EXPLAIN of a MySQL query."""
+        explain_response = await asession.execute(text(f"EXPLAIN {sql_query}"))
+        plan_rows = explain_response.mappings().all()
+
+        estimated_rows = 1
+        nodes = []
+        full_scans = []
+        for plan_row in plan_rows:
+            rows = int(plan_row.get("rows") or 1)
+            estimated_rows *= rows
+            nodes.append(f"{plan_row.get('type')} on {plan_row.get('table')} ({rows=})")
+            if plan_row.get("type") == "ALL":
+                full_scans.append(plan_row.get("table"))
+
+        return {
+            "estimated_cost": float(estimated_rows),
+            "estimated_rows": estimated_rows,
+            "full_scans": full_scans,
+            "summary": "; ".join(nodes),
+        }
+
+    async def _explain_sqlite(
+        self, sql_query: str, asession: AsyncSession
+    ) -> Dict[str, Any]:
+        """Detect the full table scans in the query plan of a SQLite query."""
+        explain_response = await asession.execute(
+            text(f"EXPLAIN QUERY PLAN {sql_query}")
+        )
+        details = [row[-1] for row in explain_response.fetchall()]
+
+        # The plan names tables by their alias, so map aliases back to tables
+        aliases = {
+            alias.strip('"`'): table.strip('"`')
+            for table, alias in re.findall(
+                r"(?:FROM|JOIN|,)\s+([\w.\"`]+)\s+(?:AS\s+)?([\w\"`]+)",
+                sql_query,
+                flags=re.IGNORECASE,
+            )
+        }
+
+        identifier_preparer = asession.get_bind().dialect.identifier_preparer
+        estimated_rows = 1
+        full_scans = []
+        for detail in details:
+            # Older SQLite versions write "SCAN TABLE <table>"
+            scan = re.match(r"SCAN (?:TABLE )?([\w.\"`]+)", detail)
+            if scan is None or scan.group(1) == "CONSTANT":
+                continue
+            name = scan.group(1).strip('"`')
+            table = aliases.get(name, name)
+            full_scans.append(table)
+            quoted_table = ".".join(
+                [identifier_preparer.quote(part) for part in table.split(".")]
+            )
+            try:
+                row_count_response = await asession.execute(
+                    text(f"SELECT MAX(rowid) FROM {quoted_table}")
+                )
+                estimated_rows *= int(row_count_response.scalar_one() or 0) or 1
+            except DBAPIError:
+                # Not a table, e.g. a subquery or a WITHOUT ROWID table
+                continue
 
-        return sql_response.fetchall()
+        return {
+            "estimated_cost": float(estimated_rows) if full_scans else 0.0,
+            "estimated_rows": estimated_rows if full_scans else 0,
+            "full_scans": full_scans,
+            "summary": "; ".join(details),
+        }
 
 
 def get_tools() -> SQLTools:
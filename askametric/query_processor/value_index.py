@@ -0,0 +1,221 @@
+import difflib
+import json
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .retrieval import STOPWORDS
+from .tools import get_tools
+
+# Longest value, in words, looked up in a question
+_MAX_VALUE_WORDS = 6
+# Shortest value matched approximately, in characters
+_MIN_FUZZY_LENGTH = 5
+
+
+def normalize_value(value: str) -> str:
+    """
+    Normalize a categorical value (or question text) for lookup: case and
+    accents are dropped, and punctuation is replaced by spaces.
+    """
+    value = unicodedata.normalize("NFKD", str(value))
+    value = "".join([char for char in value if not unicodedata.combining(char)])
+    return " ".join(re.findall(r"[a-z0-9]+", value.casefold()))
+
+
+class ValueIndex:
+    """
+    Inverted index from the normalized categorical values of a metric database
+    to the (table, column) pairs they occur in, used to tell the SQL LLM where
+    the values mentioned in a question live.
+    """
+
+    def __init__(
+        self,
+        metric_db_id: str,
+        categorical_values: Dict[str, Dict[str, List[str]]],
+        fuzzy_cutoff: float = 0.85,
+    ) -> None:
+        """
+        Initialize the ValueIndex class.
+
+        Args:
+            metric_db_id (str): The database id.
+            categorical_values (dict[str, dict[str, list[str]]]): The distinct
+                values of the categorical columns of each table.
+            fuzzy_cutoff (float): Minimum similarity, between 0 and 1, of an
+                approximate match.
+        """
+        self.metric_db_id = metric_db_id
+        self.categorical_values = categorical_values
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self._postings: Dict[str, List[Tuple[str, str, str]]] = defaultdict(list)
+        for table, column_values in categorical_values.items():
+            for column, values in column_values.items():
+                for value in values:
+                    normalized_value = normalize_value(value)
+                    # Short and stopword values ("No", "The") match too often
+                    if len(normalized_value) < 3 or normalized_value in STOPWORDS:
+                        continue
+                    self._postings[normalized_value].append((table, column, value))
+
+        # Approximate matches are only looked for among values of the same
+        # number of words
+        self._values_by_num_words: Dict[int, List[str]] = defaultdict(list)
+        for normalized_value in self._postings:
+            self._values_by_num_words[len(normalized_value.split())].append(
+                normalized_value
+            )
+
+    def __len__(self) -> int:
+        """Return the number of distinct normalized values."""
+        return len(self._postings)
+
+    def lookup(
+        self,
+        query_text: str,
+        tables: List[str] | None = None,
+        max_hints: int = 20,
+    ) -> Dict[str, Dict[str, List[str]]]:
+        """
+        Find the categorical values mentioned in a question, case-insensitively
+        and allowing for typos.
+
+        Args:
+            query_text (str): The question.
+            tables (list[str] | None): (Optional) Only return the values of
+                these tables.
+            max_hints (int): Maximum number of (table, column, value) hints.
+
+        Returns:
+            dict[str, dict[str, list[str]]]: The matching values, as stored in
+                the database, of each column of each table. Exact and longer
+                matches come first.
+        """
+        words = normalize_value(query_text).split()
+        ngrams = {
+            " ".join(words[start : start + num_words])
+            for num_words in range(min(_MAX_VALUE_WORDS, len(words)), 0, -1)
+            for start in range(len(words) - num_words + 1)
+        }
+
+        matches: List[Tuple[int, float, str]] = []
+        for ngram in ngrams:
+            if ngram in self._postings:
+                matches.append((len(ngram), 1.0, ngram))
+            elif len(ngram) >= _MIN_FUZZY_LENGTH:
+                for close_match in difflib.get_close_matches(
+                    ngram,
+                    self._values_by_num_words.get(len(ngram.split()), []),
+                    n=3,
+                    cutoff=self.fuzzy_cutoff,
+                ):
+                    similarity = difflib.SequenceMatcher(
+                        None, ngram, close_match
+                    ).ratio()
+                    matches.append((len(close_match), similarity, close_match))
+        matches.sort(key=lambda match: (match[1], match[0]), reverse=True)
+
+        hints: Dict[str, Dict[str, List[str]]] = {}
+        num_hints = 0
+        seen_values = set()
+        for _, _, normalized_value in matches:
+            if normalized_value in seen_values:
+                continue
+            seen_values.add(normalized_value)
+            for table, column, value in self._postings[normalized_value]:
+                if tables is not None and table not in tables:
+                    continue
+                if num_hints >= max_hints:
+                    return hints
+                column_hints = hints.setdefault(table, {}).setdefault(column, [])
+                if value not in column_hints:
+                    column_hints.append(value)
+                    num_hints += 1
+        return hints
+
+    def save(self, path: str) -> None:
+        """Save the index as JSON."""
+        with open(path, "w", encoding="utf-8") as index_file:
+            json.dump(
+                {
+                    "metric_db_id": self.metric_db_id,
+                    "categorical_values": self.categorical_values,
+                },
+                index_file,
+            )
+
+    @classmethod
+    def load(cls, path: str, fuzzy_cutoff: float = 0.85) -> "ValueIndex":
+        """Load an index saved as JSON."""
+        with open(path, encoding="utf-8") as index_file:
+            saved_index = json.load(index_file)
+        return cls(
+            saved_index["metric_db_id"],
+            saved_index["categorical_values"],
+            fuzzy_cutoff=fuzzy_cutoff,
+        )
+
+
+async def build_value_index(
+    metric_db_id: str,
+    asession: AsyncSession,
+    table_list: List[str] | None = None,
+    max_distinct: int = 50,
+) -> ValueIndex:
+    """
+    Build the value index of a database from its low-cardinality text columns.
+
+    Args:
+        metric_db_id (str): The database id.
+        asession (AsyncSession): The SQLAlchemy AsyncSession object.
+        table_list (list[str] | None): (Optional) The tables to index. All
+            the tables of the default schema are indexed by default.
+        max_distinct (int): Columns with more distinct values than this are
+            not indexed.
+
+    Returns:
+        ValueIndex: The value index.
+    """
+    if table_list is None:
+        table_list = await asession.run_sync(
+            lambda sync_session: inspect(sync_session.get_bind()).get_table_names()
+        )
+    categorical_values = await get_tools().get_categorical_values(
+        table_list, asession, metric_db_id, max_distinct=max_distinct
+    )
+    return ValueIndex(metric_db_id, categorical_values)
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async def main(args) -> None:
+        engine = create_async_engine(args.database_url)
+        try:
+            async with AsyncSession(engine) as asession:
+                value_index = await build_value_index(
+                    args.metric_db_id, asession, max_distinct=args.max_distinct
+                )
+        finally:
+            await engine.dispose()
+        value_index.save(args.output)
+        print(f"Indexed {len(value_index)} values of {args.metric_db_id}")
+
+    parser = argparse.ArgumentParser(
+        description="Build the value index of a database, offline."
+    )
+    parser.add_argument("--database_url", type=str, required=True)
+    parser.add_argument("--metric_db_id", type=str, required=True)
+    parser.add_argument("--output", type=str, required=True)
+    parser.add_argument("--max_distinct", type=int, default=50)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -99,6 +99,13 @@ async def ask_llm_json(
     return result
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens of a text, at about 4 characters per token
+    """
+    return len(text) // 4 + 1
+
+
 def track_time(create_class_attr: str) -> Callable:
     """
     Decorator to add time tracking within classes.
@@ -0,0 +1,78 @@
+import os
+import sqlite3
+from typing import Any, AsyncIterator, Callable, Dict
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+# Use the cost map shipped with litellm instead of fetching it on import
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+
+from askametric.query_processor.tools import SQLTools
+
+
+@pytest.fixture
+def sqlite_path(tmp_path) -> str:
+    """A temporary SQLite database with a small and a large table."""
+    path = str(tmp_path / "metrics.sqlite")
+    connection = sqlite3.connect(path)
+    connection.executescript(
+        """
+        CREATE TABLE districts (
+            district_name TEXT PRIMARY KEY,
+            state TEXT,
+            num_cases INTEGER,
+            num_deaths INTEGER
+        );
+        INSERT INTO districts VALUES
+            ('Chennai', 'Tamil Nadu', 100, 3),
+            ('Madurai', 'Tamil Nadu', 40, 1),
+            ('Kanniyakumari', 'Tamil Nadu', 10, 0);
+        CREATE TABLE events (id INTEGER PRIMARY KEY, kind TEXT, value REAL);
+        """
+    )
+    connection.executemany(
+        "INSERT INTO events (kind, value) VALUES (?, ?)",
+        [("a" if i % 2 else "b", float(i)) for i in range(5000)],
+    )
+    connection.commit()
+    connection.close()
+    return path
+
+
+@pytest.fixture
+async def asession(sqlite_path: str) -> AsyncIterator[AsyncSession]:
+    """An AsyncSession on the temporary SQLite database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{sqlite_path}")
+    async with AsyncSession(engine) as session:
+        yield session
+    await engine.dispose()
+
+
+@pytest.fixture
+def tools() -> SQLTools:
+    """A fresh SQLTools instance, with empty caches."""
+    return SQLTools()
+
+
+@pytest.fixture
+def stub_llm(monkeypatch) -> Callable:
+    """
+    Replace `ask_llm_json` in the given modules by a stub answering with
+    `respond(prompt, system_message)`. The stub records its prompts in
+    `stub.calls`.
+    """
+
+    def _stub_llm(respond: Callable[[str, str], Dict], *modules: Any) -> Any:
+        async def ask_llm_json(
+            prompt: str, system_message: str, *args: Any, **kwargs: Any
+        ) -> Dict:
+            ask_llm_json.calls.append(prompt)
+            return {"answer": respond(prompt, system_message), "cost": 0.01}
+
+        ask_llm_json.calls = []
+        for module in modules:
+            monkeypatch.setattr(module, "ask_llm_json", ask_llm_json)
+        return ask_llm_json
+
+    return _stub_llm
@@ -0,0 +1,134 @@
+from collections import namedtuple
+from decimal import Decimal
+
+import pytest
+
+from askametric.query_processor import query_processor
+from askametric.query_processor.answer_templates import (
+    TemplateAnswerPolicy,
+    render_template_answer,
+)
+from askametric.query_processor.columnar_result import ColumnarResult
+from askametric.query_processor.query_processor import (
+    FinalAnswerPath,
+    LLMQueryProcessor,
+)
+
+
+def _result(column_names, rows, truncated=False):
+    Row = namedtuple("Row", column_names)
+    return {"rows": [Row(*row) for row in rows], "truncated": truncated}
+
+
+@pytest.mark.parametrize("value", [42, 3.5, Decimal("12.50")])
+def test_finite_numeric_scalar_is_templated(value):
+    sql_result = _result(["total"], [(value,)])
+
+    assert TemplateAnswerPolicy().applies(sql_result, "English", "Latin")
+
+
+@pytest.mark.parametrize(
+    "value", [None, "Chennai", True, float("nan"), float("inf"), Decimal("NaN")]
+)
+def test_other_scalars_go_to_the_llm(value):
+    sql_result = _result(["total"], [(value,)])
+
+    assert not TemplateAnswerPolicy().applies(sql_result, "English", "Latin")
+
+
+def test_small_labeled_table_is_templated():
+    sql_result = _result(
+        ["district_name", "num_cases"], [("Chennai", 100), ("Madurai", 40)]
+    )
+
+    assert TemplateAnswerPolicy().applies(sql_result, "English", "Latin")
+    assert render_template_answer(sql_result) == (
+        "According to the database, here is the num cases by district name:\n"
+        "- Chennai: num cases 100\n"
+        "- Madurai: num cases 40"
+    )
+
+
+def test_labeled_table_with_missing_values_goes_to_the_llm():
+    sql_result = _result(["district_name", "num_cases"], [("Chennai", None)])
+
+    assert not TemplateAnswerPolicy().applies(sql_result, "English", "Latin")
+
+
+def test_truncated_results_and_other_languages_go_to_the_llm():
+    policy = TemplateAnswerPolicy()
+
+    assert not policy.applies(
+        _result(["n"], [(1,)], truncated=True), "English", "Latin"
+    )
+    assert not policy.applies(_result(["n"], [(1,)]), "Hindi", "Devanagari")
+
+
+def _make_processor(asession, sqlite_path, **kwargs):
+    processor = LLMQueryProcessor(
+        {"query_text": "How many cases?", "query_metadata": {}},
+        asession,
+        sqlite_path,
+        "sqlite",
+        "llm",
+        "guardrails-llm",
+        "system message",
+        "[]",
+        "",
+        [],
+        3,
+        template_answer_policy=TemplateAnswerPolicy(),
+        **kwargs,
+    )
+    processor.eng_translation = processor.query
+    processor.query_language = "English"
+    processor.query_script = "Latin"
+    return processor
+
+
+async def test_processor_templates_a_numeric_scalar(asession, sqlite_path, stub_llm):
+    llm = stub_llm(lambda prompt, _: {"answer": "LLM answer"}, query_processor)
+    processor = _make_processor(asession, sqlite_path)
+    processor.rewritten_sql_query = "SELECT SUM(num_cases) FROM districts"
+
+    await processor._get_final_answer_from_llm()
+
+    assert processor.final_answer == (
+        "According to the database, the sum of num cases is 150."
+    )
+    assert processor.final_answer_path == FinalAnswerPath.TEMPLATE
+    assert llm.calls == []
+
+
+async def test_processor_asks_the_llm_for_a_null_scalar(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(lambda prompt, _: {"answer": "No cases found."}, query_processor)
+    processor = _make_processor(asession, sqlite_path)
+    processor.rewritten_sql_query = (
+        "SELECT SUM(num_cases) FROM districts WHERE state = 'Kerala'"
+    )
+
+    await processor._get_final_answer_from_llm()
+
+    assert processor.final_answer == "No cases found."
+    assert processor.final_answer_path == FinalAnswerPath.LLM
+    assert len(llm.calls) == 1
+
+
+@pytest.mark.parametrize("columnar_results", [False, True])
+async def test_processor_result_type_follows_columnar_results(
+    asession, sqlite_path, stub_llm, columnar_results
+):
+    stub_llm(lambda prompt, _: {"answer": "LLM answer"}, query_processor)
+    processor = _make_processor(
+        asession, sqlite_path, columnar_results=columnar_results
+    )
+    processor.rewritten_sql_query = "SELECT district_name, num_cases FROM districts"
+
+    await processor._get_final_answer_from_llm()
+
+    assert isinstance(processor.sql_result["rows"], ColumnarResult) == (
+        columnar_results
+    )
+    assert len(processor.sql_result["rows"]) == 3
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def _add_slow_view(sqlite_path):
+    # Its only value is found after counting to a large number
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute(
+        """
+        CREATE VIEW slow_labels AS
+        WITH RECURSIVE counter(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000
+        )
+        SELECT 'late' AS label FROM counter WHERE n = 100000000
+        """
+    )
+    connection.commit()
+    connection.close()
+
+
+async def test_categorical_values_of_text_columns(tools, asession):
+    values = await tools.get_categorical_values(
+        ["districts", "events"], asession, "metrics"
+    )
+
+    # Numeric columns and columns with too many values are not categorical
+    assert values == {
+        "districts": {
+            "district_name": ["Chennai", "Kanniyakumari", "Madurai"],
+            "state": ["Tamil Nadu"],
+        },
+        "events": {"kind": ["a", "b"]},
+    }
+
+
+async def test_slow_column_is_skipped_after_the_timeout(tools, asession, sqlite_path):
+    _add_slow_view(sqlite_path)
+
+    start = time.monotonic()
+    values = await tools.get_categorical_values(
+        ["districts", "slow_labels"], asession, "metrics", timeout=0.2
+    )
+
+    assert time.monotonic() - start < 2
+    assert values["slow_labels"] == {}
+    assert values["districts"]["state"] == ["Tamil Nadu"]
+
+
+async def test_columns_are_queried_with_bounded_concurrency(
+    tools, asession, monkeypatch
+):
+    tools._max_concurrent_sample_fetches = 2
+    running = 0
+    max_running = 0
+    run_with_timeout = tools._run_with_timeout
+
+    async def _tracked_run_with_timeout(column_session, statements, timeout=None):
+        nonlocal running, max_running
+        assert column_session is not asession
+        running += 1
+        max_running = max(max_running, running)
+        try:
+            await asyncio.sleep(0.05)
+            return await run_with_timeout(column_session, statements, timeout)
+        finally:
+            running -= 1
+
+    monkeypatch.setattr(tools, "_run_with_timeout", _tracked_run_with_timeout)
+
+    values = await tools.get_categorical_values(
+        ["districts", "events"], asession, "metrics"
+    )
+
+    assert max_running == 2
+    assert values["events"] == {"kind": ["a", "b"]}
+
+
+async def test_columns_are_queried_in_sequence_without_an_engine(tools, asession):
+    async with asession.bind.connect() as connection:
+        async with AsyncSession(connection) as connection_session:
+            values = await tools.get_categorical_values(
+                ["districts"], connection_session, "metrics"
+            )
+
+    assert values["districts"]["state"] == ["Tamil Nadu"]
@@ -0,0 +1,68 @@
+from askametric.query_processor import chat_history
+from askametric.query_processor.chat_history import ChatHistoryManager
+
+
+def _turns(num_turns):
+    return [
+        {"user": f"Question {i}", "assistant": f"Answer {i}"} for i in range(num_turns)
+    ]
+
+
+def _summarize(prompt, _):
+    return {"summary": "Summary of the earlier turns."}
+
+
+async def test_short_history_is_kept_verbatim(stub_llm):
+    llm = stub_llm(_summarize, chat_history)
+    manager = ChatHistoryManager(keep_last_turns=4)
+
+    compacted, cost = await manager.compact(_turns(3), "conversation")
+
+    assert compacted == _turns(3)
+    assert cost == 0.0
+    assert llm.calls == []
+
+
+async def test_older_turns_are_summarized_once(stub_llm):
+    llm = stub_llm(_summarize, chat_history)
+    manager = ChatHistoryManager(keep_last_turns=2)
+
+    compacted, cost = await manager.compact(_turns(4), "conversation")
+
+    assert compacted == [{"summary": "Summary of the earlier turns."}] + _turns(4)[2:]
+    assert cost == 0.01
+    assert len(llm.calls) == 1
+    assert "Question 1" in llm.calls[0] and "Question 2" not in llm.calls[0]
+
+    # The same history is not summarized again
+    await manager.compact(_turns(4), "conversation")
+    assert len(llm.calls) == 1
+
+    # Only the turn leaving the verbatim window is summarized next
+    await manager.compact(_turns(5), "conversation")
+    assert len(llm.calls) == 2
+    assert "Question 2" in llm.calls[1] and "Question 1" not in llm.calls[1]
+
+
+async def test_edited_history_is_summarized_again(stub_llm):
+    llm = stub_llm(_summarize, chat_history)
+    manager = ChatHistoryManager(keep_last_turns=2)
+    await manager.compact(_turns(4), "conversation")
+
+    edited_turns = _turns(4)
+    edited_turns[0]["user"] = "Another question"
+    await manager.compact(edited_turns, "conversation")
+
+    assert len(llm.calls) == 2
+    assert "Another question" in llm.calls[1]
+
+
+async def test_locks_are_evicted_with_the_summaries(stub_llm):
+    stub_llm(_summarize, chat_history)
+    manager = ChatHistoryManager(keep_last_turns=2, max_conversations=2)
+
+    for conversation_id in ["first", "second", "third"]:
+        await manager.compact(_turns(4), conversation_id)
+
+    assert set(manager._summaries) == {"second", "third"}
+    assert set(manager._locks) == {"second", "third"}
@@ -0,0 +1,113 @@
+import json
+import sqlite3
+import time
+
+from sqlalchemy import event
+
+from askametric.query_processor.engine_registry import EngineRegistry
+
+
+def _add_json_table(sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("CREATE TABLE visits (id INTEGER PRIMARY KEY, details TEXT)")
+    connection.executemany(
+        "INSERT INTO visits (details) VALUES (?)",
+        [
+            (json.dumps({"outcome": outcome, "clinic": {"type": "phc"}}),)
+            for outcome in ["cured"] * 3 + ["referred"]
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+
+async def test_common_values_of_a_plain_column(tools, asession):
+    values = await tools.get_common_column_values(
+        {"districts": ["state"]}, asession, 1, []
+    )
+
+    assert values == {"districts": {"state": [("Tamil Nadu", 3)]}}
+
+
+async def test_json_column_is_profiled_per_key_path_on_first_use(
+    tools, asession, sqlite_path
+):
+    _add_json_table(sqlite_path)
+
+    # The key paths are discovered on demand, not only when the schema of the
+    # table was fetched first
+    values = await tools.get_common_column_values(
+        {"visits": ["details"]}, asession, 5, []
+    )
+
+    assert values == {
+        "visits": {
+            "details.outcome": [("cured", 3), ("referred", 1)],
+            "details.clinic.type": [("phc", 4)],
+        }
+    }
+
+
+async def test_json_key_path_column(tools, asession, sqlite_path):
+    _add_json_table(sqlite_path)
+
+    values = await tools.get_common_column_values(
+        {"visits": ["details.outcome"]}, asession, 1, []
+    )
+
+    assert values == {"visits": {"details.outcome": [("cured", 3)]}}
+
+
+async def test_json_paths_sampling_times_out(tools, asession, sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute(
+        """
+        CREATE VIEW slow_details AS
+        WITH RECURSIVE counter(n) AS (
+            SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000
+        )
+        SELECT '{"outcome": "cured"}' AS details FROM counter WHERE n = 100000000
+        """
+    )
+    connection.commit()
+    connection.close()
+
+    start = time.monotonic()
+    json_paths = await tools._get_json_paths(
+        "slow_details", "details", asession, timeout=0.2
+    )
+
+    assert time.monotonic() - start < 2
+    assert json_paths == []
+    # Timed out samples are not cached as "not JSON"
+    assert not tools._json_paths_cache
+
+
+async def test_common_values_are_cached_per_database_with_leased_sessions(
+    tools, sqlite_path
+):
+    registry = EngineRegistry()
+    registry.register("metrics", f"sqlite+aiosqlite:///{sqlite_path}")
+    statements = []
+    event.listen(
+        registry.get_engine("metrics").sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+
+    try:
+        for _ in range(2):
+            # A new factory on each call, as each processor creates its own
+            values = await tools.get_common_column_values(
+                {"districts": ["state"]},
+                None,
+                1,
+                [],
+                lease_session=lambda: registry.lease_session("metrics"),
+                metric_db_id="metrics",
+            )
+            assert values == {"districts": {"state": [("Tamil Nadu", 3)]}}
+    finally:
+        await registry.dispose()
+
+    assert len([s for s in statements if "GROUP BY" in s]) == 1
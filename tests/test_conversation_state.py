@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+from askametric.query_processor import query_processor
+from askametric.query_processor.conversation_state import ConversationStateStore
+from askametric.query_processor.query_processor import MultiTurnQueryProcessor
+
+TABLE_DESCRIPTION = json.dumps(
+    [
+        {"name": "districts", "description": "Cases and deaths per district"},
+        {"name": "events", "description": "Kinds and values of events"},
+    ]
+)
+STATE = {
+    "best_tables": ["districts"],
+    "sql_query": "SELECT num_cases FROM districts WHERE district_name = 'Chennai'",
+}
+
+
+def test_state_is_only_served_for_the_same_database():
+    store = ConversationStateStore()
+    store.set("conversation", "metrics", STATE)
+
+    assert store.get("conversation", "metrics") == STATE
+    assert store.get("conversation", "other") is None
+    assert store.get("other", "metrics") is None
+    assert store.stats()["hits"] == 1
+
+
+def test_stored_state_is_a_copy():
+    store = ConversationStateStore()
+    store.set("conversation", "metrics", STATE)
+
+    store.get("conversation", "metrics")["best_tables"].append("events")
+
+    assert store.get("conversation", "metrics")["best_tables"] == ["districts"]
+
+
+def _make_processor(asession, sqlite_path, query_text, state_store):
+    processor = MultiTurnQueryProcessor(
+        {"query_text": query_text, "query_metadata": {}},
+        asession,
+        sqlite_path,
+        "sqlite",
+        "llm",
+        "guardrails-llm",
+        "system message",
+        TABLE_DESCRIPTION,
+        "",
+        [],
+        3,
+        [{"user": "How many cases in Chennai?", "assistant": "100 cases."}],
+        conversation_id="conversation",
+        state_store=state_store,
+    )
+    processor._api_key = None
+    processor.eng_translation = dict(processor.query)
+    return processor
+
+
+@pytest.mark.parametrize(
+    "query_text, reused",
+    [
+        ("And how many deaths in that district?", True),
+        ("And what kinds of events had the largest values?", False),
+    ],
+)
+async def test_follow_up_reuses_the_plan_unless_it_needs_other_tables(
+    asession, sqlite_path, query_text, reused
+):
+    state_store = ConversationStateStore()
+    state_store.set("conversation", sqlite_path, STATE)
+    processor = _make_processor(asession, sqlite_path, query_text, state_store)
+
+    await processor._restore_conversation_state()
+
+    assert processor.reused_state is reused
+    if reused:
+        assert processor.best_tables == ["districts"]
+        assert processor.previous_sql_query == STATE["sql_query"]
+
+
+async def test_follow_up_selects_columns_the_previous_question_did_not_need(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(
+        lambda prompt, _: {"districts": ["district_name", "num_deaths"]},
+        query_processor,
+    )
+    state_store = ConversationStateStore()
+    state_store.set("conversation", sqlite_path, STATE)
+    processor = _make_processor(
+        asession, sqlite_path, "And how many deaths in that district?", state_store
+    )
+
+    await processor._restore_conversation_state()
+    await processor._get_best_tables_from_llm()
+    await processor._get_best_columns_from_llm()
+
+    assert processor.reused_state is True
+    assert processor.best_tables == ["districts"]
+    assert processor.best_columns == {"districts": ["district_name", "num_deaths"]}
+    assert "num_deaths" in processor.relevant_schemas
+    # Only the columns are selected again
+    assert len(llm.calls) == 1
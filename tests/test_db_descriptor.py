@@ -0,0 +1,202 @@
+import json
+import sqlite3
+
+import pytest
+
+from askametric.query_processor.db_descriptor import description_generator
+from askametric.query_processor.db_descriptor.description_generator import (
+    DatabaseDescriptor,
+)
+
+TABLE_DESCRIPTION = json.dumps(
+    [
+        {"name": "districts", "description": "Cases and deaths per district"},
+        {"name": "events", "description": "Events and their values"},
+    ]
+)
+
+
+def _respond(prompt, _):
+    if 'key "summary"' in prompt:
+        return {"summary": "Summary of a group of tables."}
+    if "Previous database description" in prompt:
+        return {"db_description": "Updated description."}
+    return {"db_description": "Description."}
+
+
+def _add_column(sqlite_path, table, column):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} INTEGER")
+    connection.commit()
+    connection.close()
+
+
+async def _describe(descriptor, asession, sqlite_path):
+    description = await descriptor.generate_db_description(
+        asession, sqlite_path, "Health data", TABLE_DESCRIPTION
+    )
+    # Release the read transaction so the schema can be changed
+    await asession.rollback()
+    return description
+
+
+async def test_description_is_only_generated_once(
+    asession, sqlite_path, tmp_path, stub_llm
+):
+    llm = stub_llm(_respond, description_generator)
+    store_path = str(tmp_path / "descriptions.json")
+    descriptor = DatabaseDescriptor(store_path=store_path)
+
+    assert await _describe(descriptor, asession, sqlite_path) == "Description."
+    assert await _describe(descriptor, asession, sqlite_path) == "Description."
+    assert len(llm.calls) == 1
+
+    # The store is written and reloaded on restart
+    restarted_descriptor = DatabaseDescriptor(store_path=store_path)
+    assert await _describe(restarted_descriptor, asession, sqlite_path) == (
+        "Description."
+    )
+    assert len(llm.calls) == 1
+
+
+async def test_description_is_updated_from_the_changed_table(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(_respond, description_generator)
+    descriptor = DatabaseDescriptor(fingerprint_ttl=0)
+    await _describe(descriptor, asession, sqlite_path)
+
+    _add_column(sqlite_path, "districts", "population")
+
+    assert await _describe(descriptor, asession, sqlite_path) == (
+        "Updated description."
+    )
+    assert len(llm.calls) == 2
+    update_prompt = llm.calls[1]
+    # The schema is read again after the change, and only for that table
+    assert "population" in update_prompt
+    assert "CREATE TABLE events" not in update_prompt
+
+
+async def test_only_changed_table_groups_are_summarized_again(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(_respond, description_generator)
+    # Small enough for each table to be summarized in its own group
+    descriptor = DatabaseDescriptor(fingerprint_ttl=0, max_chunk_tokens=50)
+    assert await _describe(descriptor, asession, sqlite_path) == "Description."
+
+    summary_prompts = [prompt for prompt in llm.calls if 'key "summary"' in prompt]
+    assert len(summary_prompts) == 2
+    assert [group["cached"] for group in descriptor.chunk_metrics[sqlite_path]] == [
+        False,
+        False,
+    ]
+
+    _add_column(sqlite_path, "events", "weight")
+    llm.calls.clear()
+    await _describe(descriptor, asession, sqlite_path)
+
+    summary_prompts = [prompt for prompt in llm.calls if 'key "summary"' in prompt]
+    assert len(summary_prompts) == 1
+    assert "weight" in summary_prompts[0]
+    assert {
+        group["tables"][0]: group["cached"]
+        for group in descriptor.chunk_metrics[sqlite_path]
+    } == {"districts": True, "events": False}
+
+
+def _description_prompts(llm):
+    return [prompt for prompt in llm.calls if 'key "db_description"' in prompt]
+
+
+async def test_large_database_is_described_from_the_group_summaries(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(_respond, description_generator)
+    descriptor = DatabaseDescriptor(max_chunk_tokens=50)
+
+    await _describe(descriptor, asession, sqlite_path)
+
+    [description_prompt] = _description_prompts(llm)
+    assert "Summary of a group of tables." in description_prompt
+    assert "['districts']" in description_prompt
+    assert "CREATE TABLE" not in description_prompt
+
+
+async def test_small_database_is_described_from_its_schema(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(_respond, description_generator)
+    descriptor = DatabaseDescriptor(max_chunk_tokens=10**6)
+
+    await _describe(descriptor, asession, sqlite_path)
+
+    assert not [prompt for prompt in llm.calls if 'key "summary"' in prompt]
+    [description_prompt] = _description_prompts(llm)
+    assert "CREATE TABLE" in description_prompt
+
+
+def _table_schemas(num_tables):
+    # About 10 tokens each
+    return {
+        f"t{i}": f"CREATE TABLE t{i} (value INTEGER);".ljust(36)
+        for i in range(num_tables)
+    }
+
+
+async def _summarize(descriptor, table_schemas):
+    return await descriptor._summarize_table_groups(
+        "metrics",
+        "Health data",
+        json.dumps([{"name": table, "description": ""} for table in table_schemas]),
+        "",
+        table_schemas,
+        {table: table for table in table_schemas},
+        None,
+    )
+
+
+async def test_table_groups_are_bounded_by_the_token_budget(stub_llm):
+    stub_llm(_respond, description_generator)
+    descriptor = DatabaseDescriptor(max_chunk_tokens=20)
+    descriptor._descriptions["metrics"] = {}
+
+    await _summarize(descriptor, _table_schemas(5))
+
+    metrics = descriptor.chunk_metrics["metrics"]
+    assert sorted(group["tables"] for group in metrics) == [
+        ["t0", "t1"],
+        ["t2", "t3"],
+        ["t4"],
+    ]
+    assert all(group["num_tokens"] <= 20 for group in metrics)
+
+
+async def test_failed_group_keeps_the_other_summaries(stub_llm):
+    def respond(prompt, _):
+        if "CREATE TABLE t2" in prompt:
+            raise RuntimeError("LLM unavailable")
+        return _respond(prompt, _)
+
+    stub_llm(respond, description_generator)
+    descriptor = DatabaseDescriptor(max_chunk_tokens=20)
+    descriptor._descriptions["metrics"] = {}
+    table_schemas = _table_schemas(5)
+
+    with pytest.raises(RuntimeError):
+        await _summarize(descriptor, table_schemas)
+
+    summarized_groups = [
+        summary["tables"]
+        for summary in descriptor._descriptions["metrics"]["table_groups"].values()
+    ]
+    assert sorted(summarized_groups) == [["t0", "t1"], ["t4"]]
+
+    # Only the failed group is summarized again
+    llm = stub_llm(_respond, description_generator)
+    summaries = await _summarize(descriptor, table_schemas)
+
+    assert len(llm.calls) == 1
+    assert "CREATE TABLE t2" in llm.calls[0]
+    assert summaries.count("Summary of a group of tables.") == 3
@@ -0,0 +1,79 @@
+import asyncio
+import json
+
+import pytest
+
+from askametric.query_processor.db_descriptor import description_generator
+from askametric.query_processor.db_descriptor.description_generator import (
+    DatabaseDescriptor,
+)
+from askametric.query_processor.engine_registry import EngineRegistry
+
+DATABASE = {
+    "sys_message": "Health data",
+    "table_description": json.dumps(
+        [{"name": "districts", "description": "Cases and deaths per district"}]
+    ),
+}
+
+
+@pytest.fixture
+async def registry(monkeypatch):
+    registry = EngineRegistry()
+    monkeypatch.setattr(description_generator, "get_engine_registry", lambda: registry)
+    yield registry
+    await registry.dispose()
+
+
+async def test_bulk_generation_is_concurrent_and_bounded(
+    registry, sqlite_path, monkeypatch
+):
+    metric_db_ids = [f"{sqlite_path}-{i}" for i in range(3)]
+    for metric_db_id in metric_db_ids:
+        registry.register(metric_db_id, f"sqlite+aiosqlite:///{sqlite_path}")
+    running = 0
+    max_running = 0
+
+    async def ask_llm_json(prompt, system_message, *args, **kwargs):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if 'key "suggested_questions"' in prompt:
+            return {"answer": {"suggested_questions": ["Question?"]}, "cost": 0.01}
+        return {"answer": {"db_description": "Description."}, "cost": 0.01}
+
+    monkeypatch.setattr(description_generator, "ask_llm_json", ask_llm_json)
+
+    results = await DatabaseDescriptor().generate_bulk(
+        {metric_db_id: DATABASE for metric_db_id in metric_db_ids},
+        max_concurrency=2,
+    )
+
+    assert results == {
+        metric_db_id: {
+            "db_description": "Description.",
+            "suggested_questions": ["Question?"],
+            "errors": {},
+        }
+        for metric_db_id in metric_db_ids
+    }
+    # Both steps of at most two databases at once
+    assert max_running == 4
+
+
+async def test_bulk_generation_records_failed_steps(registry, sqlite_path, stub_llm):
+    registry.register(sqlite_path, f"sqlite+aiosqlite:///{sqlite_path}")
+    stub_llm(
+        lambda prompt, _: {"db_description": "Description."}, description_generator
+    )
+
+    results = await DatabaseDescriptor().generate_bulk(
+        {sqlite_path: DATABASE, "unregistered": DATABASE}
+    )
+
+    assert results[sqlite_path]["db_description"] == "Description."
+    assert results[sqlite_path]["suggested_questions"] is None
+    assert "suggested_questions" in results[sqlite_path]["errors"]
+    assert set(results["unregistered"]["errors"]) == {"schema"}
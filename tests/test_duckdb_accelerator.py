@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+
+import pytest
+
+from askametric.query_processor.tools import SQLTimeoutError
+
+duckdb = pytest.importorskip("duckdb")
+
+from askametric.query_processor.duckdb_accelerator import (  # noqa: E402
+    DuckDBAccelerator,
+)
+
+SLOW_QUERY = "SELECT SUM(a.range * b.range) FROM range(100000) a, range(100000) b"
+
+
+@pytest.fixture
+def accelerator(sqlite_path):
+    accelerator = DuckDBAccelerator()
+    accelerator.register_sqlite("db", sqlite_path)
+    yield accelerator
+    accelerator.close()
+
+
+async def _wait_until_idle(mirror, max_wait=5.0):
+    start = time.monotonic()
+    while mirror["active"] and time.monotonic() - start < max_wait:
+        await asyncio.sleep(0.01)
+    return mirror["active"] == 0
+
+
+async def test_mirror_matches_the_source(accelerator):
+    result = await accelerator.run_sql(
+        "SELECT district_name, num_cases FROM districts ORDER BY num_cases", "db"
+    )
+
+    assert [tuple(row) for row in result["rows"]] == [
+        ("Kanniyakumari", 10),
+        ("Madurai", 40),
+        ("Chennai", 100),
+    ]
+    assert result["rows"][0]._fields == ("district_name", "num_cases")
+
+
+async def test_tables_are_mirrored_in_batches(accelerator):
+    accelerator._mirror_batch_size = 7
+
+    result = await accelerator.run_sql(
+        "SELECT COUNT(*), SUM(value), COUNT(DISTINCT kind) FROM events", "db"
+    )
+
+    assert tuple(result["rows"][0]) == (5000, sum(range(5000)), 2)
+
+
+async def test_mixed_type_columns_are_mirrored_as_text(sqlite_path):
+    with sqlite3.connect(sqlite_path) as connection:
+        connection.execute("CREATE TABLE mixed (value)")
+        connection.executemany(
+            "INSERT INTO mixed VALUES (?)", [(1,), ("N/A",), (None,), (2.5,)]
+        )
+    accelerator = DuckDBAccelerator()
+    accelerator.register_sqlite("db", sqlite_path)
+
+    result = await accelerator.run_sql("SELECT value FROM mixed", "db")
+
+    assert [row[0] for row in result["rows"]] == ["1", "N/A", None, "2.5"]
+    accelerator.close()
+
+
+async def test_truncated_results_are_not_counted(accelerator):
+    result = await accelerator.run_sql("SELECT * FROM events", "db", max_rows=10)
+
+    assert len(result["rows"]) == 10
+    assert result["truncated"] is True
+    assert result["total_rows_estimate"] == 11
+
+
+async def test_slow_query_times_out_and_is_interrupted(accelerator):
+    await accelerator.refresh("db")
+    mirror = accelerator._mirrors["db"]
+
+    with pytest.raises(SQLTimeoutError):
+        await accelerator.run_sql(SLOW_QUERY, "db", timeout=0.2)
+
+    assert await _wait_until_idle(mirror)
+
+
+async def test_cancelled_query_is_interrupted(accelerator):
+    await accelerator.refresh("db")
+    mirror = accelerator._mirrors["db"]
+
+    task = asyncio.ensure_future(accelerator.run_sql(SLOW_QUERY, "db", timeout=60))
+    await asyncio.sleep(0.2)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert await _wait_until_idle(mirror)
+
+
+async def test_refresh_replaces_and_closes_a_stale_mirror(accelerator, sqlite_path):
+    await accelerator.refresh("db")
+    previous_mirror = accelerator._mirrors["db"]
+
+    with sqlite3.connect(sqlite_path) as connection:
+        connection.execute("UPDATE districts SET num_cases = 0")
+    stat = os.stat(sqlite_path)
+    os.utime(sqlite_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    result = await accelerator.run_sql("SELECT SUM(num_cases) FROM districts", "db")
+
+    assert result["rows"][0][0] == 0
+    assert accelerator._mirrors["db"] is not previous_mirror
+    with pytest.raises(duckdb.ConnectionException):
+        previous_mirror["connection"].execute("SELECT 1")
+
+
+async def test_common_column_values(accelerator):
+    values = await accelerator.get_common_column_values(
+        "db", {"districts": ["state"], "events": ["kind"]}, 1, indicator_vars=["kind"]
+    )
+
+    assert values["districts"] == {"state": [("Tamil Nadu", 3)]}
+    # Indicator variables have all their values
+    assert sorted(values["events"]["kind"]) == [("a", 2500), ("b", 2500)]
+
+
+async def test_json_column_is_profiled_per_key_path(accelerator, sqlite_path):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("CREATE TABLE visits (id INTEGER PRIMARY KEY, details TEXT)")
+    connection.executemany(
+        "INSERT INTO visits (details) VALUES (?)",
+        [
+            (json.dumps({"outcome": outcome, "clinic": {"type": "phc"}}),)
+            for outcome in ["cured"] * 3 + ["referred"]
+        ],
+    )
+    connection.commit()
+    connection.close()
+
+    values = await accelerator.get_common_column_values(
+        "db", {"visits": ["details"]}, 5, indicator_vars=[]
+    )
+
+    assert values == {
+        "visits": {
+            "details.outcome": [("cured", 3), ("referred", 1)],
+            "details.clinic.type": [("phc", 4)],
+        }
+    }
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "SELECT content FROM read_text('{path}')",
+        "SELECT * FROM read_csv_auto('{path}')",
+        "SELECT * FROM '{path}'",
+    ],
+)
+async def test_queries_cannot_read_files(accelerator, tmp_path, sql_query):
+    path = tmp_path / "secret.csv"
+    path.write_text("secret\n42\n")
+    await accelerator.run_sql("SELECT 1", "db")
+
+    with pytest.raises(duckdb.Error):
+        await accelerator.run_sql(sql_query.format(path=path), "db")
+    with pytest.raises(duckdb.Error):
+        await accelerator.run_sql("SET enable_external_access = true", "db")
+
+    result = await accelerator.run_sql("SELECT COUNT(*) FROM districts", "db")
+    assert result["rows"][0][0] == 3
@@ -0,0 +1,63 @@
+import asyncio
+import sqlite3
+from contextlib import closing
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from askametric.query_processor.engine_registry import EngineRegistry
+
+
+def _journal_mode(path: str) -> str:
+    with closing(sqlite3.connect(path)) as connection:
+        return connection.execute("PRAGMA journal_mode").fetchone()[0].lower()
+
+
+@pytest.fixture
+async def registry():
+    registry = EngineRegistry()
+    yield registry
+    await registry.dispose()
+
+
+async def test_registering_readers_leaves_the_journal_mode(registry, sqlite_path):
+    registry.register_sqlite_readers("db", sqlite_path)
+
+    async with registry.lease_session("db") as asession:
+        await asession.execute(text("SELECT 1"))
+
+    assert _journal_mode(sqlite_path) == "delete"
+
+
+async def test_wal_is_opt_in(registry, sqlite_path):
+    registry.register_sqlite_readers("db", sqlite_path, wal=True)
+
+    assert _journal_mode(sqlite_path) == "wal"
+
+
+async def test_immutable_readers_never_switch_to_wal(registry, sqlite_path):
+    registry.register_sqlite_readers("db", sqlite_path, immutable=True, wal=True)
+
+    assert _journal_mode(sqlite_path) == "delete"
+
+
+async def test_readers_are_read_only(registry, sqlite_path):
+    registry.register_sqlite_readers("db", sqlite_path)
+
+    async with registry.lease_session("db") as asession:
+        with pytest.raises(OperationalError):
+            await asession.execute(text("DELETE FROM districts"))
+
+
+async def test_leased_sessions_run_concurrently(registry, sqlite_path):
+    registry.register_sqlite_readers("db", sqlite_path, num_readers=2)
+
+    async def _count() -> int:
+        async with registry.lease_session("db") as asession:
+            return (
+                await asession.execute(text("SELECT COUNT(*) FROM events"))
+            ).scalar_one()
+
+    assert await asyncio.gather(_count(), _count(), _count()) == [5000] * 3
+    assert registry.pool_metrics("db")["leases"] == 3
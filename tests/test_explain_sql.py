@@ -0,0 +1,63 @@
+from sqlalchemy import text
+from sqlalchemy.dialects import sqlite
+
+
+async def test_full_scan_is_estimated_from_the_table_size(tools, asession):
+    plan = await tools.explain_sql("SELECT * FROM events WHERE kind = 'a'", asession)
+
+    assert plan["full_scans"] == ["events"]
+    assert plan["estimated_rows"] == 5000
+
+
+async def test_primary_key_lookup_has_no_full_scan(tools, asession):
+    plan = await tools.explain_sql("SELECT * FROM events WHERE id = 3", asession)
+
+    assert plan["full_scans"] == []
+    assert plan["estimated_cost"] == 0.0
+
+
+async def test_table_names_are_quoted(tools, asession):
+    await asession.execute(text('CREATE TABLE "odd""name" (value INTEGER)'))
+    await asession.execute(text('INSERT INTO "odd""name" VALUES (1), (2)'))
+
+    plan = await tools.explain_sql('SELECT * FROM "odd""name"', asession)
+
+    assert plan["full_scans"] == ['odd"name']
+    assert plan["estimated_rows"] == 2
+
+
+class _Response:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def fetchall(self):
+        return self.rows
+
+    def scalar_one(self):
+        return self.rows[0][0]
+
+
+class _LegacySQLiteSession:
+    """A session whose query plans use the "SCAN TABLE" wording of old SQLite."""
+
+    def __init__(self):
+        self.statements = []
+
+    def get_bind(self):
+        return type("Bind", (), {"dialect": sqlite.dialect()})()
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+        if str(statement).startswith("EXPLAIN"):
+            return _Response([(2, 0, 0, "SCAN TABLE events")])
+        return _Response([(42,)])
+
+
+async def test_legacy_scan_table_wording(tools):
+    asession = _LegacySQLiteSession()
+
+    plan = await tools._explain_sqlite("SELECT * FROM events", asession)
+
+    assert plan["full_scans"] == ["events"]
+    assert plan["estimated_rows"] == 42
+    assert asession.statements[-1] == "SELECT MAX(rowid) FROM events"
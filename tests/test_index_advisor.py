@@ -0,0 +1,114 @@
+import threading
+
+from askametric.query_processor import query_processor
+from askametric.query_processor.index_advisor import advise
+from askametric.query_processor.query_log import QueryLog
+
+
+def _entry(sql_query, db_type, execution_time=1.0):
+    return {
+        "metric_db_id": "metrics",
+        "db_type": db_type,
+        "best_columns": {},
+        "sql_query": sql_query,
+        "execution_time": execution_time,
+    }
+
+
+def test_index_is_suggested_on_filter_columns():
+    entries = [_entry("SELECT COUNT(*) FROM events WHERE kind = 'a'", "sqlite")]
+
+    [suggestion] = advise(entries)["metrics"]
+
+    assert suggestion["kind"] == "index"
+    assert suggestion["columns"] == ["kind"]
+    assert suggestion["ddl"] == (
+        "CREATE INDEX IF NOT EXISTS ix_events_kind ON events (kind);"
+    )
+
+
+def test_ddl_uses_the_dialect_of_each_query():
+    # The last entry of a database must not decide the dialect of all of them
+    entries = [
+        _entry("SELECT value FROM events WHERE kind = 'a'", "mysql", 5.0),
+        _entry("SELECT value FROM events WHERE id > 10", "postgresql", 1.0),
+    ]
+
+    suggestions = {
+        suggestion["db_type"]: suggestion["ddl"]
+        for suggestion in advise(entries)["metrics"]
+    }
+
+    assert suggestions["mysql"].startswith("CREATE INDEX ix_events_kind")
+    assert suggestions["postgresql"].startswith(
+        "CREATE INDEX IF NOT EXISTS ix_events_id"
+    )
+
+
+def test_ddl_keeps_the_schema_of_the_table():
+    entries = [
+        _entry("SELECT COUNT(*) FROM public.events WHERE kind = 'a'", "postgresql"),
+        _entry("SELECT kind, COUNT(*) FROM stats.events GROUP BY kind", "postgresql"),
+    ]
+
+    suggestions = {
+        suggestion["kind"]: suggestion["ddl"]
+        for suggestion in advise(entries)["metrics"]
+    }
+
+    assert suggestions["index"] == (
+        "CREATE INDEX IF NOT EXISTS ix_public_events_kind ON public.events (kind);"
+    )
+    assert "FROM stats.events GROUP BY kind" in suggestions["materialized_aggregate"]
+
+
+async def test_query_log_is_written_off_the_event_loop(tmp_path, monkeypatch):
+    query_log = QueryLog(str(tmp_path / "queries.jsonl"))
+    write = query_log._write
+    threads = []
+
+    def _write(line):
+        threads.append(threading.current_thread())
+        write(line)
+
+    monkeypatch.setattr(query_log, "_write", _write)
+
+    await query_log.log("metrics", "sqlite", [], {}, "SELECT 1", 0.1, 1)
+
+    assert threads and threads[0] is not threading.current_thread()
+    [entry] = list(query_log.read())
+    assert entry["sql_query"] == "SELECT 1"
+
+
+async def test_processor_logs_the_source_dialect(
+    asession, sqlite_path, tmp_path, stub_llm
+):
+    stub_llm(lambda prompt, _: {"answer": "150 cases."}, query_processor)
+    query_log = QueryLog(str(tmp_path / "queries.jsonl"))
+    processor = query_processor.LLMQueryProcessor(
+        {"query_text": "How many cases?", "query_metadata": {}},
+        asession,
+        sqlite_path,
+        "sqlite",
+        "llm",
+        "guardrails-llm",
+        "system message",
+        "[]",
+        "",
+        [],
+        3,
+        query_log=query_log,
+    )
+    processor.eng_translation = processor.query
+    processor.query_language = "English"
+    processor.query_script = "Latin"
+    # As with DuckDB acceleration, where the query runs in another dialect
+    processor.sql_dialect = "duckdb"
+    processor.rewritten_sql_query = "SELECT SUM(num_cases) FROM districts"
+    processor.best_tables = ["districts"]
+    processor.best_columns = {"districts": ["num_cases"]}
+
+    await processor._get_final_answer_from_llm()
+
+    [entry] = list(query_log.read())
+    assert entry["db_type"] == "sqlite"
@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from askametric.query_processor import query_processor
+from askametric.query_processor.guardrails import guardrails
+from askametric.query_processor.query_processor import MultiTurnQueryProcessor
+
+CHAT_HISTORY = [{"user": "How many cases in Chennai?", "assistant": "100 cases."}]
+
+
+def _respond(question_type):
+    def respond(prompt, _):
+        if 'key "question_type"' in prompt:
+            return {"question_type": question_type}
+        if 'key "reframed_query"' in prompt:
+            return {"reframed_query": "How many deaths in Chennai?"}
+        if 'key "relevant"' in prompt:
+            return {"relevant": "True"}
+        return {"safe": "True"}
+
+    return respond
+
+
+def _relevance_prompts(llm):
+    return [prompt for prompt in llm.calls if 'key "relevant"' in prompt]
+
+
+def _make_processor(asession, sqlite_path, chat_history):
+    processor = MultiTurnQueryProcessor(
+        {"query_text": "And deaths?", "query_metadata": {}},
+        asession,
+        sqlite_path,
+        "sqlite",
+        "llm",
+        "guardrails-llm",
+        "system message",
+        "[]",
+        "",
+        [],
+        3,
+        chat_history,
+        concurrent_stages=True,
+    )
+    processor._api_key = None
+    processor.query_language = "English"
+    processor.query_script = "Latin"
+    processor.eng_translation = dict(processor.query)
+    return processor
+
+
+@pytest.mark.parametrize("chat_history", [[], CHAT_HISTORY])
+async def test_relevance_of_a_new_question_is_checked_once(
+    asession, sqlite_path, stub_llm, chat_history
+):
+    llm = stub_llm(_respond(1), query_processor, guardrails)
+    processor = _make_processor(asession, sqlite_path, chat_history)
+
+    await processor._classify_and_check_concurrently()
+
+    [relevance_prompt] = _relevance_prompts(llm)
+    assert "And deaths?" in relevance_prompt
+    assert processor.eng_translation["query_text"] == "And deaths?"
+    assert processor.guardrails.relevant is True
+    assert "_check_relevance" in processor.timings
+
+
+async def test_relevance_of_a_follow_up_is_checked_once_on_its_reframing(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(_respond(2), query_processor, guardrails)
+    processor = _make_processor(asession, sqlite_path, CHAT_HISTORY)
+
+    await processor._classify_and_check_concurrently()
+
+    [relevance_prompt] = _relevance_prompts(llm)
+    assert "How many deaths in Chennai?" in relevance_prompt
+    assert processor.eng_translation == {
+        "query_text": "How many deaths in Chennai?",
+        "query_metadata": {},
+        "original_query": "And deaths?",
+    }
+    # Query type, safety, reframing and relevance
+    assert len(llm.calls) == 4
+    assert {
+        "_get_query_type",
+        "_check_safety",
+        "_ask_reframed_query",
+        "_check_relevance",
+    } <= set(processor.timings)
+    # Query type and reframing, guardrails are costed separately
+    assert processor.cost == pytest.approx(0.02)
+    assert processor.guardrails.cost == pytest.approx(0.02)
+
+
+async def test_reframing_of_a_new_question_is_cancelled(
+    asession, sqlite_path, stub_llm, monkeypatch
+):
+    llm = stub_llm(_respond(1), query_processor, guardrails)
+
+    async def slow_reframing(prompt, *args, **kwargs):
+        if 'key "reframed_query"' in prompt:
+            await asyncio.sleep(10)
+        return await llm(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(query_processor, "ask_llm_json", slow_reframing)
+    processor = _make_processor(asession, sqlite_path, CHAT_HISTORY)
+
+    await asyncio.wait_for(processor._classify_and_check_concurrently(), 5)
+
+    assert processor.eng_translation["query_text"] == "And deaths?"
+    assert "_ask_reframed_query" not in processor.timings
+    assert not any('key "reframed_query"' in prompt for prompt in llm.calls)
+    # Only the query type is costed
+    assert processor.cost == pytest.approx(0.01)
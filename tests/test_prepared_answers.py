@@ -0,0 +1,149 @@
+import json
+
+from askametric.query_processor import query_processor
+from askametric.query_processor.db_descriptor import description_generator
+from askametric.query_processor.db_descriptor.description_generator import (
+    DatabaseDescriptor,
+)
+from askametric.query_processor.prepared_answers import (
+    AnswerWarmer,
+    PreparedAnswerStore,
+)
+from askametric.query_processor.query_processor import (
+    FinalAnswerPath,
+    LLMQueryProcessor,
+    MultiTurnQueryProcessor,
+    ProcessorStatus,
+)
+
+QUERY = {"query_text": "How many cases are there?", "query_metadata": {}}
+PROCESSOR_ARGS = (
+    "llm",
+    "guardrails-llm",
+    "system message",
+    "[]",
+    "",
+    [],
+    3,
+)
+
+
+async def _warm(answer_store, asession, sqlite_path):
+    """Store the answer of a single-turn processor, as AnswerWarmer does."""
+    processor = LLMQueryProcessor(
+        QUERY, asession, sqlite_path, "sqlite", *PROCESSOR_ARGS
+    )
+    processor.query_language = "English"
+    processor.query_script = "Latin"
+    processor.eng_translation = QUERY
+    processor.best_tables = ["districts"]
+    processor.best_columns = {"districts": ["num_cases"]}
+    processor.sql_query = "SELECT SUM(num_cases) FROM districts"
+    processor.final_answer = "There are 150 cases."
+    processor.status = ProcessorStatus.SUCCESS
+
+    key = answer_store.key(sqlite_path, QUERY)
+    answer_store.track(key)
+    answer_store.set(
+        key,
+        await processor.tools.get_data_version(asession),
+        processor.prepared_answer(),
+    )
+
+
+async def test_warmed_question_is_served_by_the_multi_turn_processor(
+    asession, sqlite_path, stub_llm
+):
+    llm = stub_llm(lambda prompt, _: {}, query_processor)
+    answer_store = PreparedAnswerStore()
+    await _warm(answer_store, asession, sqlite_path)
+
+    processor = MultiTurnQueryProcessor(
+        QUERY,
+        asession,
+        sqlite_path,
+        "sqlite",
+        *PROCESSOR_ARGS,
+        answer_store=answer_store,
+    )
+    await processor.process_query()
+
+    assert llm.calls == []
+    assert processor.final_answer_path == FinalAnswerPath.PREPARED
+    assert processor.status == ProcessorStatus.SUCCESS
+    assert processor.final_answer == "There are 150 cases."
+    assert processor.translated_final_answer == "There are 150 cases."
+    assert processor.query_type == 1
+    assert processor.sql_query == "SELECT SUM(num_cases) FROM districts"
+    assert answer_store.stats()["hits"] == 1
+
+
+async def test_warmed_question_is_not_served_after_the_data_changed(
+    asession, sqlite_path, tools
+):
+    answer_store = PreparedAnswerStore()
+    await _warm(answer_store, asession, sqlite_path)
+    key = answer_store.key(sqlite_path, QUERY)
+    data_version = await tools.get_data_version(asession)
+
+    assert answer_store.get(key, data_version) is not None
+    assert answer_store.get(key, f"{data_version}-changed") is None
+    # Stale answers are dropped
+    assert answer_store.get(key, data_version) is None
+
+
+async def test_unregistered_database_is_not_looked_up():
+    processor = LLMQueryProcessor(
+        QUERY,
+        None,
+        "unregistered",
+        "sqlite",
+        *PROCESSOR_ARGS,
+        answer_store=PreparedAnswerStore(),
+    )
+
+    assert await processor._serve_prepared_answer() is False
+
+
+def test_tracked_questions_are_bounded():
+    answer_store = PreparedAnswerStore(max_tracked=2)
+    keys = [
+        answer_store.key("metrics", {"query_text": f"Question {i}?"}) for i in range(3)
+    ]
+    for key in keys:
+        answer_store.track(key)
+
+    assert [answer_store.is_tracked(key) for key in keys] == [False, True, True]
+
+
+async def test_suggested_questions_are_warmed_when_they_change(
+    asession, sqlite_path, stub_llm, monkeypatch
+):
+    stub_llm(
+        lambda prompt, _: {"suggested_questions": ["How many cases are there?"]},
+        description_generator,
+    )
+    warmer = AnswerWarmer(PreparedAnswerStore())
+    started = []
+    monkeypatch.setattr(
+        warmer,
+        "start",
+        lambda metric_db_id, questions, make_processor, api_key=None: started.append(
+            (metric_db_id, questions, make_processor(QUERY))
+        ),
+    )
+    descriptor = DatabaseDescriptor(
+        on_suggested_questions=warmer.suggested_questions_hook(
+            lambda metric_db_id, query: (metric_db_id, query)
+        )
+    )
+    table_description = json.dumps([{"name": "districts", "description": ""}])
+
+    for _ in range(2):
+        await descriptor.generate_suggested_questions(
+            asession, sqlite_path, "Health data", table_description
+        )
+
+    assert started == [
+        (sqlite_path, ["How many cases are there?"], (sqlite_path, QUERY))
+    ]
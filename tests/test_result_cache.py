@@ -0,0 +1,50 @@
+import sqlite3
+
+from askametric.query_processor.result_cache import SQLResultCache
+
+QUERY = "SELECT SUM(num_cases) FROM districts"
+
+
+async def test_result_is_served_from_cache_until_the_data_changes(
+    tools, asession, sqlite_path
+):
+    first = await tools.run_sql(QUERY, asession, metric_db_id=sqlite_path)
+    second = await tools.run_sql(QUERY, asession, metric_db_id=sqlite_path)
+
+    assert second is first
+    assert tools.result_cache.stats()["hits"] == 1
+
+    await asession.rollback()
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("UPDATE districts SET num_cases = num_cases + 1")
+    connection.commit()
+    connection.close()
+
+    third = await tools.run_sql(QUERY, asession, metric_db_id=sqlite_path)
+
+    assert third["rows"][0][0] == 153
+    assert tools.result_cache.stats()["invalidations"] == 1
+
+
+async def test_equivalent_queries_share_their_normalized_key(
+    tools, asession, sqlite_path
+):
+    await tools.run_sql(
+        QUERY, asession, metric_db_id=sqlite_path, normalized_sql_query="q"
+    )
+    await tools.run_sql(
+        QUERY.lower(), asession, metric_db_id=sqlite_path, normalized_sql_query="q"
+    )
+
+    assert tools.result_cache.stats()["hits"] == 1
+
+
+def test_results_larger_than_the_cache_are_not_cached():
+    cache = SQLResultCache(max_size=10)
+
+    cache.set("small", "v1", "result", size=5)
+    cache.set("large", "v1", "result", size=11)
+
+    assert cache.get("small", "v1") == "result"
+    assert cache.get("large", "v1") is None
+    assert cache.get("small", "v2") is None
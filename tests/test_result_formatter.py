@@ -0,0 +1,65 @@
+import pytest
+
+from askametric.query_processor.result_formatter import (
+    format_sql_result,
+    format_value,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(3.0, "3"), (1234.5678, "1234.57"), (0.012345, "0.0123"), (None, "None")],
+)
+def test_values_are_rounded_sensibly(value, expected):
+    assert format_value(value) == expected
+
+
+async def test_small_result_is_rendered_in_full(tools, asession):
+    result = await tools.run_sql(
+        "SELECT district_name, num_cases FROM districts ORDER BY num_cases DESC",
+        asession,
+    )
+
+    assert format_sql_result(result) == (
+        "3 rows:\n"
+        "district_name: Chennai, Madurai, Kanniyakumari\n"
+        "num_cases: 100, 40, 10"
+    )
+
+
+async def test_empty_result(tools, asession):
+    result = await tools.run_sql(
+        "SELECT * FROM districts WHERE state = 'Kerala'", asession
+    )
+
+    assert format_sql_result(result) == "The query returned no rows."
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+async def test_large_result_is_summarized_per_column(tools, asession, columnar):
+    result = await tools.run_sql(
+        "SELECT kind, value FROM events WHERE id <= 1000 ORDER BY id",
+        asession,
+        max_bytes=10**6,
+        columnar=columnar,
+    )
+
+    formatted = format_sql_result(result, max_verbatim_rows=50, num_sample_rows=3)
+
+    assert formatted.startswith("1000 rows, summarized per column:")
+    assert "kind: count=1000, distinct=2, top groups: a (500), b (500)" in formatted
+    assert "value: count=1000, sum=499500, min=0, max=999, mean=499.5" in formatted
+    assert formatted.endswith(
+        "Sample of the first 3 rows:\nkind: b, a, b\nvalue: 0, 1, 2"
+    )
+
+
+async def test_summaries_skip_null_values(tools, asession):
+    result = await tools.run_sql(
+        "SELECT CASE WHEN id % 2 THEN value END AS v FROM events WHERE id <= 100",
+        asession,
+    )
+
+    formatted = format_sql_result(result, max_verbatim_rows=10)
+
+    assert "v: count=50, sum=2450, min=0, max=98, mean=49" in formatted
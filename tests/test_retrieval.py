@@ -0,0 +1,60 @@
+import json
+
+from askametric.query_processor.retrieval import SchemaRetriever, tokenize
+
+TABLE_DESCRIPTION = json.dumps(
+    [
+        {"name": "districts", "description": "Health statistics per area"},
+        {"name": "events", "description": "Health events and their values"},
+        {"name": "facilities", "description": "Health facilities per area"},
+        {"name": "vaccinations", "description": "Health campaigns per area"},
+        {"name": "budgets", "description": "Health spending per area"},
+    ]
+)
+TABLE_COLUMNS = {
+    "districts": ["district_name", "state", "num_cases", "num_deaths"],
+    "events": ["id", "kind", "value"],
+    "facilities": ["facility_name", "district_name", "num_beds"],
+    "vaccinations": ["district_name", "vaccine", "num_doses"],
+    "budgets": ["district_name", "year", "amount"],
+}
+
+
+def test_identifiers_and_plurals_are_tokenized():
+    assert tokenize("How many num_deaths were there?") == ["num", "death"]
+
+
+def test_table_with_the_matching_column_is_ranked_first():
+    retriever = SchemaRetriever()
+
+    tables = retriever.retrieve_tables(
+        "metrics",
+        "How many deaths were recorded?",
+        TABLE_DESCRIPTION,
+        TABLE_COLUMNS,
+        top_n=2,
+    )
+
+    assert tables[0] == "districts"
+    assert len(tables) == 2
+
+
+def test_full_list_is_used_without_a_confident_match():
+    retriever = SchemaRetriever()
+
+    tables = retriever.retrieve_tables(
+        "metrics", "Tell me something", TABLE_DESCRIPTION, TABLE_COLUMNS, top_n=2
+    )
+
+    assert tables is None
+
+
+def test_table_index_is_built_once_per_database():
+    retriever = SchemaRetriever()
+
+    for query_text in ["How many deaths?", "How many beds?"]:
+        retriever.retrieve_tables(
+            "metrics", query_text, TABLE_DESCRIPTION, TABLE_COLUMNS, top_n=2
+        )
+
+    assert len(retriever._table_indexes) == 1
@@ -0,0 +1,41 @@
+from sqlalchemy import event
+
+from askametric.query_processor.result_formatter import format_sql_result
+
+
+async def test_run_sql_returns_all_rows_within_budget(tools, asession):
+    result = await tools.run_sql("SELECT * FROM districts", asession)
+
+    assert len(result["rows"]) == 3
+    assert result["truncated"] is False
+    assert result["total_rows_estimate"] == 3
+
+
+async def test_run_sql_truncates_at_row_budget(tools, asession):
+    result = await tools.run_sql("SELECT * FROM events", asession, max_rows=10)
+
+    assert len(result["rows"]) == 10
+    assert result["truncated"] is True
+    assert result["total_rows_estimate"] == 11
+    assert "First 10 rows of more than 10 rows" in format_sql_result(result)
+
+
+async def test_run_sql_truncates_at_byte_budget(tools, asession):
+    result = await tools.run_sql("SELECT * FROM events", asession, max_bytes=500)
+
+    assert 0 < len(result["rows"]) < 5000
+    assert result["truncated"] is True
+
+
+async def test_run_sql_runs_a_truncated_query_once(tools, asession):
+    statements = []
+    engine = asession.get_bind()
+    event.listen(
+        engine,
+        "before_cursor_execute",
+        lambda conn, cursor, statement, *args: statements.append(statement),
+    )
+
+    await tools.run_sql("SELECT * FROM events", asession, max_rows=10)
+
+    assert [s for s in statements if "events" in s] == ["SELECT * FROM events"]
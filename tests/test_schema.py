@@ -0,0 +1,117 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event
+
+
+def _count_statements(asession):
+    statements = []
+    event.listen(
+        asession.bind.sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    return statements
+
+
+async def test_schema_lists_existing_tables_with_sample_rows(
+    tools, asession, sqlite_path
+):
+    schema = await tools.get_tables_schema(
+        ["districts", "missing"], asession, sqlite_path
+    )
+
+    assert "CREATE TABLE districts" in schema
+    assert "Chennai\tTamil Nadu\t100\t3" in schema
+    assert "missing" not in schema
+
+
+async def test_schema_is_reflected_once_per_database(tools, asession, sqlite_path):
+    await tools.get_tables_schema(["districts"], asession, sqlite_path)
+    statements = _count_statements(asession)
+
+    await tools.get_tables_schema(["districts"], asession, sqlite_path)
+    assert statements == []
+
+    # Only the table missing from the cache is reflected
+    schema = await tools.get_tables_schema(
+        ["districts", "events"], asession, sqlite_path
+    )
+    assert "CREATE TABLE events" in schema
+    assert not any("districts" in statement for statement in statements)
+
+
+async def test_sample_rows_are_fetched_with_bounded_concurrency(
+    tools, asession, sqlite_path
+):
+    connection = sqlite3.connect(sqlite_path)
+    for i in range(6):
+        connection.execute(f"CREATE TABLE extra_{i} (value INTEGER)")
+    connection.commit()
+    connection.close()
+    tools._max_concurrent_sample_fetches = 2
+    pool = asession.bind.sync_engine.pool
+    checked_out = []
+    event.listen(pool, "checkout", lambda *args: checked_out.append(pool.checkedout()))
+
+    tables = ["districts", "events"] + [f"extra_{i}" for i in range(6)]
+    schema = await tools.get_tables_schema(tables, asession, sqlite_path)
+
+    assert all(f"Table: {table}" in schema for table in tables)
+    # The session's own connection, and at most two sample-row fetches
+    assert max(checked_out) <= 3
+
+
+async def test_compact_schema_renders_a_signature_per_table(
+    tools, asession, sqlite_path
+):
+    schema = await tools.get_tables_schema(
+        ["districts", "events"], asession, sqlite_path, schema_format="compact"
+    )
+
+    assert "districts(district_name TEXT PK, state TEXT, num_cases INTEGER, " in schema
+    assert "events(id INTEGER PK, kind TEXT, value REAL)" in schema
+    assert "CREATE TABLE" not in schema
+    assert len(schema) < len(
+        await tools.get_tables_schema(["districts", "events"], asession, sqlite_path)
+    )
+
+
+async def test_compact_schema_of_selected_columns_keeps_the_primary_key(
+    tools, asession, sqlite_path
+):
+    schema = await tools.get_tables_schema(
+        ["districts"],
+        asession,
+        sqlite_path,
+        schema_format="compact",
+        table_columns={"districts": ["state"]},
+    )
+
+    assert "districts(district_name TEXT PK, state TEXT)" in schema
+    assert "Chennai\tTamil Nadu\n" in schema
+
+
+async def test_compact_schema_truncates_long_sample_values(
+    tools, asession, sqlite_path
+):
+    connection = sqlite3.connect(sqlite_path)
+    connection.execute("CREATE TABLE notes (note TEXT)")
+    connection.execute("INSERT INTO notes VALUES (?)", ("x" * 500,))
+    connection.commit()
+    connection.close()
+    tools._max_sample_value_length = 20
+
+    schema = await tools.get_tables_schema(
+        ["notes"], asession, sqlite_path, schema_format="compact"
+    )
+
+    assert "x" * 20 + "..." in schema
+    assert "x" * 21 not in schema
+
+
+async def test_unknown_schema_format_is_rejected(tools, asession, sqlite_path):
+    with pytest.raises(ValueError):
+        await tools.get_tables_schema(
+            ["districts"], asession, sqlite_path, schema_format="yaml"
+        )
@@ -0,0 +1,105 @@
+import pytest
+
+from askametric.query_processor.sql_rewriter import UnsafeSQLError, rewrite_sql
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "INSERT INTO districts VALUES ('x', 'y', 1, 1)",
+        "UPDATE districts SET num_cases = 0",
+        "DELETE FROM districts",
+        "DROP TABLE districts",
+        "CREATE TABLE t AS SELECT * FROM districts",
+        "SELECT 1; DROP TABLE districts",
+        "WITH d AS (DELETE FROM districts RETURNING *) SELECT * FROM d",
+        "PRAGMA writable_schema = 1",
+        "SELECT * INTO newt FROM districts",
+        "SELECT * FROM districts FOR UPDATE",
+        "SELECT * FROM districts FOR SHARE",
+        "SELECT * FROM (SELECT * FROM districts FOR NO KEY UPDATE) AS d",
+    ],
+)
+def test_rejects_writes_and_multiple_statements(sql_query):
+    with pytest.raises(UnsafeSQLError):
+        rewrite_sql(sql_query, "postgresql")
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "INSERT INTO t VALUES (1",
+        "DELETE FROM t WHERE (",
+        "SELECT * FROM t WHERE (x; DROP TABLE t",
+        "SELECT * INTO t2 FROM t WHERE (",
+        "SELECT * FROM t WHERE (x FOR SHARE",
+        "SELECT * FROM t WHERE (x LOCK IN SHARE MODE",
+    ],
+)
+def test_rejects_unparsable_writes(sql_query):
+    with pytest.raises(UnsafeSQLError):
+        rewrite_sql(sql_query, "sqlite")
+
+
+@pytest.mark.parametrize(
+    "sql_query",
+    [
+        "SELECT content FROM read_text('/etc/passwd')",
+        "SELECT * FROM read_csv('/etc/passwd')",
+        "SELECT * FROM read_parquet('s3://bucket/file.parquet')",
+        "SELECT * FROM glob('/root/*')",
+        "SELECT pg_read_file('/etc/passwd')",
+        "SELECT * FROM '/etc/passwd'",
+        "SELECT * FROM read_csv_auto('/etc/passwd') WHERE (",
+    ],
+)
+def test_rejects_file_reads(sql_query):
+    with pytest.raises(UnsafeSQLError):
+        rewrite_sql(sql_query, "duckdb")
+
+
+def test_unparsable_select_is_passed_through_unchanged():
+    sql_query = "SELECT \"update\" FROM t WHERE a = 'delete' AND ("
+
+    rewritten_sql, _, reasons = rewrite_sql(sql_query, "sqlite", max_rows=10)
+
+    assert rewritten_sql == sql_query
+    assert reasons == ["Could not parse SQL query"]
+
+
+def test_select_without_limit_gets_one():
+    rewritten_sql, _, reasons = rewrite_sql(
+        "SELECT * FROM districts", "sqlite", max_rows=100
+    )
+
+    assert rewritten_sql == "SELECT * FROM districts LIMIT 100"
+    assert reasons == ["Added LIMIT 100"]
+
+
+def test_large_limit_is_tightened_and_small_limit_kept():
+    rewritten_sql, _, _ = rewrite_sql(
+        "SELECT * FROM districts LIMIT 5000", "sqlite", max_rows=100
+    )
+    assert rewritten_sql == "SELECT * FROM districts LIMIT 100"
+
+    rewritten_sql, _, reasons = rewrite_sql(
+        "SELECT * FROM districts LIMIT 10", "sqlite", max_rows=100
+    )
+    assert rewritten_sql == "SELECT * FROM districts LIMIT 10"
+    assert reasons == []
+
+
+def test_aggregate_without_group_by_gets_no_limit():
+    rewritten_sql, _, reasons = rewrite_sql(
+        "SELECT SUM(num_cases) FROM districts", "sqlite", max_rows=100
+    )
+
+    assert rewritten_sql == "SELECT SUM(num_cases) FROM districts"
+    assert reasons == []
+
+
+def test_normalized_sql_ignores_case_and_whitespace():
+    _, normalized_a, _ = rewrite_sql("select *   from districts", "sqlite")
+    _, normalized_b, _ = rewrite_sql("SELECT * FROM districts", "sqlite")
+
+    assert normalized_a == normalized_b
@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from askametric.query_processor.tools import SQLTimeoutError
+
+# Counts to a large number, taking several seconds on SQLite
+SLOW_QUERY = """
+WITH RECURSIVE counter(n) AS (
+    SELECT 1 UNION ALL SELECT n + 1 FROM counter WHERE n < 100000000
+)
+SELECT COUNT(*) FROM counter
+"""
+MEDIUM_QUERY = SLOW_QUERY.replace("100000000", "300000")
+
+
+async def test_slow_query_raises_timeout(tools, asession):
+    start = time.monotonic()
+    with pytest.raises(SQLTimeoutError):
+        await tools.run_sql(SLOW_QUERY, asession, timeout=0.2)
+    assert time.monotonic() - start < 2
+
+
+async def test_session_is_usable_after_timeout(tools, asession):
+    with pytest.raises(SQLTimeoutError):
+        await tools.run_sql(SLOW_QUERY, asession, timeout=0.2)
+
+    result = await tools.run_sql("SELECT COUNT(*) FROM districts", asession)
+    assert result["rows"][0][0] == 3
+
+
+async def test_zero_timeout_disables_the_default_timeout(tools, asession):
+    tools._sql_timeout_seconds = 0.001
+
+    result = await tools.run_sql(MEDIUM_QUERY, asession, timeout=0)
+
+    assert result["rows"][0][0] == 300000
+
+
+async def test_default_timeout_applies_when_timeout_is_none(tools, asession):
+    tools._sql_timeout_seconds = 0.2
+
+    with pytest.raises(SQLTimeoutError):
+        await tools.run_sql(SLOW_QUERY, asession)
+
+
+async def test_cancelling_the_caller_stops_the_statement(tools, asession):
+    task = asyncio.ensure_future(tools.run_sql(SLOW_QUERY, asession, timeout=60))
+    await asyncio.sleep(0.2)
+    start = time.monotonic()
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert time.monotonic() - start < 2
+
+
+async def test_zero_timeout_after_a_timeout_on_the_same_session(tools, asession):
+    with pytest.raises(SQLTimeoutError):
+        await tools.run_sql(SLOW_QUERY, asession, timeout=0.2)
+
+    result = await tools.run_sql(MEDIUM_QUERY, asession, timeout=0)
+
+    assert result["rows"][0][0] == 300000
+
+
+class _PostgresSession:
+    """A session recording the statements it is asked to run on PostgreSQL."""
+
+    def __init__(self):
+        self.statements = []
+        self.bind = None
+
+    def get_bind(self):
+        return type("Bind", (), {"dialect": postgresql.dialect()})()
+
+    async def connection(self):
+        raw_connection = type("RawConnection", (), {"driver_connection": None})()
+
+        class _Connection:
+            async def get_raw_connection(self):
+                return raw_connection
+
+        return _Connection()
+
+    async def execute(self, statement):
+        self.statements.append(str(statement))
+
+
+async def test_postgres_timeout_does_not_outlive_the_statement(tools):
+    asession = _PostgresSession()
+
+    await tools._run_with_timeout(
+        asession, lambda: asession.execute(text("SELECT 1")), 5
+    )
+    await tools._run_with_timeout(
+        asession, lambda: asession.execute(text("SELECT 2")), 0
+    )
+
+    assert asession.statements == [
+        "SET LOCAL statement_timeout = 5000",
+        "SELECT 1",
+        "SET LOCAL statement_timeout = DEFAULT",
+        "SELECT 2",
+    ]
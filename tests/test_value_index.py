@@ -0,0 +1,55 @@
+from askametric.query_processor.value_index import (
+    ValueIndex,
+    build_value_index,
+    normalize_value,
+)
+
+CATEGORICAL_VALUES = {
+    "districts": {
+        "district_name": ["Chennai", "Madurai", "Kanniyakumari"],
+        "state": ["Tamil Nadu"],
+    },
+    "events": {"kind": ["a", "b"]},
+}
+
+
+def test_values_are_normalized():
+    assert normalize_value("Kanniyākumari,  TAMIL-nadu") == "kanniyakumari tamil nadu"
+
+
+def test_misspelled_value_is_mapped_to_its_column():
+    value_index = ValueIndex("metrics", CATEGORICAL_VALUES)
+
+    hints = value_index.lookup("How many cases in Kanyakumari?")
+
+    assert hints == {"districts": {"district_name": ["Kanniyakumari"]}}
+
+
+def test_multi_word_values_and_table_filter():
+    value_index = ValueIndex("metrics", CATEGORICAL_VALUES)
+
+    assert value_index.lookup("Deaths in tamil nadu") == {
+        "districts": {"state": ["Tamil Nadu"]}
+    }
+    assert value_index.lookup("Deaths in tamil nadu", tables=["events"]) == {}
+    # Short values match too often to be indexed
+    assert value_index.lookup("Show a chart") == {}
+
+
+def test_saved_index_is_loaded(tmp_path):
+    path = str(tmp_path / "value_index.json")
+    ValueIndex("metrics", CATEGORICAL_VALUES).save(path)
+
+    value_index = ValueIndex.load(path)
+
+    assert value_index.lookup("Madurai") == {
+        "districts": {"district_name": ["Madurai"]}
+    }
+
+
+async def test_index_is_built_from_the_categorical_columns(asession):
+    value_index = await build_value_index("metrics", asession, ["districts"])
+
+    assert value_index.lookup("cases in Kanyakumari") == {
+        "districts": {"district_name": ["Kanniyakumari"]}
+    }
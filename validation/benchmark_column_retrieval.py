@@ -0,0 +1,157 @@
+import asyncio
+import glob
+import os
+from typing import Dict, List
+
+import dotenv
+import pandas as pd
+
+from askametric.query_processor.engine_registry import get_engine_registry
+from askametric.query_processor.query_processing_prompts import (
+    create_best_columns_prompt,
+)
+from askametric.query_processor.retrieval import (
+    filter_column_description,
+    get_retriever,
+)
+from askametric.query_processor.tools import get_tools
+from validate import get_env_vars, reformat_input_data
+
+dotenv.load_dotenv()
+
+
+async def evaluate_db(
+    db_name: str,
+    test_cases: List[Dict],
+    column_description: str,
+    top_m: int,
+    schema_format: str,
+) -> Dict:
+    """
+    Compute the recall@M of the column retriever against the correct best
+    columns of the test cases, given the correct best tables, and the size of
+    the best-columns prompt with and without the shortlist.
+    """
+    tools = get_tools()
+    retriever = get_retriever()
+    num_correct, num_retrieved = 0, 0
+    full_prompt_size, shortlisted_prompt_size = 0, 0
+
+    async with get_engine_registry().lease_session(db_name) as asession:
+        for test_case in test_cases:
+            best_tables = test_case["correct_best_tables"]
+            if not best_tables:
+                continue
+
+            query_model = {
+                "query_text": test_case["question"],
+                "query_metadata": test_case["question_metadata"],
+            }
+            table_columns = await tools.get_table_columns(
+                best_tables, asession, db_name
+            )
+            categorical_values = await tools.get_categorical_values(
+                best_tables, asession, db_name
+            )
+            candidate_columns = retriever.retrieve_columns(
+                db_name,
+                f"{test_case['question']} {test_case['question_metadata']}",
+                table_columns,
+                column_description,
+                categorical_values,
+                top_m=top_m,
+            )
+
+            for table, columns in test_case["correct_best_columns"].items():
+                num_correct += len(columns)
+                num_retrieved += len(
+                    set(columns) & set(candidate_columns.get(table, []))
+                )
+
+            full_schemas = await tools.get_tables_schema(
+                best_tables, asession, db_name, schema_format=schema_format
+            )
+            shortlisted_schemas = await tools.get_tables_schema(
+                best_tables,
+                asession,
+                db_name,
+                schema_format=schema_format,
+                table_columns=candidate_columns,
+            )
+            full_prompt_size += len(
+                create_best_columns_prompt(
+                    query_model, full_schemas, column_description
+                )
+            )
+            shortlisted_prompt_size += len(
+                create_best_columns_prompt(
+                    query_model,
+                    shortlisted_schemas,
+                    filter_column_description(
+                        column_description, table_columns, candidate_columns
+                    ),
+                )
+            )
+
+    return {
+        "db_name": db_name,
+        "top_m": top_m,
+        "recall": round(num_retrieved / num_correct, 3) if num_correct else None,
+        "prompt_size": shortlisted_prompt_size,
+        "full_prompt_size": full_prompt_size,
+        "prompt_size_ratio": (
+            round(shortlisted_prompt_size / full_prompt_size, 3)
+            if full_prompt_size
+            else None
+        ),
+    }
+
+
+async def main(args) -> None:
+    engine_registry = get_engine_registry()
+    results: List[Dict] = []
+
+    for path in sorted(glob.glob(f"{args.path_to_data_sources}/*.sqlite")):
+        db_name = os.path.splitext(os.path.basename(path))[0]
+        test_cases_path = f"{args.path_to_test_cases}/{db_name}.csv"
+        if not os.path.exists(test_cases_path):
+            print(f"Skipping {db_name}: no test cases")
+            continue
+
+        test_cases = reformat_input_data(pd.read_csv(test_cases_path))
+        env_vars = get_env_vars(db_name)
+        engine_registry.register_sqlite_readers(db_name, path, immutable=True)
+
+        for top_m in args.top_m:
+            results.append(
+                await evaluate_db(
+                    db_name,
+                    test_cases,
+                    env_vars["db_column_description"] or "",
+                    top_m,
+                    args.schema_format,
+                )
+            )
+            print(results[-1])
+
+        await engine_registry.dispose(db_name)
+
+    if results:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the recall@M of the BM25 column retriever."
+    )
+    parser.add_argument("--path_to_data_sources", type=str, default="data_sources")
+    parser.add_argument("--path_to_test_cases", type=str, default="test_cases")
+    parser.add_argument("--top_m", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument(
+        "--schema_format", type=str, default="ddl", choices=["ddl", "compact"]
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,78 @@
+import asyncio
+import glob
+import os
+import time
+from typing import Awaitable, Callable, List
+
+from benchmark_sqlite_readers import get_questions
+
+from askametric.query_processor.duckdb_accelerator import get_duckdb_accelerator
+from askametric.query_processor.engine_registry import get_engine_registry
+from askametric.query_processor.tools import get_tools
+
+
+async def time_queries(
+    questions: List[str],
+    run_query: Callable[[str], Awaitable],
+    num_repeats: int,
+) -> float:
+    """Return the mean latency, in milliseconds, of the queries."""
+    start_time = time.time()
+    for _ in range(num_repeats):
+        for sql_query in questions:
+            await run_query(sql_query)
+    return 1000 * (time.time() - start_time) / (num_repeats * len(questions))
+
+
+async def main(args) -> None:
+    engine_registry = get_engine_registry()
+    accelerator = get_duckdb_accelerator()
+    tools = get_tools()
+
+    for path in sorted(glob.glob(f"{args.path_to_data_sources}/*.sqlite")):
+        db_name = os.path.splitext(os.path.basename(path))[0]
+        engine_registry.register_sqlite_readers(db_name, path, immutable=True)
+        accelerator.register_sqlite(db_name, path)
+
+        start_time = time.time()
+        await accelerator.refresh(db_name)
+        mirror_time = 1000 * (time.time() - start_time)
+
+        questions = await get_questions(db_name)
+
+        async def _run_on_sqlite(sql_query: str) -> None:
+            async with engine_registry.lease_session(db_name) as asession:
+                await tools.run_sql(sql_query, asession)
+
+        async def _run_on_duckdb(sql_query: str) -> None:
+            # Measure the engine, not the result cache
+            accelerator.result_cache.clear()
+            await accelerator.run_sql(sql_query, db_name)
+
+        sqlite_latency = await time_queries(questions, _run_on_sqlite, args.num_repeats)
+        duckdb_latency = await time_queries(questions, _run_on_duckdb, args.num_repeats)
+        print(
+            {
+                "db_name": db_name,
+                "num_queries": len(questions),
+                "duckdb_mirror_ms": round(mirror_time, 2),
+                "sqlite_mean_ms": round(sqlite_latency, 2),
+                "duckdb_mean_ms": round(duckdb_latency, 2),
+            }
+        )
+
+        await engine_registry.dispose(db_name)
+        accelerator.close(db_name)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Compare analytical query latency on SQLite and DuckDB."
+    )
+    parser.add_argument("--path_to_data_sources", type=str, default="data_sources")
+    parser.add_argument("--num_repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -0,0 +1,103 @@
+import asyncio
+import glob
+import os
+import time
+from typing import Dict, List
+
+from sqlalchemy import inspect
+
+from askametric.query_processor.engine_registry import get_engine_registry
+from askametric.query_processor.tools import get_tools
+
+
+async def get_questions(db_id: str) -> List[str]:
+    """
+    Build one analytical query per table: a GROUP BY over its first column
+    with a count, the typical shape of the queries askametric generates.
+    """
+    async with get_engine_registry().lease_session(db_id) as asession:
+        connection = await asession.connection()
+        table_columns = await connection.run_sync(
+            lambda sync_conn: {
+                table: [
+                    column["name"] for column in inspect(sync_conn).get_columns(table)
+                ]
+                for table in inspect(sync_conn).get_table_names()
+            }
+        )
+
+    return [
+        f'SELECT "{columns[0]}", COUNT(*) FROM "{table}" '
+        f'GROUP BY "{columns[0]}" ORDER BY COUNT(*) DESC'
+        for table, columns in table_columns.items()
+        if columns
+    ]
+
+
+async def answer_question(db_id: str, sql_query: str) -> None:
+    """Run a query the way the pipeline does, on a leased session."""
+    tools = get_tools()
+    async with get_engine_registry().lease_session(db_id) as asession:
+        await tools.run_sql(sql_query, asession)
+
+
+async def benchmark(
+    db_id: str, questions: List[str], num_concurrent: int, num_questions: int
+) -> float:
+    """Return the throughput, in questions per second, at a concurrency level."""
+    semaphore = asyncio.Semaphore(num_concurrent)
+
+    async def _answer(sql_query: str) -> None:
+        async with semaphore:
+            await answer_question(db_id, sql_query)
+
+    start_time = time.time()
+    await asyncio.gather(
+        *[_answer(questions[i % len(questions)]) for i in range(num_questions)]
+    )
+    return num_questions / (time.time() - start_time)
+
+
+async def main(args) -> None:
+    engine_registry = get_engine_registry()
+    results: List[Dict] = []
+
+    for path in sorted(glob.glob(f"{args.path_to_data_sources}/*.sqlite")):
+        db_name = os.path.splitext(os.path.basename(path))[0]
+
+        for num_readers in (1, args.num_readers):
+            db_id = f"{db_name}-{num_readers}"
+            engine_registry.register_sqlite_readers(
+                db_id, path, num_readers=num_readers, immutable=True
+            )
+            questions = await get_questions(db_id)
+
+            for num_concurrent in (1, 4, 16):
+                throughput = await benchmark(
+                    db_id, questions, num_concurrent, args.num_questions
+                )
+                results.append(
+                    {
+                        "db_name": db_name,
+                        "num_readers": num_readers,
+                        "num_concurrent": num_concurrent,
+                        "questions_per_second": round(throughput, 2),
+                    }
+                )
+                print(results[-1])
+
+            await engine_registry.dispose(db_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the throughput of the SQLite reader pool."
+    )
+    parser.add_argument("--path_to_data_sources", type=str, default="data_sources")
+    parser.add_argument("--num_readers", type=int, default=4)
+    parser.add_argument("--num_questions", type=int, default=64)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
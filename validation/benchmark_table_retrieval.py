@@ -0,0 +1,113 @@
+import asyncio
+import glob
+import os
+from typing import Dict, List
+
+import dotenv
+import pandas as pd
+
+from askametric.query_processor.engine_registry import get_engine_registry
+from askametric.query_processor.retrieval import (
+    filter_table_description,
+    get_retriever,
+    parse_table_description,
+)
+from askametric.query_processor.tools import get_tools
+from validate import get_env_vars, reformat_input_data
+
+dotenv.load_dotenv()
+
+
+async def evaluate_db(
+    db_name: str, test_cases: List[Dict], table_description: str, top_n: int
+) -> Dict:
+    """
+    Compute the recall@N of the table retriever against the correct best
+    tables of the test cases, and the share of the table description kept.
+    """
+    tables = parse_table_description(table_description)
+    if tables is None:
+        raise ValueError(f"The table description of {db_name} is not a JSON list")
+
+    async with get_engine_registry().lease_session(db_name) as asession:
+        table_columns = await get_tools().get_table_columns(
+            [table["name"] for table in tables], asession, db_name
+        )
+
+    retriever = get_retriever()
+    num_correct, num_retrieved, num_fallbacks, description_size = 0, 0, 0, 0
+    for test_case in test_cases:
+        candidate_tables = retriever.retrieve_tables(
+            db_name,
+            f"{test_case['question']} {test_case['question_metadata']}",
+            table_description,
+            table_columns,
+            top_n=top_n,
+        )
+        if candidate_tables is None:
+            # The full list is shown, so every correct table is a candidate
+            num_fallbacks += 1
+            candidate_tables = [table["name"] for table in tables]
+            description_size += len(table_description)
+        else:
+            description_size += len(
+                filter_table_description(table_description, candidate_tables)
+            )
+        num_correct += len(test_case["correct_best_tables"])
+        num_retrieved += len(
+            set(test_case["correct_best_tables"]) & set(candidate_tables)
+        )
+
+    return {
+        "db_name": db_name,
+        "num_tables": len(tables),
+        "top_n": top_n,
+        "recall": round(num_retrieved / num_correct, 3) if num_correct else None,
+        "fallback_rate": round(num_fallbacks / len(test_cases), 3),
+        "description_size_ratio": round(
+            description_size / (len(table_description) * len(test_cases)), 3
+        ),
+    }
+
+
+async def main(args) -> None:
+    engine_registry = get_engine_registry()
+    results: List[Dict] = []
+
+    for path in sorted(glob.glob(f"{args.path_to_data_sources}/*.sqlite")):
+        db_name = os.path.splitext(os.path.basename(path))[0]
+        test_cases_path = f"{args.path_to_test_cases}/{db_name}.csv"
+        if not os.path.exists(test_cases_path):
+            print(f"Skipping {db_name}: no test cases")
+            continue
+
+        test_cases = reformat_input_data(pd.read_csv(test_cases_path))
+        env_vars = get_env_vars(db_name)
+        engine_registry.register_sqlite_readers(db_name, path, immutable=True)
+
+        for top_n in args.top_n:
+            results.append(
+                await evaluate_db(
+                    db_name, test_cases, env_vars["db_table_description"], top_n
+                )
+            )
+            print(results[-1])
+
+        await engine_registry.dispose(db_name)
+
+    if results:
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the recall@N of the BM25 table retriever."
+    )
+    parser.add_argument("--path_to_data_sources", type=str, default="data_sources")
+    parser.add_argument("--path_to_test_cases", type=str, default="test_cases")
+    parser.add_argument("--top_n", type=int, nargs="+", default=[1, 3, 5])
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -9,9 +9,8 @@ from typing import Dict, List
 
 import dotenv
 import pandas as pd
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
-from sqlalchemy.orm import sessionmaker
 
+from askametric.query_processor.engine_registry import get_engine_registry
 from askametric.query_processor.query_processor import LLMQueryProcessor
 from askametric.validation.validation_processor import QueryEvaluator
 
@@ -95,44 +94,41 @@ def get_test_cases(db_name: str) -> pd.DataFrame:
     return pd.read_csv(f"{TEST_CASES_PATH}/{db_name}.csv")
 
 
-async def process_single_query(
-    db_name: str, query_data: Dict, async_session, env_vars: Dict
-) -> Dict:
+async def process_single_query(db_name: str, query_data: Dict, env_vars: Dict) -> Dict:
     try:
-        async with async_session() as asession:
-            query_processor = LLMQueryProcessor(
-                query={
-                    "query_text": query_data["question"],
-                    "query_metadata": query_data["question_metadata"],
-                },
-                asession=asession,
-                metric_db_id=db_name,
-                db_type="sqlite",
-                llm=LLM,
-                guardrails_llm=GUARDRAILS_LLM,
-                sys_message=env_vars["system_message"],
-                db_description=env_vars["db_table_description"],
-                column_description=env_vars["db_column_description"],
-                indicator_vars=env_vars["indicator_vars"],
-                num_common_values=env_vars["num_common_values"],
-                log_level=LOG_LEVEL,
-            )
-
-            await query_processor.process_query()
-
-            return {
-                "db_name": db_name,
-                "llm_response": query_processor.final_answer,
-                "llm_ided_script": query_processor.query_script,
-                "llm_ided_language": query_processor.query_language,
-                "guardrails_status": {
-                    k: v
-                    for k, v in query_processor.guardrails.guardrails_status.items()
-                },
-                "llm_ided_best_tables": query_processor.best_tables,
-                "llm_ided_best_columns": query_processor.best_columns,
-                "request_status": "Success",
-            }
+        # Each stage leases a session from the engine registered for `db_name`
+        query_processor = LLMQueryProcessor(
+            query={
+                "query_text": query_data["question"],
+                "query_metadata": query_data["question_metadata"],
+            },
+            asession=None,
+            metric_db_id=db_name,
+            db_type="sqlite",
+            llm=LLM,
+            guardrails_llm=GUARDRAILS_LLM,
+            sys_message=env_vars["system_message"],
+            db_description=env_vars["db_table_description"],
+            column_description=env_vars["db_column_description"],
+            indicator_vars=env_vars["indicator_vars"],
+            num_common_values=env_vars["num_common_values"],
+            log_level=LOG_LEVEL,
+        )
+
+        await query_processor.process_query()
+
+        return {
+            "db_name": db_name,
+            "llm_response": query_processor.final_answer,
+            "llm_ided_script": query_processor.query_script,
+            "llm_ided_language": query_processor.query_language,
+            "guardrails_status": {
+                k: v for k, v in query_processor.guardrails.guardrails_status.items()
+            },
+            "llm_ided_best_tables": query_processor.best_tables,
+            "llm_ided_best_columns": query_processor.best_columns,
+            "request_status": "Success",
+        }
     except Exception as e:
         print(f"Error processing query: {e}")
         return {
@@ -150,7 +146,10 @@ async def process_single_query(
 async def process_queries(
     db_name: str, test_cases: pd.DataFrame, env_vars: Dict
 ) -> pd.DataFrame:
-    async_session = get_async_session(db_name)
+    engine_registry = get_engine_registry()
+    engine_registry.register_sqlite_readers(
+        db_name, f"{DATA_SOURCES_PATH}/{db_name}.sqlite", immutable=True
+    )
 
     # Create batches of tasks
     tasks = []
@@ -158,7 +157,6 @@ async def process_queries(
         task = process_single_query(
             db_name=db_name,
             query_data=test_case.to_dict(),
-            async_session=async_session,
             env_vars=env_vars,
         )
         tasks.append(task)
@@ -171,6 +169,10 @@ async def process_queries(
         results.extend(batch_results)
         print(f"LLM Responses {i + len(batch)}/{len(tasks)} queries for {db_name}")
 
+    pool_metrics = engine_registry.pool_metrics(db_name)
+    print(f"Connection pool metrics for {db_name}: {pool_metrics}")
+    await engine_registry.dispose(db_name)
+
     return pd.DataFrame(results)
 
 
@@ -251,16 +253,6 @@ def reformat_input_data(input_data: pd.DataFrame) -> List[Dict]:
     return [row.to_dict() for _, row in input_data.iterrows()]
 
 
-def get_async_session(db_name: str):
-    aengine = create_async_engine(
-        url=f"sqlite+aiosqlite:///{DATA_SOURCES_PATH}/{db_name}.sqlite",
-    )
-    async_session = sessionmaker(
-        bind=aengine, class_=AsyncSession, expire_on_commit=False
-    )
-    return async_session
-
-
 if __name__ == "__main__":
     import argparse
 